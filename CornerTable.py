@@ -4,7 +4,58 @@
 #########################
 
 import numpy as np
-import matplotlib.pyplot as plt
+import parallel
+import storage
+import spatialhash
+import objreader
+import stats
+
+# Calcula os corners opostos de todos os triângulos de uma só vez.
+# Cada corner c é associado à semi-aresta orientada (cv(cn(c)), cv(cp(c))),
+# que é a aresta oposta a c. O corner oposto de c é o corner cuja semi-aresta
+# é a mesma aresta no sentido contrário. As semi-arestas são ordenadas e a
+# aresta invertida de cada corner é encontrada com uma busca binária.
+# Argumentos:
+#       faces = array (M, 3) com os índices dos vértices de cada triângulo.
+#       workers = quantidade de processos (ver parallel.oppositeCorners).
+# Retorna um array com o corner oposto de cada corner (-1 se não existir).
+def oppositeCornersFromFaces(faces, workers = 1):
+    corners = np.asarray(faces, dtype=np.int64).reshape(-1)
+    return parallel.oppositeCorners(corners, 3, matchHalfEdges, workers)
+
+# Encontra os pares de corners opostos entre os corners c (as semi-arestas
+# de corners fora de c não são consideradas), como em
+# oppositeCornersFromFaces.
+# Argumentos:
+#       corners = array com os índices dos vértices de todos os corners (os
+#       triângulos concatenados).
+#       c = array com os corners considerados.
+# Retorna dois arrays (first, second), onde first[i] e second[i] são
+# opostos.
+def matchHalfEdges(corners, c):
+    nCorners = c.shape[0]
+    if nCorners == 0:
+        return c, c
+
+    a = corners[c // 3 * 3 + (c + 1) % 3] # cv(cn(c))
+    b = corners[c // 3 * 3 + (c + 2) % 3] # cv(cp(c))
+    nVertex = int(max(a.max(), b.max())) + 1
+    key = a * nVertex + b
+    reversedKey = b * nVertex + a
+
+    order = np.argsort(key, kind='stable')
+    sortedKey = key[order]
+    position = np.minimum(np.searchsorted(sortedKey, reversedKey), nCorners - 1)
+    # arestas degeneradas (a == b) não possuem corner oposto.
+    found = (sortedKey[position] == reversedKey) & (a != b)
+    opposite = np.full(nCorners, -1, dtype=np.int64)
+    opposite[found] = order[position[found]]
+
+    # em arestas não-manifold (mais de dois triângulos), mantém apenas os
+    # pares recíprocos, para que co(co(c)) == c sempre.
+    i = np.flatnonzero(opposite >= 0)
+    i = i[(opposite[opposite[i]] == i) & (i < opposite[i])]
+    return c[i], c[opposite[i]]
 
 class CornerTable:
     # Para a estrutura de corner table é necessário armazenar, para cada corner:
@@ -12,38 +63,102 @@ class CornerTable:
     #       co (índice do corner oposto);
     # e, para cada vértice, armazenar a posição (x,y,z) do vértice.
     # Estamos armazenando também os corners incidentes em cada vértice
-    # para facilitar os cálculos de corner oposto.
+    # para facilitar a remoção de triângulos e as consultas em torno de um
+    # vértice.
 
-    __NTri = 0 # Quantidade de triângulos na corner table.
-    __Corners = [] # Lista de corners (índices dos vértices / cv).
-    __OppositeCorners = [] # Lista de corners opostos (co).
+    # Todo o estado da corner table é criado por instância, de forma que
+    # várias corner tables podem existir ao mesmo tempo (inclusive em threads
+    # diferentes) sem compartilhar as listas.
+    # Argumentos:
+    #       eps = erro admitido para ponto flutuante (dois vértices a menos de
+    #       eps em cada eixo são considerados o mesmo vértice).
+    #       vertexIndex = estrutura utilizada para buscar os vértices pela
+    #       posição: 'hash' (hash grid espacial, O(1) esperado) ou 'linear'
+    #       (busca linear sobre todos os vértices).
+    #       expectedVertices, expectedTriangles = quantidade esperada de
+    #       vértices e triângulos, usada para pré-alocar os arrays e evitar
+    #       realocações ao construir malhas grandes.
+    #       incidence = representação dos corners incidentes em cada vértice:
+    #           'lists' (uma lista do python por vértice);
+    #           'csr' (offsets + array de corners, construído em uma única
+    #           passada vetorizada e reconstruído após qualquer modificação,
+    #           indicado para malhas estáticas);
+    #           'corner' (apenas um corner incidente por vértice, atualizado
+    #           em O(1); os demais são encontrados girando em torno do vértice
+    #           com co/cn, como na corner table clássica, indicado para
+    #           malhas dinâmicas).
+    #       A escolha é um compromisso entre memória e tempo das consultas:
+    #       'lists' (o padrão) é o mais rápido para percorrer os corners de um
+    #       vértice, mas ocupa cerca de 300 bytes por vértice em objetos do
+    #       python; 'csr' ocupa cerca de 30 bytes por vértice, mas é
+    #       reconstruído a cada modificação; 'corner' ocupa 4 bytes por vértice
+    #       e é o indicado para malhas grandes, ao custo de consultas mais
+    #       lentas. O dicionário de arestas (cerca de 200 bytes por corner) não
+    #       depende desta opção: ele é construído sob demanda ao inserir
+    #       triângulos.
+    def __init__(self, eps = 1e-10, vertexIndex = 'hash', expectedVertices = 0, expectedTriangles = 0, incidence = 'lists'):
+        self.__NTri = 0 # Quantidade de triângulos na corner table.
+        self.__Corners = storage.GrowableArray(np.int32, capacity = 3 * expectedTriangles) # Array de corners (índices dos vértices / cv).
+        self.__OppositeCorners = storage.GrowableArray(np.int32, capacity = 3 * expectedTriangles) # Array de corners opostos (co).
 
-    __NVertex = 0 # Quantidade de vértices na lista de vértices.
-    __Vertices = [] # Lista de posições dos vértices.
+        self.__NVertex = 0 # Quantidade de vértices na lista de vértices.
+        self.__Vertices = storage.GrowableArray(np.float64, 3, expectedVertices) # Array (NVertex, 3) de posições dos vértices.
 
-    __IncidentCorners = [] # Lista de corners incidentes em cada vértice.
+        if incidence not in ('lists', 'csr', 'corner'):
+            raise Exception("Unknown incidence: " + str(incidence))
+        self.__Incidence = incidence
+        # Lista de corners incidentes em cada vértice, usada no modo 'lists'
+        # (None = construída sob demanda).
+        self.__IncidentCorners = [] if incidence == 'lists' else None
+        # Corners incidentes no formato CSR (offsets, corners): no modo 'csr',
+        # construídos sob demanda; no modo 'lists', carregados de um arquivo
+        # por load e usados para construir a lista acima sob demanda (None se
+        # não existirem).
+        self.__IncidentCSR = None
+        # Um corner incidente em cada vértice (-1 se o vértice não tem corners),
+        # usado no modo 'corner' (None = construído sob demanda).
+        self.__VertexCorners = storage.GrowableArray(np.int32, capacity = expectedVertices) if incidence == 'corner' else None
 
-    __eps = 1e-10 # Erro admitido para ponto flutuante.
+        # Dicionário de semi-arestas: (cv(cn(c)), cv(cp(c))) -> c, usado para
+        # encontrar o corner oposto em O(1) ao inserir um triângulo.
+        # None significa que o dicionário ainda não foi construído (ele é
+        # construído sob demanda, por exemplo após fromArrays).
+        self.__HalfEdges = {}
+
+        self.__eps = eps # Erro admitido para ponto flutuante.
+        # Hash grid espacial para buscar vértices (None = busca linear).
+        if vertexIndex == 'hash':
+            self.__VertexGrid = spatialhash.VertexHashGrid(eps)
+        elif vertexIndex == 'linear':
+            self.__VertexGrid = None
+        else:
+            raise Exception("Unknown vertex index: " + str(vertexIndex))
+        self.__VertexGridValid = True # Falso se o hash grid precisa ser reconstruído.
+
+        self.__Stats = None # Estatísticas de uso (None = desabilitadas, ver enableStats).
+
+    # Os operadores abaixo usam apenas aritmética inteira do python, sem
+    # passar pelo numpy, que tem um custo alto para escalares.
 
     # corner next.
     def cn(self, c):
-        return int(np.floor(c / 3) * 3 + np.mod(c + 1, 3))
+        return int(c // 3 * 3 + (c + 1) % 3)
     
     # corner previous.
     def cp(self, c):
-        return int(self.cn(self.cn(c)))
+        return int(c // 3 * 3 + (c + 2) % 3)
 
     # obter o índice do triângulo a partir do corner.
     def ct(self, c):
-        return int(np.floor(c / 3))
+        return int(c // 3)
 
     # corner right.
     def cr(self, c):
-      return int(self.__OppositeCorners[self.cp(c)])
+      return int(self.__OppositeCorners[c // 3 * 3 + (c + 2) % 3])
           
     # corner left.
     def cl(self, c):
-      return int(self.__OppositeCorners[self.cn(c)])
+      return int(self.__OppositeCorners[c // 3 * 3 + (c + 1) % 3])
 
     # obter o índice do vértice correspondene ao corner.
     def cv(self, c):
@@ -53,19 +168,295 @@ class CornerTable:
     def co(self, c):
         return int(self.__OppositeCorners[c])
 
+    # Versões vetorizadas dos operadores: recebem um array de corners e
+    # retornam um array com o resultado do operador para cada corner.
+
+    # corner next.
+    def cnArray(self, c):
+        c = np.asarray(c)
+        return c // 3 * 3 + (c + 1) % 3
+
+    # corner previous.
+    def cpArray(self, c):
+        c = np.asarray(c)
+        return c // 3 * 3 + (c + 2) % 3
+
+    # obter os índices dos triângulos a partir dos corners.
+    def ctArray(self, c):
+        return np.asarray(c) // 3
+
+    # corner right.
+    def crArray(self, c):
+        return self.__OppositeCorners.view()[self.cpArray(c)]
+
+    # corner left.
+    def clArray(self, c):
+        return self.__OppositeCorners.view()[self.cnArray(c)]
+
+    # obter os índices dos vértices correspondentes aos corners.
+    def cvArray(self, c):
+        return self.__Corners.view()[np.asarray(c)]
+
+    # opposite corner.
+    def coArray(self, c):
+        return self.__OppositeCorners.view()[np.asarray(c)]
+
+    # Função para buscar um vértice pela posição (x, y, z).
+    # Retorna o índice do vértice, ou -1 se não existir nenhum vértice a
+    # menos de eps da posição em cada eixo.
+    def findVertex(self, x, y, z):
+        return self.__inVertices(x, y, z)
+
     def __inVertices(self, x, y, z):
+        vertexGrid = self.__getVertexGrid()
+        if self.__Stats is not None:
+            self.__Stats.count('vertexLookups')
+            self.__Stats.count('vertexComparisons', vertexGrid.candidates(x, y, z) if vertexGrid is not None else self.__NVertex)
+        if vertexGrid is not None:
+            # busca no hash grid, olhando apenas as células vizinhas ao ponto.
+            return vertexGrid.find(x, y, z)
         if self.__NVertex > 0:
-            # busca linear sobre a lista de vértices para encontrar o vértice
-            # desejado.
-            for i in range(self.__NVertex):
-                dx = abs(self.__Vertices[i][0] - x)
-                dy = abs(self.__Vertices[i][1] - y)
-                dz = abs(self.__Vertices[i][2] - z)
-                if dx < self.__eps and dy < self.__eps and dz < self.__eps:
-                    return i
+            # busca linear sobre o array de vértices para encontrar o vértice
+            # desejado (comparando todos os vértices de uma vez).
+            close = np.abs(self.__Vertices.view() - (x, y, z)) < self.__eps
+            found = np.flatnonzero(close.all(axis=1))
+            if found.size > 0:
+                return int(found[0])
         return -1
 
+    # semi-aresta orientada oposta ao corner c: (cv(cn(c)), cv(cp(c))).
+    def __halfEdge(self, c):
+        return (int(self.__Corners[c // 3 * 3 + (c + 1) % 3]), int(self.__Corners[c // 3 * 3 + (c + 2) % 3]))
+
+    # retorna o dicionário de semi-arestas, construindo-o a partir dos
+    # corners caso ainda não exista.
+    def __getHalfEdges(self):
+        if self.__HalfEdges is None:
+            c = np.arange(len(self.__Corners))
+            a = self.cvArray(self.cnArray(c)).tolist()
+            b = self.cvArray(self.cpArray(c)).tolist()
+            self.__HalfEdges = dict(zip(zip(a, b), c.tolist()))
+        return self.__HalfEdges
+
+    # remove a semi-aresta do corner c do dicionário.
+    def __removeHalfEdge(self, c):
+        key = self.__halfEdge(c)
+        if self.__HalfEdges.get(key) == c:
+            del self.__HalfEdges[key]
+
+    # atualiza o dicionário quando o corner oldCorner passa a ser newCorner
+    # (swap com o último triângulo).
+    def __moveHalfEdge(self, oldCorner, newCorner):
+        key = self.__halfEdge(oldCorner)
+        if self.__HalfEdges.get(key) == oldCorner:
+            self.__HalfEdges[key] = newCorner
+
+    # Descarta as estruturas auxiliares (lista de corners incidentes,
+    # hash grid de vértices e dicionário de semi-arestas) após os arrays de
+    # corners e de vértices serem substituídos. Elas são reconstruídas sob
+    # demanda, de forma que uma corner table carregada de um arquivo pode ser
+    # consultada sem nenhuma reconstrução.
+    def __invalidateIndices(self):
+        self.__IncidentCorners = None
+        self.__IncidentCSR = None
+        self.__VertexCorners = None
+        self.__HalfEdges = None
+        self.__VertexGridValid = self.__VertexGrid is None
+
+    # corners incidentes em cada vértice no formato CSR: os corners incidentes
+    # no vértice v são corners[offsets[v]:offsets[v + 1]].
+    def __incidentCornersCSR(self):
+        corners = self.__Corners.view()
+        order = np.argsort(corners, kind='stable').astype(np.int32)
+        offsets = np.zeros(self.__NVertex + 1, dtype=np.int64)
+        np.cumsum(np.bincount(corners, minlength=self.__NVertex), out=offsets[1:])
+        return offsets, order
+
+    # retorna a lista de corners incidentes em cada vértice, construindo-a
+    # caso ainda não exista.
+    def __getIncidentCorners(self):
+        if self.__IncidentCorners is None:
+            if self.__IncidentCSR is not None:
+                offsets, order = self.__IncidentCSR
+            else:
+                offsets, order = self.__incidentCornersCSR()
+            offsets = offsets.tolist()
+            order = order.tolist()
+            self.__IncidentCorners = [order[offsets[i]:offsets[i + 1]] for i in range(self.__NVertex)]
+            self.__IncidentCSR = None
+        return self.__IncidentCorners
+
+    # retorna os corners incidentes no formato CSR, construindo-os caso ainda
+    # não existam (no modo 'csr' eles são mantidos até a próxima modificação).
+    def __getIncidentCSR(self):
+        if self.__IncidentCSR is not None:
+            return self.__IncidentCSR
+        incidentCSR = self.__incidentCornersCSR()
+        if self.__Incidence == 'csr':
+            self.__IncidentCSR = incidentCSR
+        return incidentCSR
+
+    # retorna o array com um corner incidente em cada vértice, construindo-o
+    # caso ainda não exista.
+    def __getVertexCorners(self):
+        if self.__VertexCorners is None:
+            corners = self.__Corners.view()
+            vertexCorners = np.full(self.__NVertex, -1, dtype=np.int32)
+            # com vértices repetidos, qualquer um dos corners atribuídos serve.
+            vertexCorners[corners] = np.arange(corners.shape[0], dtype=np.int32)
+            self.__VertexCorners = storage.GrowableArray.fromArray(vertexCorners, np.int32)
+        return self.__VertexCorners
+
+    # Retorna os corners incidentes no vértice v (array do numpy).
+    # No modo 'corner', os corners são encontrados girando em torno do vértice
+    # a partir do corner armazenado (ver swing). Em vértices não-manifold (com
+    # mais de um leque de triângulos), apenas o leque do corner armazenado é
+    # retornado.
+    # Argumentos:
+    #       v = índice do vértice.
+    def incidentCorners(self, v):
+        if self.__Incidence == 'lists':
+            return np.asarray(self.__getIncidentCorners()[v], dtype=np.int32)
+        if self.__Incidence == 'csr':
+            offsets, order = self.__getIncidentCSR()
+            return order[offsets[v]:offsets[v + 1]]
+        c = int(self.__getVertexCorners()[v])
+        if c < 0:
+            return np.empty(0, dtype=np.int32)
+        return np.fromiter(self.swing(c), dtype=np.int32)
+
+    # Corners incidentes em todos os vértices de uma só vez, no formato CSR:
+    # os corners incidentes no vértice v são corners[offsets[v]:offsets[v + 1]].
+    def incidentCornersArray(self):
+        return self.__getIncidentCSR()
+
+    # um corner qualquer do vértice v (-1 se o vértice não tem corners).
+    def __vertexCorner(self, v):
+        if self.__Incidence == 'corner':
+            return int(self.__getVertexCorners()[v])
+        if self.__Incidence == 'lists':
+            incidentCorners = self.__getIncidentCorners()[v]
+            return incidentCorners[0] if incidentCorners else -1
+        offsets, order = self.__getIncidentCSR()
+        return int(order[offsets[v]]) if offsets[v + 1] > offsets[v] else -1
+
+    # Percorre os corners do vértice cv(c), girando em torno do vértice pelos
+    # triângulos vizinhos: swing(c) = cn(cl(c)) em um sentido e cp(cr(c)) no
+    # outro. Apenas os corners opostos são consultados (nenhuma lista de
+    # corners incidentes é utilizada).
+    # Em um vértice interior (leque fechado), os corners começam por c; em um
+    # vértice de borda (leque aberto), começam pelo corner de uma das bordas
+    # e seguem até a outra.
+    # Argumentos:
+    #       c = corner inicial.
+    def swing(self, c):
+        # voltando até a borda (ou até dar a volta completa).
+        start = c
+        s = self.cr(c)
+        while s >= 0:
+            s = self.cp(s)
+            if s == c:
+                break
+            start = s
+            s = self.cr(s)
+        yield start
+        s = self.cl(start)
+        while s >= 0:
+            s = self.cn(s)
+            if s == start:
+                return
+            yield s
+            s = self.cl(s)
+
+    # Percorre os vértices vizinhos (anel) do vértice v, em sentido
+    # anti-horário ao redor do vértice (ver swing).
+    # Argumentos:
+    #       v = índice do vértice.
+    def vertexRing(self, v):
+        c = self.__vertexCorner(v)
+        if c < 0:
+            return
+        s = c
+        for s in self.swing(c):
+            yield self.cv(self.cn(s))
+        if self.cl(s) < 0:
+            # leque aberto: o último vértice da borda.
+            yield self.cv(self.cp(s))
+
+    # Anéis de todos os vértices de uma só vez, no formato CSR (sem ordem
+    # angular): os vizinhos do vértice v são neighbors[offsets[v]:offsets[v + 1]],
+    # em ordem crescente de índice.
+    def vertexRingsArray(self):
+        corners = self.__Corners.view()
+        c = np.arange(corners.shape[0])
+        source = np.concatenate((corners, corners)).astype(np.int64)
+        target = np.concatenate((corners[self.cnArray(c)], corners[self.cpArray(c)])).astype(np.int64)
+        # cada aresta aparece uma vez para cada triângulo que a contém
+        # (arestas degeneradas são ignoradas).
+        valid = source != target
+        nVertex = max(self.__NVertex, 1)
+        keys = np.sort(source[valid] * nVertex + target[valid])
+        distinct = np.ones(keys.shape[0], dtype=bool)
+        distinct[1:] = keys[1:] != keys[:-1]
+        keys = keys[distinct]
+        offsets = np.zeros(self.__NVertex + 1, dtype=np.int64)
+        np.cumsum(np.bincount(keys // nVertex, minlength=self.__NVertex), out=offsets[1:])
+        return offsets, (keys % nVertex).astype(np.int32)
+
+    # Matriz de adjacência vértice-vértice (scipy.sparse.csr_matrix
+    # (NVertex, NVertex), simétrica, com 1 em cada aresta), construída a partir
+    # dos anéis de todos os vértices (ver vertexRingsArray).
+    # O scipy é importado apenas ao chamar esta função.
+    def adjacency(self):
+        import scipy.sparse
+        offsets, neighbors = self.vertexRingsArray()
+        return scipy.sparse.csr_matrix((np.ones(neighbors.shape[0]), neighbors, offsets), shape=(self.__NVertex, self.__NVertex))
+
+    # Matriz laplaciana da malha, L = D - W (scipy.sparse.csr_matrix
+    # (NVertex, NVertex), simétrica e semi-definida positiva), onde W são os
+    # pesos das arestas e D é a matriz diagonal com a soma dos pesos de cada
+    # vértice. Os pesos são calculados de uma só vez para todos os corners.
+    # O scipy é importado apenas ao chamar esta função.
+    # Argumentos:
+    #       weights = 'uniform' (peso 1 em cada aresta) ou 'cotangent' (peso
+    #       (cot(alfa) + cot(beta)) / 2 na aresta (i, j), onde alfa e beta são
+    #       os ângulos opostos à aresta nos dois triângulos que a contêm).
+    def laplacian(self, weights = 'uniform'):
+        import scipy.sparse
+        if weights == 'uniform':
+            W = self.adjacency()
+        elif weights == 'cotangent':
+            corners = self.__Corners.view()
+            c = np.arange(corners.shape[0])
+            i = corners[self.cnArray(c)]
+            j = corners[self.cpArray(c)]
+            # cotangente do ângulo do corner c, que é oposto à aresta (i, j).
+            vertices = self.__Vertices.view()
+            e1 = vertices[i] - vertices[corners]
+            e2 = vertices[j] - vertices[corners]
+            sine = np.linalg.norm(np.cross(e1, e2), axis=1)
+            cotangent = np.divide(np.einsum('ij,ij->i', e1, e2), sine, out=np.zeros(c.shape[0]), where=sine > 0)
+            W = scipy.sparse.coo_matrix((np.concatenate((cotangent, cotangent)) / 2, (np.concatenate((i, j)), np.concatenate((j, i)))), shape=(self.__NVertex, self.__NVertex)).tocsr()
+        else:
+            raise Exception("Unknown Laplacian weights: " + str(weights))
+        return (scipy.sparse.diags(np.asarray(W.sum(axis=1)).reshape(-1)) - W).tocsr()
+
+    # retorna o hash grid de vértices (None para a busca linear),
+    # reconstruindo-o caso esteja desatualizado.
+    def __getVertexGrid(self):
+        if not self.__VertexGridValid:
+            self.__VertexGrid.rebuild(self.__Vertices.view())
+            self.__VertexGridValid = True
+        return self.__VertexGrid
+
     def __insertVertex(self, x, y, z, corner):
+        if self.__Incidence == 'lists':
+            incidentCorners = self.__getIncidentCorners()
+        elif self.__Incidence == 'corner':
+            vertexCorners = self.__getVertexCorners()
+        else:
+            # o CSR é reconstruído na próxima consulta.
+            self.__IncidentCSR = None
         # verificando se o vértice já existe na lista.
         Position = self.__inVertices(x, y, z)
         if Position == -1:
@@ -73,12 +464,20 @@ class CornerTable:
             self.__Vertices.append([x, y, z])
             Position = self.__NVertex
             self.__NVertex += 1
+            if self.__VertexGrid is not None:
+                self.__VertexGrid.insert(x, y, z, Position)
             # criando a lista de corners incidentes no vértice inserido.
-            self.__IncidentCorners.append([corner])
-        else:
+            if self.__Incidence == 'lists':
+                incidentCorners.append([corner])
+            elif self.__Incidence == 'corner':
+                vertexCorners.append(corner)
+        elif self.__Incidence == 'lists':
             # utilizando um vértice já existente.
             # atualizando a lista de corners incidentes no vértice inserido.
-            self.__IncidentCorners[Position].append(corner)
+            incidentCorners[Position].append(corner)
+        elif self.__Incidence == 'corner' and vertexCorners[Position] < 0:
+            # vértice existente que ainda não tinha nenhum corner.
+            vertexCorners[Position] = corner
         return Position
 
     # Função para inserir um triângulo na corner table a partir das
@@ -107,20 +506,79 @@ class CornerTable:
         self.__OppositeCorners.append(-1) # c.o 1
         self.__OppositeCorners.append(-1) # c.o 2
 
-        # calculando os corners opostos relativos aos vértices inseridos.
-        # sendo c0 e c1 dois corners incidentes no mesmo vértice,
-        # se cv(cn(c0)) == cv(cp(c1)), então co(cp(c0)) = cn(c1)
-        #                                  e co(cn(c1)) = cp(c0).
-        for vertexIndex in [Position0, Position1, Position2]:
-            incidentCornersLength = len(self.__IncidentCorners[vertexIndex])
-            incidentCornersForV = self.__IncidentCorners[vertexIndex]
-            for incidentCornerIndex1 in range(incidentCornersLength):
-                for incidentCornerIndex2 in range(incidentCornersLength):
-                    ic1 = incidentCornersForV[incidentCornerIndex1]
-                    ic2 = incidentCornersForV[incidentCornerIndex2]
-                    if self.__Corners[self.cn(ic1)] == self.__Corners[self.cp(ic2)]:
-                        self.__OppositeCorners[self.cp(ic1)] = self.cn(ic2)
-                        self.__OppositeCorners[self.cn(ic2)] = self.cp(ic1)
+        # calculando os corners opostos dos corners inseridos.
+        # o corner c é oposto à semi-aresta (cv(cn(c)), cv(cp(c))), e o seu
+        # corner oposto é o corner da semi-aresta no sentido contrário, que é
+        # buscada no dicionário de semi-arestas.
+        halfEdges = self.__getHalfEdges()
+        for c in range((self.__NTri - 1) * 3, self.__NTri * 3):
+            a, b = self.__halfEdge(c)
+            if a == b:
+                continue
+            o = halfEdges.get((b, a))
+            if self.__Stats is not None:
+                self.__Stats.count('oppositeLookups')
+                self.__Stats.count('oppositeMatches', o is not None)
+            if o is not None:
+                # em arestas não-manifold, desfaz o par anterior do corner o.
+                if self.__OppositeCorners[o] >= 0:
+                    self.__OppositeCorners[self.__OppositeCorners[o]] = -1
+                self.__OppositeCorners[c] = o
+                self.__OppositeCorners[o] = c
+            halfEdges[(a, b)] = c
+
+    # Função para construir uma corner table a partir de arrays de vértices e
+    # faces, sem inserir triângulo por triângulo.
+    # Os vértices são utilizados como estão (não é feita a busca por vértices
+    # repetidos) e os corners opostos são calculados em uma única passada.
+    # Argumentos:
+    #       vertices = array (N, 3) com as posições (x, y, z) dos vértices.
+    #       faces = array (M, 3) com os índices dos vértices de cada
+    #       triângulo, ordenados em sentido anti-horário.
+    #       eps, vertexIndex, incidence = mesmos argumentos do construtor.
+    #       workers = quantidade de processos usados para calcular os corners
+    #       opostos (ver buildParallel).
+    @classmethod
+    def fromArrays(cls, vertices, faces, eps = 1e-10, vertexIndex = 'hash', incidence = 'lists', workers = 1):
+        vertices = np.asarray(vertices, dtype=np.float64).reshape((-1, 3))
+        faces = np.asarray(faces, dtype=np.int64).reshape((-1, 3))
+        nVertex = vertices.shape[0]
+        if faces.size > 0 and (faces.min() < 0 or faces.max() >= nVertex):
+            raise Exception("Face index out of range")
+
+        table = cls(eps, vertexIndex, incidence = incidence)
+        table.__NTri = faces.shape[0]
+        table.__Corners = storage.GrowableArray.fromArray(faces.reshape(-1).astype(np.int32), np.int32)
+        table.__OppositeCorners = storage.GrowableArray.fromArray(oppositeCornersFromFaces(faces, workers), np.int32)
+        table.__NVertex = nVertex
+        table.__Vertices = storage.GrowableArray.fromArray(vertices.copy(), np.float64, 3)
+        table.__invalidateIndices()
+        return table
+
+    # Função para construir uma corner table grande a partir de arrays de
+    # vértices e triângulos, como fromArrays, mas calculando os corners
+    # opostos em vários processos (ver parallel.oppositeCorners): o array de
+    # triângulos é dividido em partições, os corners opostos de cada partição
+    # são calculados em paralelo sobre memória compartilhada e os pares entre
+    # partições são resolvidos no final.
+    # Argumentos:
+    #       vertices, faces, eps, vertexIndex, incidence = mesmos argumentos
+    #       de fromArrays.
+    #       workers = quantidade de processos (None = quantidade de CPUs).
+    @classmethod
+    def buildParallel(cls, vertices, faces, workers = None, eps = 1e-10, vertexIndex = 'hash', incidence = 'lists'):
+        return cls.fromArrays(vertices, faces, eps = eps, vertexIndex = vertexIndex, incidence = incidence, workers = workers)
+
+    # Função para construir uma corner table a partir de um arquivo Wavefront
+    # OBJ, lido em blocos diretamente para arrays do numpy (ver objreader).
+    # Polígonos com mais de 3 vértices são triangulados em leque.
+    # Argumentos:
+    #       path = caminho do arquivo.
+    #       eps, vertexIndex, incidence = mesmos argumentos do construtor.
+    @classmethod
+    def fromOBJ(cls, path, eps = 1e-10, vertexIndex = 'hash', incidence = 'lists'):
+        vertices, faces = objreader.readOBJ(path)
+        return cls.fromArrays(vertices, faces, eps, vertexIndex, incidence)
 
     # Função para remover um vértice da corner table a partir de sua
     # posição (x, y, z). Remove também todos os triângulos que compartilham
@@ -129,138 +587,162 @@ class CornerTable:
     # Argumentos:
     #       posição (x, y, z) do vértice
     def removeVertex(self, x, y, z):
-        # obtendo o índice do vértice na lista de vértices.
-        removedVertexIndex = self.__inVertices(x, y, z)
-        
-        # se o vértice não existir na corner table, não é necessário
-        # removê-lo.
-        if removedVertexIndex == -1: 
-            return
-        
-        # não pode simplesmente remover o vértice de todas as listas, 
-        # porque iria bagunçar todas as referências de índices que
-        # são feitas na corner table.
-        # por este motivo, foi decidido dar swap com o último elemento em
-        # vez de remover, e alterar apenas as referências a este único
-        # elemento modificado.
-        # deste modo, o último vértice vai assumir a posição do vértice
-        # que está sendo removido.
-        lastVertex = self.__NVertex - 1
-        
-        # pegando os corners incidentes no vértice que está sendo removido.
-        incidentCornersForV = self.__IncidentCorners[removedVertexIndex]
-        
-        # quando remove um vértice, tem que remover todos os triângulos
-        # ligados neste vértice.
-        # pegando a lista de triângulos que vão ser removidos devido à
-        # remoção do vértice
-        # de forma análoga ao vértice, cada triângulo removido será 
-        # substituído pelo último triângulo da lista (swap com o último).
-        trianglesToBeRemoved = []
-        for i in range(len(incidentCornersForV)):
-            trianglesToBeRemoved.append(self.ct(incidentCornersForV[i]))
-
-        # vai remover de baixo para cima.
-        trianglesToBeRemoved.sort(reverse=True)
-        
-        # ao remover múltiplos triângulos, pode acontecer de outros vértices
-        # também serem removidos (caso não sobre nenhum corner incidente
-        # nestes vértices).
-        # lista de vértices que serão marcados para remoção ao final da
-        # função.
-        vertexMarkedForRemoval = []
-        
-        # removendo os triângulos e todos os seus corners.
-        for triangleIndex in trianglesToBeRemoved:
-            # corners do triangulo sendo removido.
-            c0 = triangleIndex * 3 + 0
-            c1 = triangleIndex * 3 + 1
-            c2 = triangleIndex * 3 + 2
-            
-            # removendo estes corners da lista de incident corners de cada 
-            # vértice respectivamente.
-            for cornerIndex in [c0, c1, c2]:
-                triangleVertexIndex = self.__Corners[cornerIndex]
-                for i in range(len(self.__IncidentCorners[triangleVertexIndex])):
-                    if self.__IncidentCorners[triangleVertexIndex][i] == cornerIndex:
-                        del self.__IncidentCorners[triangleVertexIndex][i]
-                        break
-                # se __IncidentCorners[triangleVertexIndex] ficar vazio,
-                # este vértice tem que ser removido também.
-                if not self.__IncidentCorners[triangleVertexIndex]:
-                    vertexMarkedForRemoval.append(self.__Vertices[triangleVertexIndex])
-            
-            # atualizando os incident corners dos vértices dos corners do
-            # último triângulo (que vai mudar de posição).
-            for j in range(3):
-                lastCornerIndex = (self.__NTri - 1) * 3 + j
-                removedCornerIndex = triangleIndex * 3 + j
-                triangleVertexIndex = self.__Corners[lastCornerIndex]
-                for i in range(len(self.__IncidentCorners[triangleVertexIndex])):
-                    if self.__IncidentCorners[triangleVertexIndex][i] == lastCornerIndex:
-                        self.__IncidentCorners[triangleVertexIndex][i] = removedCornerIndex
-                        break
+        self.removeVerticesAt([[x, y, z]])
+
+    # Função para remover vários vértices a partir de suas posições (x, y, z).
+    # Posições que não correspondem a nenhum vértice são ignoradas.
+    # Argumentos:
+    #       points = array (K, 3) com as posições dos vértices.
+    # Retorna os mapas de índices antigos -> novos dos triângulos e dos vértices
+    # (-1 para os elementos removidos).
+    def removeVerticesAt(self, points):
+        vertexIndices = []
+        for x, y, z in np.asarray(points, dtype=np.float64).reshape((-1, 3)).tolist():
+            vertexIndex = self.__inVertices(x, y, z)
+            if vertexIndex != -1:
+                vertexIndices.append(vertexIndex)
+        return self.removeVertices(vertexIndices)
+
+    # Função para remover vários vértices a partir de seus índices.
+    # Todos os triângulos que compartilham algum destes vértices são removidos, e
+    # os vértices que ficarem sem nenhum corner também.
+    # Os vértices são removidos um por vez (swap com o último vértice, como
+    # os triângulos), a partir de uma lista de trabalho em vez de chamadas
+    # recursivas: os vértices que ficam sem corners entram na lista, e as
+    # estruturas auxiliares (hash grid, dicionário de semi-arestas e corners
+    # incidentes) são atualizadas apenas nos elementos que mudam de posição.
+    # Nos modos 'csr' e 'corner', que não guardam a lista de corners de cada
+    # vértice, as posições removidas são preenchidas em uma única passada
+    # vetorizada (ver __fillRemoved).
+    # Quando muitos vértices são removidos de uma vez (mais de 1/8 dos
+    # vértices), os arrays são compactados em uma única passada (ver
+    # __compact), e as estruturas auxiliares são reconstruídas sob demanda.
+    # Argumentos:
+    #       vertexIndices = índices dos vértices (índices inexistentes são
+    #       ignorados).
+    # Retorna os mapas de índices antigos -> novos dos triângulos e dos vértices
+    # (-1 para os elementos removidos).
+    def removeVertices(self, vertexIndices):
+        vertexIndices = np.asarray(vertexIndices, dtype=np.int64).reshape(-1)
+        vertexIndices = np.unique(vertexIndices[(vertexIndices >= 0) & (vertexIndices < self.__NVertex)])
+        if vertexIndices.shape[0] > 0 and (vertexIndices.shape[0] * 8 > self.__NVertex or self.__Incidence != 'lists'):
+            removedVertices = np.zeros(self.__NVertex, dtype=bool)
+            removedVertices[vertexIndices] = True
+            # triângulos com pelo menos um vértice removido.
+            removed = removedVertices[self.__Corners.view().reshape((-1, 3))].any(axis=1)
+            if vertexIndices.shape[0] * 8 > self.__NVertex:
+                return self.__compact(removed, removedVertices)
+            return self.__fillRemoved(removed, removedVertices)
+
+        # índice original dos elementos/vértices que mudaram de posição.
+        nTriangles = self.__NTri
+        nVertex = self.__NVertex
+        elementAt = {}
+        vertexAt = {}
+        worklist = set(vertexIndices.tolist())
+        while worklist:
+            v = worklist.pop()
+            triangles = sorted({cornerIndex // 3 for cornerIndex in self.__cornersOfVertex(v)}, reverse = True)
+            worklist.update(self.__removeTrianglesSwap(triangles, elementAt))
+            worklist.discard(v)
+            last = self.__NVertex - 1
+            self.__removeVertexSwap(v)
+            moved = vertexAt.pop(last, last)
+            if v != last:
+                vertexAt[v] = moved
+            # o último vértice passou para a posição v.
+            if last in worklist:
+                worklist.remove(last)
+                worklist.add(v)
+
+        return self.__indexMap(elementAt, nTriangles, self.__NTri), self.__indexMap(vertexAt, nVertex, self.__NVertex)
+
+    # Mapa de índices antigos -> novos (-1 para os removidos) após remoções
+    # com swap com o último, a partir das posições que mudaram.
+    # Como só o último elemento muda de posição, todo elemento movido tem
+    # índice original >= size (a quantidade final), e todo elemento original
+    # em uma posição que mudou foi removido.
+    # Argumentos:
+    #       moved = dicionário posição -> índice original.
+    #       count, size = quantidade de elementos antes e depois das remoções.
+    @staticmethod
+    def __indexMap(moved, count, size):
+        indexMap = np.arange(count, dtype=np.int64)
+        indexMap[size:] = -1
+        if moved:
+            positions = np.fromiter(moved.keys(), dtype=np.int64, count=len(moved))
+            originals = np.fromiter(moved.values(), dtype=np.int64, count=len(moved))
+            indexMap[positions] = -1
+            indexMap[originals] = positions
+        return indexMap
+
+    # corners incidentes no vértice v (uma cópia da lista, que é alterada
+    # durante a remoção).
+    def __cornersOfVertex(self, v):
+        return list(self.__getIncidentCorners()[v])
+
+    # Remove o vértice v, que não tem mais nenhum corner: o último vértice
+    # passa para a posição v, e apenas as referências a ele são atualizadas.
+    def __removeVertexSwap(self, v):
+        last = self.__NVertex - 1
+        incidentCorners = self.__getIncidentCorners()
+        cornersOfLast = self.__cornersOfVertex(last) if v != last else []
+
+        # removendo o vértice do hash grid, e atualizando o índice do último
+        # vértice, que vai mudar de posição.
+        if self.__VertexGrid is not None and self.__VertexGridValid:
+            removedPosition = self.__Vertices[v]
+            self.__VertexGrid.remove(removedPosition[0], removedPosition[1], removedPosition[2], v)
+            if v != last:
+                lastPosition = self.__Vertices[last]
+                self.__VertexGrid.move(lastPosition[0], lastPosition[1], lastPosition[2], last, v)
 
-            # removendo os corners dos opposite corners.
-            if self.__OppositeCorners[c0] >= 0:
-                self.__OppositeCorners[self.__OppositeCorners[c0]] = -1
-                self.__OppositeCorners[c0] = -1
-            if self.__OppositeCorners[c1] >= 0:
-                self.__OppositeCorners[self.__OppositeCorners[c1]] = -1
-                self.__OppositeCorners[c1] = -1
-            if self.__OppositeCorners[c2] >= 0:
-                self.__OppositeCorners[self.__OppositeCorners[c2]] = -1
-                self.__OppositeCorners[c2] = -1
-            
-            # substituindo os corners pelo último triângulo.
-            if self.__OppositeCorners[(self.__NTri - 1) * 3 + 0] >= 0:
-                self.__OppositeCorners[self.__OppositeCorners[(self.__NTri - 1) * 3 + 0]] = c0
-            if self.__OppositeCorners[(self.__NTri - 1) * 3 + 1] >= 0:
-                self.__OppositeCorners[self.__OppositeCorners[(self.__NTri - 1) * 3 + 1]] = c1
-            if self.__OppositeCorners[(self.__NTri - 1) * 3 + 2] >= 0:
-                self.__OppositeCorners[self.__OppositeCorners[(self.__NTri - 1) * 3 + 2]] = c2
-            
-            self.__Corners[c0] = self.__Corners[(self.__NTri - 1) * 3 + 0]
-            self.__Corners[c1] = self.__Corners[(self.__NTri - 1) * 3 + 1]
-            self.__Corners[c2] = self.__Corners[(self.__NTri - 1) * 3 + 2]
-            self.__OppositeCorners[c0] = self.__OppositeCorners[(self.__NTri - 1) * 3 + 0]
-            self.__OppositeCorners[c1] = self.__OppositeCorners[(self.__NTri - 1) * 3 + 1]
-            self.__OppositeCorners[c2] = self.__OppositeCorners[(self.__NTri - 1) * 3 + 2]
-            del self.__Corners[(self.__NTri - 1) * 3 + 2]
-            del self.__Corners[(self.__NTri - 1) * 3 + 1]
-            del self.__Corners[(self.__NTri - 1) * 3 + 0]
-            del self.__OppositeCorners[(self.__NTri - 1) * 3 + 2]
-            del self.__OppositeCorners[(self.__NTri - 1) * 3 + 1]
-            del self.__OppositeCorners[(self.__NTri - 1) * 3 + 0]
-            
-            # atualizando a quantidade de triângulos.
-            self.__NTri -= 1
-        
         # removendo o vértice da matriz de posições.
-        self.__Vertices[removedVertexIndex] = self.__Vertices[lastVertex]
-        del self.__Vertices[lastVertex]
-        
+        self.__Vertices[v] = self.__Vertices[last]
+        self.__Vertices.truncate(last)
+
         # atualizando as referências dos corners ao último vértice, que vai
         # mudar de posição.
-        incidentCornersForLastV = self.__IncidentCorners[lastVertex]
-        for cornerIndex in incidentCornersForLastV:
-            self.__Corners[cornerIndex] = removedVertexIndex
-        
-        # removendo o vértice da lista de incident corners.
-        self.__IncidentCorners[removedVertexIndex] = self.__IncidentCorners[lastVertex]
-        del self.__IncidentCorners[lastVertex]
-        
+        # as semi-arestas que contêm o último vértice mudam de chave.
+        if self.__HalfEdges is not None:
+            for cornerIndex in cornersOfLast:
+                self.__removeHalfEdge(self.cn(cornerIndex))
+                self.__removeHalfEdge(self.cp(cornerIndex))
+        for cornerIndex in cornersOfLast:
+            self.__Corners[cornerIndex] = v
+        if self.__HalfEdges is not None:
+            for cornerIndex in cornersOfLast:
+                self.__HalfEdges[self.__halfEdge(self.cn(cornerIndex))] = self.cn(cornerIndex)
+                self.__HalfEdges[self.__halfEdge(self.cp(cornerIndex))] = self.cp(cornerIndex)
+
+        # removendo o vértice dos corners incidentes.
+        incidentCorners[v] = incidentCorners[last]
+        del incidentCorners[last]
+
         # atualizando a quantidade de vértices.
         self.__NVertex -= 1
-        
-        # removendo os vértices vazios que sobraram.
-        for i in range(len(vertexMarkedForRemoval)):
-            self.removeVertex(vertexMarkedForRemoval[i][0], vertexMarkedForRemoval[i][1], vertexMarkedForRemoval[i][2])
-        
+
     # Função para remover triângulos a partir de seus índices
     # Argumentos:
     #       índices dos triângulos a serem removidos.
     def removeTriangles(self, trianglesToBeRemoved):
+        vertexMarkedForRemoval = self.__removeTrianglesSwap(trianglesToBeRemoved)
+
+        # removendo os vértices vazios que sobraram.
+        # (os índices dos vértices não mudam ao remover os elementos acima).
+        if vertexMarkedForRemoval:
+            self.removeVertices(vertexMarkedForRemoval)
+
+    # Remove os triângulos (swap com o último triângulo, um por vez),
+    # atualizando os corners opostos, os corners incidentes e o dicionário de
+    # semi-arestas.
+    # Argumentos:
+    #       trianglesToBeRemoved = índices dos triângulos.
+    #       elementAt = dicionário posição -> índice original dos triângulos
+    #       que mudaram de posição, atualizado a cada swap (None = não
+    #       atualizar; ver __indexMap).
+    # Retorna a lista dos vértices que ficaram sem nenhum corner.
+    def __removeTrianglesSwap(self, trianglesToBeRemoved, elementAt = None):
         # remove de baixo para cima.
         trianglesToBeRemoved.sort(reverse = True)
         
@@ -270,12 +752,24 @@ class CornerTable:
         # lista de vértices que serão marcados para remoção ao final da
         # função.
         vertexMarkedForRemoval = []
+
+        if self.__Incidence == 'lists':
+            incidentCorners = self.__getIncidentCorners()
+        elif self.__Incidence == 'corner':
+            vertexCorners = self.__getVertexCorners()
+            # vértices cujo corner armazenado foi removido e que não têm
+            # triângulo vizinho pelas arestas do vértice.
+            unresolvedVertices = []
+        else:
+            self.__IncidentCSR = None
+            # vértices dos triângulos removidos (podem ficar sem corners).
+            candidateVertices = []
         
         # removendo os triângulos e todos os seus corners.
         for triangleIndex in trianglesToBeRemoved:
             # se o índice do triângulo for maior do que a quantidade de
             # triângulos, significa que o triângulo não existe
-            if triangleIndex > self.__NTri:
+            if triangleIndex >= self.__NTri:
                 continue
             
             # corners do triangulo sendo removido
@@ -283,30 +777,73 @@ class CornerTable:
             c1 = triangleIndex * 3 + 1
             c2 = triangleIndex * 3 + 2
             
-            # removendo estes corners da lista de incident corners de cada 
-            # vértice respectivamente.
-            for cornerIndex in [c0, c1, c2]:
-                triangleVertexIndex = self.__Corners[cornerIndex]
-                for i in range(len(self.__IncidentCorners[triangleVertexIndex])):
-                    if self.__IncidentCorners[triangleVertexIndex][i] == cornerIndex:
-                        del self.__IncidentCorners[triangleVertexIndex][i]
-                        break
-                # se IncidentCorners[triangleVertexIndex] ficar vazio,
-                # este vértice tem que ser removido também.
-                if not self.__IncidentCorners[triangleVertexIndex]:
-                    vertexMarkedForRemoval.append(self.__Vertices[triangleVertexIndex])
-            
-            # atualizando os incident corners dos vértices dos corners do
-            # último triângulo (que vai mudar de posição).
-            for j in range(3):
-                lastCornerIndex = (self.__NTri - 1) * 3 + j
-                removedCornerIndex = triangleIndex * 3 + j
-                triangleVertexIndex = self.__Corners[lastCornerIndex]
-                for i in range(len(self.__IncidentCorners[triangleVertexIndex])):
-                    if self.__IncidentCorners[triangleVertexIndex][i] == lastCornerIndex:
-                        self.__IncidentCorners[triangleVertexIndex][i] = removedCornerIndex
-                        break
+            if self.__Incidence == 'lists':
+                # removendo estes corners da lista de incident corners de cada 
+                # vértice respectivamente.
+                for cornerIndex in [c0, c1, c2]:
+                    triangleVertexIndex = self.__Corners[cornerIndex]
+                    for i in range(len(incidentCorners[triangleVertexIndex])):
+                        if incidentCorners[triangleVertexIndex][i] == cornerIndex:
+                            del incidentCorners[triangleVertexIndex][i]
+                            break
+                    if self.__Stats is not None:
+                        self.__Stats.count('incidentDeletions')
+                        self.__Stats.count('incidentScans', i + 1)
+                    # se IncidentCorners[triangleVertexIndex] ficar vazio,
+                    # este vértice tem que ser removido também.
+                    if not incidentCorners[triangleVertexIndex]:
+                        vertexMarkedForRemoval.append(triangleVertexIndex)
+                
+                # atualizando os incident corners dos vértices dos corners do
+                # último triângulo (que vai mudar de posição).
+                for j in range(3):
+                    lastCornerIndex = (self.__NTri - 1) * 3 + j
+                    removedCornerIndex = triangleIndex * 3 + j
+                    triangleVertexIndex = self.__Corners[lastCornerIndex]
+                    for i in range(len(incidentCorners[triangleVertexIndex])):
+                        if incidentCorners[triangleVertexIndex][i] == lastCornerIndex:
+                            incidentCorners[triangleVertexIndex][i] = removedCornerIndex
+                            break
+            elif self.__Incidence == 'corner':
+                # se o corner armazenado de um vértice for removido, ele é
+                # substituído pelo corner do mesmo vértice em um triângulo
+                # vizinho (swing), em O(1). Os corners opostos ainda não foram
+                # desfeitos neste ponto.
+                for cornerIndex in [c0, c1, c2]:
+                    triangleVertexIndex = self.cv(cornerIndex)
+                    if vertexCorners[triangleVertexIndex] != cornerIndex:
+                        continue
+                    if self.__Stats is not None:
+                        self.__Stats.count('vertexCornerUpdates')
+                    replacement = self.cl(cornerIndex)
+                    if replacement >= 0:
+                        replacement = self.cn(replacement)
+                    else:
+                        replacement = self.cr(cornerIndex)
+                        if replacement >= 0:
+                            replacement = self.cp(replacement)
+                        else:
+                            unresolvedVertices.append(triangleVertexIndex)
+                    vertexCorners[triangleVertexIndex] = replacement
+                
+                # atualizando os corners armazenados dos vértices do último
+                # triângulo (que vai mudar de posição).
+                for j in range(3):
+                    lastCornerIndex = (self.__NTri - 1) * 3 + j
+                    triangleVertexIndex = self.cv(lastCornerIndex)
+                    if vertexCorners[triangleVertexIndex] == lastCornerIndex:
+                        vertexCorners[triangleVertexIndex] = triangleIndex * 3 + j
+            else:
+                candidateVertices.extend([self.cv(c0), self.cv(c1), self.cv(c2)])
             
+            # removendo as semi-arestas do triângulo removido e atualizando as
+            # do último triângulo (que vai mudar de posição).
+            if self.__HalfEdges is not None:
+                for j in range(3):
+                    self.__removeHalfEdge(triangleIndex * 3 + j)
+                for j in range(3):
+                    self.__moveHalfEdge((self.__NTri - 1) * 3 + j, triangleIndex * 3 + j)
+
             # removendo os corners dos opposite corners.
             if self.__OppositeCorners[c0] >= 0:
                 self.__OppositeCorners[self.__OppositeCorners[c0]] = -1
@@ -332,91 +869,335 @@ class CornerTable:
             self.__OppositeCorners[c0] = self.__OppositeCorners[(self.__NTri - 1) * 3 + 0]
             self.__OppositeCorners[c1] = self.__OppositeCorners[(self.__NTri - 1) * 3 + 1]
             self.__OppositeCorners[c2] = self.__OppositeCorners[(self.__NTri - 1) * 3 + 2]
-            del self.__Corners[(self.__NTri - 1) * 3 + 2]
-            del self.__Corners[(self.__NTri - 1) * 3 + 1]
-            del self.__Corners[(self.__NTri - 1) * 3 + 0]
-            del self.__OppositeCorners[(self.__NTri - 1) * 3 + 2]
-            del self.__OppositeCorners[(self.__NTri - 1) * 3 + 1]
-            del self.__OppositeCorners[(self.__NTri - 1) * 3 + 0]
+            self.__Corners.truncate((self.__NTri - 1) * 3)
+            self.__OppositeCorners.truncate((self.__NTri - 1) * 3)
             
+            if elementAt is not None:
+                moved = elementAt.pop(self.__NTri - 1, self.__NTri - 1)
+                if triangleIndex != self.__NTri - 1:
+                    elementAt[triangleIndex] = moved
+
             # atualizando a quantidade de triângulos.
             self.__NTri -= 1
         
-        # removendo os vértices vazios que sobraram.
-        for i in range(len(vertexMarkedForRemoval)):
-            self.removeVertex(vertexMarkedForRemoval[i][0], vertexMarkedForRemoval[i][1], vertexMarkedForRemoval[i][2])
+        if self.__Incidence == 'corner' and unresolvedVertices:
+            # busca (vetorizada) por algum corner restante destes vértices,
+            # que pode estar em outro leque de triângulos (vértice
+            # não-manifold); os que não têm nenhum são removidos.
+            unresolvedVertices = np.asarray(unresolvedVertices, dtype=np.int64)
+            corners = self.__Corners.view()
+            remaining = np.flatnonzero(np.isin(corners, unresolvedVertices))
+            vertexCorners.view()[corners[remaining]] = remaining
+            vertexMarkedForRemoval = unresolvedVertices[vertexCorners.view()[unresolvedVertices] < 0].tolist()
+        elif self.__Incidence == 'csr' and candidateVertices:
+            # vértices que não aparecem em nenhum corner restante.
+            candidateVertices = np.asarray(candidateVertices, dtype=np.int64)
+            counts = np.bincount(self.__Corners.view(), minlength=self.__NVertex)
+            vertexMarkedForRemoval = np.unique(candidateVertices[counts[candidateVertices] == 0]).tolist()
+
+        return vertexMarkedForRemoval
+
+    # Função para remover vários triângulos de uma só vez.
+    # Em vez de remover um triângulo por vez (swap com o último), todos os
+    # triângulos marcados são removidos e os arrays de corners, corners opostos
+    # e vértices são compactados em uma única passada, mantendo a ordem
+    # relativa dos elementos que sobraram. Os vértices que ficarem sem nenhum
+    # corner também são removidos.
+    # Argumentos:
+    #       trianglesToBeRemoved = máscara booleana com um valor para cada
+    #       triângulo, ou array com os índices dos triângulos a serem removidos
+    #       (índices inexistentes são ignorados).
+    # Retorna os mapas de índices antigos -> novos dos triângulos e dos vértices
+    # (-1 para os elementos removidos).
+    def removeTrianglesBulk(self, trianglesToBeRemoved):
+        trianglesToBeRemoved = np.asarray(trianglesToBeRemoved)
+        if trianglesToBeRemoved.dtype == bool:
+            if trianglesToBeRemoved.shape != (self.__NTri,):
+                raise Exception("Mask size does not match the number of triangles")
+            removed = trianglesToBeRemoved
+        else:
+            indices = trianglesToBeRemoved.astype(np.int64).reshape(-1)
+            removed = np.zeros(self.__NTri, dtype=bool)
+            removed[indices[(indices >= 0) & (indices < self.__NTri)]] = True
+        return self.__compact(removed, np.zeros(self.__NVertex, dtype=bool))
+
+    # Remove os triângulos marcados em removed e os vértices marcados em
+    # removedVertices (além dos vértices que ficarem sem nenhum corner),
+    # compactando os arrays em uma única passada.
+    def __compact(self, removed, removedVertices):
+        if self.__Stats is not None:
+            self.__Stats.count('compactions')
+        kept = ~removed
+
+        corners = self.__Corners.view().reshape((-1, 3))
+        opposite = self.__OppositeCorners.view().reshape((-1, 3))
+
+        # mapas de índices dos triângulos e dos corners.
+        elementMap = np.full(self.__NTri, -1, dtype=np.int64)
+        elementMap[kept] = np.arange(np.count_nonzero(kept))
+        cornerMap = elementMap[:, None] * 3 + np.arange(3)
+        cornerMap[removed] = -1
+        cornerMap = cornerMap.reshape(-1)
+
+        # vértices usados apenas pelos triângulos removidos ficam sem nenhum
+        # corner, e também são removidos (além dos vértices marcados).
+        usedBefore = np.bincount(corners.reshape(-1), minlength=self.__NVertex) > 0
+        usedAfter = np.bincount(corners[kept].reshape(-1), minlength=self.__NVertex) > 0
+        keptVertices = (usedAfter | ~usedBefore) & ~removedVertices
+        vertexMap = np.full(self.__NVertex, -1, dtype=np.int64)
+        vertexMap[keptVertices] = np.arange(np.count_nonzero(keptVertices))
+
+        # compactando os arrays.
+        newCorners = vertexMap[corners[kept].reshape(-1)]
+        newOpposite = opposite[kept].reshape(-1)
+        newOpposite = np.where(newOpposite >= 0, cornerMap[newOpposite], -1)
+        newVertices = self.__Vertices.view()[keptVertices]
+        self.__Corners.truncate(0)
+        self.__Corners.extend(newCorners)
+        self.__OppositeCorners.truncate(0)
+        self.__OppositeCorners.extend(newOpposite)
+        self.__Vertices.truncate(0)
+        self.__Vertices.extend(newVertices)
+        self.__NTri = newCorners.shape[0] // 3
+        self.__NVertex = newVertices.shape[0]
+
+        self.__invalidateIndices()
+        return elementMap, vertexMap
+
+    # Remove os triângulos marcados em removed e os vértices marcados em
+    # removedVertices (além dos vértices que ficarem sem nenhum corner) em
+    # uma única passada vetorizada: as posições removidas são preenchidas
+    # pelos últimos elementos (como no swap com o último), e apenas as
+    # entradas do hash grid e do dicionário de semi-arestas que mudam são
+    # atualizadas. Os corners incidentes são descartados uma única vez (e
+    # reconstruídos sob demanda).
+    def __fillRemoved(self, removed, removedVertices):
+        nTriangles = self.__NTri
+        nVertex = self.__NVertex
+        corners = self.__Corners.view()
+        opposite = self.__OppositeCorners.view()
+
+        # vértices usados apenas pelos triângulos removidos ficam sem nenhum
+        # corner, e também são removidos.
+        removedCorners = (np.flatnonzero(removed)[:, None] * 3 + np.arange(3)).reshape(-1)
+        usedBefore = np.bincount(corners, minlength=nVertex) > 0
+        usedAfter = np.bincount(np.delete(corners, removedCorners), minlength=nVertex) > 0
+        removedVertices = removedVertices | (usedBefore & ~usedAfter)
+
+        # os triângulos mantidos no final passam para as posições removidas
+        # do início.
+        size = nTriangles - removedCorners.shape[0] // 3
+        holes = np.flatnonzero(removed[:size])
+        movers = np.flatnonzero(~removed[size:]) + size
+        holeCorners = (holes[:, None] * 3 + np.arange(3)).reshape(-1)
+        moverCorners = (movers[:, None] * 3 + np.arange(3)).reshape(-1)
+
+        # semi-arestas dos triângulos removidos e dos que mudam de posição.
+        if self.__HalfEdges is not None:
+            for cornerIndex in removedCorners.tolist():
+                self.__removeHalfEdge(cornerIndex)
+            for oldCorner, newCorner in zip(moverCorners.tolist(), holeCorners.tolist()):
+                self.__moveHalfEdge(oldCorner, newCorner)
+
+        # desfazendo os corners opostos dos triângulos removidos e
+        # atualizando os dos triângulos que mudam de posição.
+        cornerMap = np.arange(nTriangles * 3, dtype=np.int64)
+        cornerMap[removedCorners] = -1
+        cornerMap[moverCorners] = holeCorners
+        neighbors = opposite[removedCorners]
+        opposite[neighbors[neighbors >= 0]] = -1
+        newOpposite = opposite[moverCorners]
+        newOpposite = np.where(newOpposite >= 0, cornerMap[newOpposite], -1)
+        opposite[holeCorners] = newOpposite
+        opposite[newOpposite[newOpposite >= 0]] = holeCorners[newOpposite >= 0]
+        corners[holeCorners] = corners[moverCorners]
+        self.__Corners.truncate(size * 3)
+        self.__OppositeCorners.truncate(size * 3)
+        self.__NTri = size
+
+        # os vértices mantidos no final passam para as posições removidas do
+        # início.
+        vertexSize = nVertex - np.count_nonzero(removedVertices)
+        vertexHoles = np.flatnonzero(removedVertices[:vertexSize])
+        vertexMovers = np.flatnonzero(~removedVertices[vertexSize:]) + vertexSize
+        if self.__VertexGrid is not None and self.__VertexGridValid:
+            vertices = self.__Vertices.view()
+            for v in np.flatnonzero(removedVertices).tolist():
+                self.__VertexGrid.remove(vertices[v, 0], vertices[v, 1], vertices[v, 2], v)
+            for last, v in zip(vertexMovers.tolist(), vertexHoles.tolist()):
+                self.__VertexGrid.move(vertices[last, 0], vertices[last, 1], vertices[last, 2], last, v)
+        self.__Vertices.view()[vertexHoles] = self.__Vertices.view()[vertexMovers]
+        self.__Vertices.truncate(vertexSize)
+        self.__NVertex = vertexSize
+
+        # atualizando as referências dos corners aos vértices que mudaram de
+        # posição (as semi-arestas que contêm estes vértices mudam de chave).
+        vertexMap = np.arange(nVertex, dtype=np.int64)
+        vertexMap[removedVertices] = -1
+        vertexMap[vertexMovers] = vertexHoles
+        corners = self.__Corners.view()
+        changed = np.flatnonzero(corners >= vertexSize)
+        if self.__HalfEdges is not None:
+            affected = np.unique(np.concatenate((self.cnArray(changed), self.cpArray(changed)))).tolist()
+            for cornerIndex in affected:
+                self.__removeHalfEdge(cornerIndex)
+            corners[changed] = vertexMap[corners[changed]]
+            for cornerIndex in affected:
+                self.__HalfEdges[self.__halfEdge(cornerIndex)] = cornerIndex
+        else:
+            corners[changed] = vertexMap[corners[changed]]
+
+        self.__IncidentCorners = None
+        self.__IncidentCSR = None
+        self.__VertexCorners = None
+
+        elementMap = np.arange(nTriangles, dtype=np.int64)
+        elementMap[removed] = -1
+        elementMap[movers] = holes
+        return elementMap, vertexMap
+
+    # métodos públicos cujo tempo é medido quando as estatísticas estão
+    # habilitadas.
+    __timedMethods = ('insertTriangle', 'findVertex', 'removeVertex', 'removeVerticesAt', 'removeVertices',
+                      'removeTriangles', 'removeTrianglesBulk', 'incidentCorners', 'incidentCornersArray',
+                      'vertexRingsArray', 'adjacency', 'laplacian', 'getFullCornerTable', 'save')
+
+    # Habilita as estatísticas de uso (ver stats.Stats): contadores de buscas
+    # de vértices (vertexLookups) e de vértices comparados nas buscas
+    # (vertexComparisons), de consultas e pares encontrados ao calcular os
+    # corners opostos (oppositeLookups, oppositeMatches), de remoções e de
+    # posições percorridas nas listas de corners incidentes
+    # (incidentDeletions, incidentScans), de substituições do corner
+    # armazenado no modo 'corner' (vertexCornerUpdates) e de compactações dos
+    # arrays (compactions), além da quantidade de chamadas e do tempo
+    # acumulado de cada método público.
+    # Com as estatísticas desabilitadas (padrão), os métodos não são
+    # substituídos e os contadores custam apenas uma comparação com None.
+    # Argumentos:
+    #       statistics = objeto stats.Stats a ser usado (por exemplo,
+    #       compartilhado entre várias corner tables); se None, um novo objeto
+    #       é criado.
+    # Retorna o objeto stats.Stats.
+    def enableStats(self, statistics = None):
+        self.disableStats()
+        self.__Stats = statistics if statistics is not None else stats.Stats()
+        stats.instrument(self, self.__timedMethods, self.__Stats)
+        return self.__Stats
+
+    # Desabilita as estatísticas de uso.
+    def disableStats(self):
+        stats.uninstrument(self, self.__timedMethods)
+        self.__Stats = None
+
+    # Retorna o objeto stats.Stats (None se as estatísticas estão
+    # desabilitadas).
+    def getStats(self):
+        return self.__Stats
 
     # Gerar a corner table completa.
-    def getFullCornerTable(self):
-        fullCornerTable = []
-        for c in range(len(self.__Corners)):
-            fullCornerTable.append(
-                [
-                    c,
-                    self.cv(c),
-                    self.ct(c),
-                    self.cn(c),
-                    self.cp(c),
-                    self.co(c),
-                    self.cl(c),
-                    self.cr(c)
-                ]
-            )
+    # Todas as colunas (c, v, t, n, p, o, l, r) são calculadas de uma vez
+    # com os operadores vetorizados.
+    # Argumentos:
+    #       structured = se verdadeiro, retorna um array estruturado com os
+    #       campos 'c', 'cv', 'ct', 'cn', 'cp', 'co', 'cl', 'cr', em vez de
+    #       um array (nCorners, 8).
+    def getFullCornerTable(self, structured = False):
+        c = np.arange(len(self.__Corners), dtype=np.int32)
+        columns = [
+            c,
+            self.cvArray(c),
+            self.ctArray(c),
+            self.cnArray(c),
+            self.cpArray(c),
+            self.coArray(c),
+            self.clArray(c),
+            self.crArray(c)
+        ]
+        if structured:
+            fullCornerTable = np.empty(c.shape[0], dtype=[(name, np.int32) for name in ('c', 'cv', 'ct', 'cn', 'cp', 'co', 'cl', 'cr')])
+            for name, column in zip(fullCornerTable.dtype.names, columns):
+                fullCornerTable[name] = column
+        else:
+            fullCornerTable = np.empty((c.shape[0], 8), dtype=np.int32)
+            for i in range(8):
+                fullCornerTable[:, i] = columns[i]
         return fullCornerTable
 
-    # Função para plotar a mesh que compõe uma corner table
+    # Views somente-leitura (sem cópia) dos arrays internos da corner table:
+    # posições dos vértices (NVertex, 3), corners (cv) e corners opostos (co).
+    # As views deixam de ser válidas se a corner table for modificada.
+    def getStorageView(self):
+        views = (self.__Vertices.view().view(), self.__Corners.view().view(), self.__OppositeCorners.view().view())
+        for view in views:
+            view.flags.writeable = False
+        return views
+
+    # Função para salvar a corner table em um arquivo binário (ver
+    # storage.saveArrays): eps, posições dos vértices, corners e corners
+    # opostos, e opcionalmente os corners incidentes em cada vértice no
+    # formato CSR.
+    # Argumentos:
+    #       path = caminho do arquivo.
+    #       incidentCorners = se verdadeiro, salva também os corners
+    #       incidentes, que deixam de ser calculados ao carregar o arquivo.
+    def save(self, path, incidentCorners = False):
+        arrays = [
+            ('eps', np.asarray([self.__eps], dtype=np.float64)),
+            ('vertices', self.__Vertices.view()),
+            ('corners', self.__Corners.view()),
+            ('opposite', self.__OppositeCorners.view())
+        ]
+        if incidentCorners:
+            offsets, order = self.__getIncidentCSR()
+            arrays += [('incoffsets', offsets), ('incorners', order)]
+        storage.saveArrays(path, b'CTABLE2D', arrays)
+
+    # Função para carregar uma corner table salva com save.
+    # Com mmap, a corner table abre sem reconstrução (as estruturas auxiliares
+    # são construídas sob demanda) e os arrays podem ser compartilhados entre
+    # processos. Os arrays são copiados apenas na primeira modificação.
+    # Argumentos:
+    #       path = caminho do arquivo.
+    #       mmap = se verdadeiro, os arrays são abertos com numpy.memmap
+    #       (sem cópia e sem reconstrução); caso contrário são lidos para a
+    #       memória.
+    #       vertexIndex, incidence = mesmos argumentos do construtor (o eps é
+    #       lido do arquivo).
+    @classmethod
+    def load(cls, path, mmap = True, vertexIndex = 'hash', incidence = 'lists'):
+        arrays = storage.loadArrays(path, b'CTABLE2D', mmap)
+        corners = arrays['corners']
+        if corners.shape[0] % 3 != 0 or arrays['opposite'].shape != corners.shape:
+            raise Exception("Invalid corner table file: " + str(path))
+
+        table = cls(float(arrays['eps'][0]), vertexIndex, incidence = incidence)
+        table.__NTri = corners.shape[0] // 3
+        table.__Corners = storage.GrowableArray.fromArray(corners, np.int32)
+        table.__OppositeCorners = storage.GrowableArray.fromArray(arrays['opposite'], np.int32)
+        table.__NVertex = arrays['vertices'].shape[0]
+        table.__Vertices = storage.GrowableArray.fromArray(arrays['vertices'], np.float64, 3)
+        table.__invalidateIndices()
+        if 'incoffsets' in arrays and incidence != 'corner':
+            table.__IncidentCSR = (arrays['incoffsets'], arrays['incorners'])
+        return table
+
+    # Função para plotar a mesh que compõe uma corner table (a superfície dos
+    # triângulos é desenhada com um único plot_trisurf; ver
+    # visualization.plotMesh).
     # Argumentos:
-    #       titleString = título do plot.
+    #       title = título do plot.
     #       displayLabels = true ou false, habilitar desenho dos labels no plot.
-    def plotCornerTableMesh(self, title = None, displayLabels = False):
-        vertices = np.asarray(self.__Vertices)
-        indexes = np.asarray(self.__Corners).reshape((self.__NTri, 3))
-
-        # Exibindo a mesh.
-        fig = plt.figure()
-        ax = fig.add_subplot(111, projection='3d')
-        ax.plot_trisurf(vertices[:, 0], vertices[:,1], triangles = indexes, Z = vertices[:,2])
-
-        # Desenhando as labels dos vértices/corners.
-        if displayLabels:
-            # Plotando os labels dos vértices.
-            for i in range(self.__NVertex):
-                coord = self.__Vertices[i]
-                ax.text(coord[0],coord[1],coord[2], 'v'+str(i), color = 'blue' , fontweight = 'bold', horizontalalignment = 'center')
-            # Plotando os labels dos corners.
-            for i in range(len(self.__Corners)):
-                c = i
-                cn = self.cn(c)
-                cp = self.cp(c)
-                v = self.cv(c)
-                vn = self.cv(cn)
-                vp = self.cv(cp)
-                coord = np.asarray(self.__Vertices[v])
-                coordn = np.asarray(self.__Vertices[vn])
-                coordp = np.asarray(self.__Vertices[vp])
-
-                coordtext = ((coordn - coord) + (coordp - coord)) / 10 + coord
-                ax.text(coordtext[0],coordtext[1],coordtext[2],'c'+str(c), color = 'red', fontweight = 'normal', horizontalalignment = 'center')
-            # Plotando os labels dos triângulos.
-            for i in range(self.__NTri):
-                c1 = i * 3
-                c2 = self.cn(c1)
-                c3 = self.cp(c1)
-                v1 = self.cv(c1)
-                v2 = self.cv(c2)
-                v3 = self.cv(c3)
-                coord1 = np.asarray(self.__Vertices[v1])
-                coord2 = np.asarray(self.__Vertices[v2])
-                coord3 = np.asarray(self.__Vertices[v3])
-
-                coordtext = (coord1 + coord2 + coord3) / 3
-                ax.text(coordtext[0],coordtext[1],coordtext[2],'t'+str(i), color = 'black' , fontweight = 'bold', horizontalalignment = 'center')
-
-        # Adicionando título e nomes dos eixos.
-        if title:
-            ax.set_title(title)
-        ax.set_xlabel('x')
-        ax.set_ylabel('y')
-        ax.set_zlabel('z')
-        plt.show()
+    #       filename = se informado, o plot é salvo neste arquivo (por exemplo
+    #       'mesh.png') sem abrir uma janela, em vez de plt.show().
+    #       maxLabels = quantidade máxima de labels de vértices, de corners e
+    #       de elementos (acima disso, apenas uma amostra uniforme é
+    #       desenhada; None = sem limite).
+    # O módulo visualization (e o matplotlib) é importado apenas ao chamar
+    # esta função, de forma que importar a corner table não carrega o
+    # matplotlib.
+    def plotCornerTableMesh(self, title = None, displayLabels = False, filename = None, maxLabels = 500):
+        import visualization
+        vertices = self.__Vertices.view()
+        indexes = self.__Corners.view().reshape((self.__NTri, 3))
+        visualization.plotMesh(vertices, indexes, None, title, displayLabels, filename, maxLabels)
 
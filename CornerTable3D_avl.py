@@ -4,8 +4,11 @@
 #########################
 
 import numpy as np
-import matplotlib.pyplot as plt
+import storage
 import avl
+import stats
+import tetreader
+from CornerTable3D import oppositeCornersFromTetrahedra, orientTetrahedra
 
 class CornerTable3D:
     # Para a estrutura de corner table é necessário armazenar, para cada corner:
@@ -13,7 +16,8 @@ class CornerTable3D:
     #       co (índice do corner oposto);
     # e, para cada vértice, armazenar a posição (x,y,z) do vértice.
     # Estamos armazenando também os corners incidentes em cada vértice
-    # para facilitar os cálculos de corner oposto.
+    # para facilitar a remoção de tetraedros e as consultas em torno de um
+    # vértice.
     # Além disso, uma árvore AVL é utilizada em paralelo à lista de vértices. Isso
     # significa que cada vértice é armazenado duas vezes, uma vez na lista de vértices e outra
     # na árvore. Para cada vértice, o nó da árvore AVL informa o índice do vértice na lista de vértices.
@@ -22,16 +26,78 @@ class CornerTable3D:
     # Outro motivo para utilizar uma árvore AVL em paralelo é para não alterar
     # a estrutura original da corner table: cv e co ficam intactos.
 
-    __NTetr = 0 # Quantidade de tetraedros na corner table.
-    __Corners = [] # Lista de corners (índices dos vértices / cv).
-    __OppositeCorners = [] # Lista de corners opostos (co).
+    # Todo o estado da corner table é criado por instância, de forma que
+    # várias corner tables podem existir ao mesmo tempo (inclusive em threads
+    # diferentes) sem compartilhar as listas.
+    # Argumentos:
+    #       eps = erro admitido para ponto flutuante (dois vértices a menos de
+    #       eps em cada eixo são considerados o mesmo vértice).
+    #       vertexIndex = estrutura utilizada para buscar os vértices pela
+    #       posição: apenas 'avl' (árvore AVL); o argumento existe para que os
+    #       argumentos em comum com CornerTable3D tenham a mesma ordem.
+    #       expectedVertices, expectedTetrahedra = quantidade esperada de
+    #       vértices e tetraedros, usada para pré-alocar os arrays e evitar
+    #       realocações ao construir malhas grandes.
+    #       incidence = representação dos corners incidentes em cada vértice:
+    #           'lists' (uma lista do python por vértice);
+    #           'csr' (offsets + array de corners, construído em uma única
+    #           passada vetorizada e reconstruído após qualquer modificação,
+    #           indicado para malhas estáticas);
+    #           'corner' (apenas um corner incidente por vértice, atualizado
+    #           em O(1); os demais são encontrados percorrendo os tetraedros
+    #           vizinhos com co, indicado para malhas dinâmicas).
+    #       A escolha é um compromisso entre memória e tempo das consultas:
+    #       'lists' (o padrão) é o mais rápido para percorrer os corners de um
+    #       vértice, mas ocupa cerca de 900 bytes por vértice em objetos do
+    #       python; 'csr' ocupa cerca de 100 bytes por vértice, mas é
+    #       reconstruído a cada modificação; 'corner' ocupa 4 bytes por vértice
+    #       e é o indicado para malhas grandes, ao custo de consultas mais
+    #       lentas. O dicionário de faces (cerca de 200 bytes por corner) não
+    #       depende desta opção: ele é construído sob demanda ao inserir
+    #       tetraedros.
+    #       nodePool = (apenas por nome) se verdadeiro, a árvore de vértices
+    #       guarda os nós em arrays contíguos (avl.AVLTreeArray), ocupando bem
+    #       menos memória em malhas com milhões de vértices.
+    def __init__(self, eps = avl.eps, vertexIndex = 'avl', expectedVertices = 0, expectedTetrahedra = 0, incidence = 'lists', *, nodePool = False):
+        if vertexIndex != 'avl':
+            raise Exception("Unknown vertex index: " + str(vertexIndex))
+        self.__eps = eps # Erro admitido para ponto flutuante.
+
+        self.__NTetr = 0 # Quantidade de tetraedros na corner table.
+        self.__Corners = storage.GrowableArray(np.int32, capacity = 4 * expectedTetrahedra) # Array de corners (índices dos vértices / cv).
+        self.__OppositeCorners = storage.GrowableArray(np.int32, capacity = 4 * expectedTetrahedra) # Array de corners opostos (co).
+
+        self.__NVertex = 0 # Quantidade de vértices na lista de vértices.
+        self.__Vertices = storage.GrowableArray(np.float64, 3, expectedVertices) # Array (NVertex, 3) de posições dos vértices.
 
-    __NVertex = 0 # Quantidade de vértices na lista de vértices.
-    __Vertices = [] # Lista de posições dos vértices.
+        if incidence not in ('lists', 'csr', 'corner'):
+            raise Exception("Unknown incidence: " + str(incidence))
+        self.__Incidence = incidence
+        # Lista de corners incidentes em cada vértice, usada no modo 'lists'
+        # (None = construída sob demanda).
+        self.__IncidentCorners = [] if incidence == 'lists' else None
+        # Corners incidentes no formato CSR (offsets, corners): no modo 'csr',
+        # construídos sob demanda; no modo 'lists', carregados de um arquivo
+        # por load e usados para construir a lista acima sob demanda (None se
+        # não existirem).
+        self.__IncidentCSR = None
+        # Um corner incidente em cada vértice (-1 se o vértice não tem corners),
+        # usado no modo 'corner' (None = construído sob demanda).
+        self.__VertexCorners = storage.GrowableArray(np.int32, capacity = expectedVertices) if incidence == 'corner' else None
 
-    __IncidentCorners = [] # Lista de corners incidentes em cada vértice.
+        # Índices dos tetraedros degenerados mantidos por fromArrays (ver
+        # getDegenerateTetrahedra).
+        self.__Degenerate = np.empty(0, dtype=np.int64)
 
-    __SortedVertices = avl.AVLTree() # Árvore com os vértices ordenados, para acelerar a busca.
+        # Dicionário de faces: face oposta ao corner c (orientada para fora do
+        # tetraedro) -> c, usado para encontrar o corner oposto em O(1) ao
+        # inserir um tetraedro. None significa que o dicionário ainda não foi
+        # construído (ele é construído sob demanda).
+        self.__Faces = {}
+
+        self.__NodePool = nodePool
+        self.__Stats = None # Estatísticas de uso (None = desabilitadas, ver enableStats).
+        self.__SortedVertices = self.__newVertexTree(expectedVertices) # Árvore com os vértices ordenados, para acelerar a busca (None = construída sob demanda).
 
     # o tetraedro está sendo armazenado na seguinte ordem:
     #           B
@@ -45,62 +111,53 @@ class CornerTable3D:
     # se eu faço o produto vetorial de AC com AD, o vetor resultante deve estar na direção de B.
     # significa que o produto escalar do vetor resultante com AB deve ser positivo.
 
+    # o produto misto é calculado com escalares do python, sem criar arrays
+    # do numpy para cada tetraedro (ver orientTetrahedra para a versão
+    # vetorizada).
     def __checkOrientation(self, x0, y0, z0, x1, y1, z1, x2, y2, z2, x3, y3, z3):
-        A = np.asarray([x0, y0, z0])
-        B = np.asarray([x1, y1, z1])
-        C = np.asarray([x2, y2, z2])
-        D = np.asarray([x3, y3, z3])
-        AB = B-A
-        AC = C-A
-        AD = D-A
-        return np.sign(np.dot(AB, np.cross(AC, AD)))
+        abx, aby, abz = x1 - x0, y1 - y0, z1 - z0
+        acx, acy, acz = x2 - x0, y2 - y0, z2 - z0
+        adx, ady, adz = x3 - x0, y3 - y0, z3 - z0
+        volume = abx * (acy * adz - acz * ady) + aby * (acz * adx - acx * adz) + abz * (acx * ady - acy * adx)
+        return int(volume > 0) - int(volume < 0)
 
     # look-up table para verificar tetraedros vizinhos.
-    # para cada vértice, lista as 3 faces que o vértice compõe.
-    # em cada face os vértices estão em sentido anti-horário (para fora, regra da mão direita).
-    __face_lut = np.asarray(
-        [
-            [[2, 1], [1, 3], [3, 2]],
-            [[3, 0], [0, 2], [2, 3]],
-            [[1, 0], [0, 3], [3, 1]],
-            [[1, 2], [2, 0], [0, 1]]
-        ], dtype=np.int32)
-
-    __opposite_lut = np.asarray(
-        [
-            [3, 2, 1],
-            [2, 3, 0],
-            [3, 1, 0],
-            [0, 1, 2]
-        ], dtype=np.int32)
+    # para cada corner, lista os vértices da face oposta ao corner.
+    # os vértices estão em sentido anti-horário (para fora, regra da mão direita),
+    # de forma que duas faces vizinhas possuem os mesmos vértices em sentidos
+    # contrários.
+    __face_opposite_lut = ((1, 2, 3), (0, 3, 2), (0, 1, 3), (0, 2, 1))
+
+    # Os operadores abaixo usam apenas aritmética inteira do python, sem
+    # passar pelo numpy, que tem um custo alto para escalares.
 
     # corner next.
     def cn(self, c):
-        return int(np.floor(c / 4) * 4 + np.mod(c + 1, 4))
+        return int(c // 4 * 4 + (c + 1) % 4)
     
     # corner previous.
     def cp(self, c):
-        return int(self.cn(self.cn(self.cn(c))))
+        return int(c // 4 * 4 + (c + 3) % 4)
 
     # obter o índice do tetraedro a partir do corner.
     def ct(self, c):
-        return int(np.floor(c / 4))
+        return int(c // 4)
 
     # corner A do tetraedro correspondente.
     def ca(self, c):
-        return int(self.ct(c) * 4 + 0)
+        return int(c // 4 * 4 + 0)
 
     # corner B do tetraedro correspondente.
     def cb(self, c):
-        return int(self.ct(c) * 4 + 1)
+        return int(c // 4 * 4 + 1)
 
     # corner C do tetraedro correspondente.
     def cc(self, c):
-        return int(self.ct(c) * 4 + 2)
+        return int(c // 4 * 4 + 2)
 
     # corner D do tetraedro correspondente.
     def cd(self, c):
-        return int(self.ct(c) * 4 + 3)
+        return int(c // 4 * 4 + 3)
 
     # # corner right.
     # def cr(self, c):
@@ -118,16 +175,389 @@ class CornerTable3D:
     def co(self, c):
         return int(self.__OppositeCorners[c])
 
+    # Versões vetorizadas dos operadores: recebem um array de corners e
+    # retornam um array com o resultado do operador para cada corner.
+
+    # corner next.
+    def cnArray(self, c):
+        c = np.asarray(c)
+        return c // 4 * 4 + (c + 1) % 4
+
+    # corner previous.
+    def cpArray(self, c):
+        c = np.asarray(c)
+        return c // 4 * 4 + (c + 3) % 4
+
+    # obter os índices dos tetraedros a partir dos corners.
+    def ctArray(self, c):
+        return np.asarray(c) // 4
+
+    # corner A do tetraedro correspondente.
+    def caArray(self, c):
+        return np.asarray(c) // 4 * 4 + 0
+
+    # corner B do tetraedro correspondente.
+    def cbArray(self, c):
+        return np.asarray(c) // 4 * 4 + 1
+
+    # corner C do tetraedro correspondente.
+    def ccArray(self, c):
+        return np.asarray(c) // 4 * 4 + 2
+
+    # corner D do tetraedro correspondente.
+    def cdArray(self, c):
+        return np.asarray(c) // 4 * 4 + 3
+
+    # obter os índices dos vértices correspondentes aos corners.
+    def cvArray(self, c):
+        return self.__Corners.view()[np.asarray(c)]
+
+    # opposite corner.
+    def coArray(self, c):
+        return self.__OppositeCorners.view()[np.asarray(c)]
+
+    # Função para buscar um vértice pela posição (x, y, z).
+    # Retorna o índice do vértice, ou -1 se não existir nenhum vértice a
+    # menos de eps da posição em cada eixo.
+    def findVertex(self, x, y, z):
+        return self.__inVertices(x, y, z)
+
     def __inVertices(self, x, y, z):
+        if self.__Stats is not None:
+            self.__Stats.count('vertexLookups')
         if self.__NVertex > 0:
-            # busca sobre a árvore para encontrar o vértice
-            # desejado.
-            node = self.__SortedVertices.find([x, y, z])
-            if node is not None:
-                return node.value
+            # busca sobre a árvore de todos os vértices a menos de eps do
+            # ponto em cada eixo (O(log n + k)), retornando o menor índice (o
+            # mesmo resultado da busca linear).
+            tree = self.__getSortedVertices()
+            if self.__Stats is None:
+                return min((value for key, value in tree.find_within([x, y, z], self.__eps)), default = -1)
+            visited = tree.visit_count
+            result = min((value for key, value in tree.find_within([x, y, z], self.__eps)), default = -1)
+            self.__Stats.count('vertexComparisons', tree.visit_count - visited)
+            return result
+        return -1
+
+    # face orientada oposta ao corner c, rotacionada para começar pelo menor
+    # índice de vértice (mantendo o sentido).
+    def __face(self, c):
+        t = c // 4 * 4
+        lut = self.__face_opposite_lut[c % 4]
+        a = int(self.__Corners[t + lut[0]])
+        b = int(self.__Corners[t + lut[1]])
+        d = int(self.__Corners[t + lut[2]])
+        if b < a and b <= d:
+            return (b, d, a)
+        if d < a and d < b:
+            return (d, a, b)
+        return (a, b, d)
+
+    # retorna o dicionário de faces, construindo-o a partir dos corners caso
+    # ainda não exista.
+    def __getFaces(self):
+        if self.__Faces is None:
+            c = np.arange(len(self.__Corners))
+            lut = np.asarray(self.__face_opposite_lut)[c % 4]
+            faces = self.__Corners.view()[c[:, None] // 4 * 4 + lut]
+            # rotacionando cada face para começar pelo menor índice.
+            rotation = (np.argmin(faces, axis=1)[:, None] + np.arange(3)) % 3
+            faces = np.take_along_axis(faces, rotation, axis=1)
+            self.__Faces = dict(zip(zip(faces[:, 0].tolist(), faces[:, 1].tolist(), faces[:, 2].tolist()), c.tolist()))
+        return self.__Faces
+
+    # remove a face do corner c do dicionário.
+    def __removeFace(self, c):
+        key = self.__face(c)
+        if self.__Faces.get(key) == c:
+            del self.__Faces[key]
+
+    # atualiza o dicionário quando o corner oldCorner passa a ser newCorner
+    # (swap com o último tetraedro).
+    def __moveFace(self, oldCorner, newCorner):
+        key = self.__face(oldCorner)
+        if self.__Faces.get(key) == oldCorner:
+            self.__Faces[key] = newCorner
+
+    # Descarta as estruturas auxiliares (lista de corners incidentes,
+    # árvore AVL de vértices e dicionário de faces) após os arrays de
+    # corners e de vértices serem substituídos. Elas são reconstruídas sob
+    # demanda, de forma que uma corner table carregada de um arquivo pode ser
+    # consultada sem nenhuma reconstrução.
+    def __invalidateIndices(self):
+        self.__IncidentCorners = None
+        self.__IncidentCSR = None
+        self.__VertexCorners = None
+        self.__Faces = None
+        self.__SortedVertices = None
+
+    # corners incidentes em cada vértice no formato CSR: os corners incidentes
+    # no vértice v são corners[offsets[v]:offsets[v + 1]].
+    def __incidentCornersCSR(self):
+        corners = self.__Corners.view()
+        order = np.argsort(corners, kind='stable').astype(np.int32)
+        offsets = np.zeros(self.__NVertex + 1, dtype=np.int64)
+        np.cumsum(np.bincount(corners, minlength=self.__NVertex), out=offsets[1:])
+        return offsets, order
+
+    # retorna a lista de corners incidentes em cada vértice, construindo-a
+    # caso ainda não exista.
+    def __getIncidentCorners(self):
+        if self.__IncidentCorners is None:
+            if self.__IncidentCSR is not None:
+                offsets, order = self.__IncidentCSR
+            else:
+                offsets, order = self.__incidentCornersCSR()
+            offsets = offsets.tolist()
+            order = order.tolist()
+            self.__IncidentCorners = [order[offsets[i]:offsets[i + 1]] for i in range(self.__NVertex)]
+            self.__IncidentCSR = None
+        return self.__IncidentCorners
+
+    # retorna os corners incidentes no formato CSR, construindo-os caso ainda
+    # não existam (no modo 'csr' eles são mantidos até a próxima modificação).
+    def __getIncidentCSR(self):
+        if self.__IncidentCSR is not None:
+            return self.__IncidentCSR
+        incidentCSR = self.__incidentCornersCSR()
+        if self.__Incidence == 'csr':
+            self.__IncidentCSR = incidentCSR
+        return incidentCSR
+
+    # retorna o array com um corner incidente em cada vértice, construindo-o
+    # caso ainda não exista.
+    def __getVertexCorners(self):
+        if self.__VertexCorners is None:
+            corners = self.__Corners.view()
+            vertexCorners = np.full(self.__NVertex, -1, dtype=np.int32)
+            # com vértices repetidos, qualquer um dos corners atribuídos serve.
+            vertexCorners[corners] = np.arange(corners.shape[0], dtype=np.int32)
+            self.__VertexCorners = storage.GrowableArray.fromArray(vertexCorners, np.int32)
+        return self.__VertexCorners
+
+    # corner do vértice v no tetraedro do corner c (-1 se o tetraedro não
+    # contém o vértice).
+    def __vertexCornerInTetrahedron(self, c, v):
+        t = c // 4 * 4
+        for j in range(4):
+            if self.__Corners[t + j] == v:
+                return t + j
         return -1
 
+    # Retorna os corners incidentes no vértice v (array do numpy).
+    # No modo 'corner', os corners são encontrados a partir do corner
+    # armazenado, passando pelos tetraedros vizinhos (ver vertexStar). Em
+    # vértices não-manifold (com mais de um grupo de tetraedros ligados por
+    # faces), apenas o grupo do corner armazenado é retornado.
+    # Argumentos:
+    #       v = índice do vértice.
+    def incidentCorners(self, v):
+        if self.__Incidence == 'lists':
+            return np.asarray(self.__getIncidentCorners()[v], dtype=np.int32)
+        if self.__Incidence == 'csr':
+            offsets, order = self.__getIncidentCSR()
+            return order[offsets[v]:offsets[v + 1]]
+        return np.fromiter(self.vertexStar(v), dtype=np.int32)
+
+    # Corners incidentes em todos os vértices de uma só vez, no formato CSR:
+    # os corners incidentes no vértice v são corners[offsets[v]:offsets[v + 1]].
+    def incidentCornersArray(self):
+        return self.__getIncidentCSR()
+
+    # um corner qualquer do vértice v (-1 se o vértice não tem corners).
+    def __vertexCorner(self, v):
+        if self.__Incidence == 'corner':
+            return int(self.__getVertexCorners()[v])
+        if self.__Incidence == 'lists':
+            incidentCorners = self.__getIncidentCorners()[v]
+            return incidentCorners[0] if incidentCorners else -1
+        offsets, order = self.__getIncidentCSR()
+        return int(order[offsets[v]]) if offsets[v + 1] > offsets[v] else -1
+
+    # Percorre os corners do vértice v, um em cada tetraedro ao redor do
+    # vértice, passando para os tetraedros vizinhos pelas 3 faces de cada
+    # tetraedro que contêm o vértice (co dos outros 3 corners). Apenas os
+    # corners opostos são consultados (nenhuma lista de corners incidentes é
+    # utilizada, exceto para encontrar o primeiro corner).
+    # Argumentos:
+    #       v = índice do vértice.
+    def vertexStar(self, v):
+        c = self.__vertexCorner(v)
+        if c < 0:
+            return
+        star = [c]
+        visited = {c // 4}
+        i = 0
+        while i < len(star):
+            c = star[i]
+            i += 1
+            yield c
+            for j in range(1, 4):
+                o = self.co(c // 4 * 4 + (c + j) % 4)
+                if o >= 0 and o // 4 not in visited:
+                    visited.add(o // 4)
+                    star.append(self.__vertexCornerInTetrahedron(o, v))
+
+    # corners dos vértices a e b no tetraedro do corner o, e o outro corner
+    # do tetraedro que não é o (nem de a, nem de b).
+    def __edgeStep(self, o, a, b):
+        t = o // 4 * 4
+        for j in range(4):
+            v = self.__Corners[t + j]
+            if v == a:
+                ca = t + j
+            elif v == b:
+                cb = t + j
+            elif t + j != o:
+                nextCorner = t + j
+        return ca, cb, nextCorner
+
+    # Percorre os tetraedros ao redor da aresta (cv(c0), cv(c1)), girando em
+    # torno da aresta pelas faces que a contêm. Para cada tetraedro, retorna o
+    # par de corners (corner de cv(c0), corner de cv(c1)), começando por
+    # (c0, c1) em uma aresta interior; em uma aresta de borda, começa pelo
+    # tetraedro de uma das bordas e segue até a outra.
+    # Argumentos:
+    #       c0, c1 = corners de um mesmo tetraedro.
+    def edgeStar(self, c0, c1):
+        a = self.cv(c0)
+        b = self.cv(c1)
+        t = c0 // 4 * 4
+        k0, k1 = [t + j for j in range(4) if t + j != c0 and t + j != c1]
+        # voltando até a borda (ou até dar a volta completa). O estado é
+        # (corner de a, corner de b, corner oposto à próxima face).
+        start = (c0, c1, k0)
+        ca, cb, nextCorner = c0, c1, k1
+        while True:
+            o = self.co(nextCorner)
+            if o < 0:
+                # borda: começa por este tetraedro, saindo pela outra face.
+                t = ca // 4 * 4
+                start = (ca, cb, [t + j for j in range(4) if t + j not in (ca, cb, nextCorner)][0])
+                break
+            ca, cb, nextCorner = self.__edgeStep(o, a, b)
+            if ca // 4 == c0 // 4:
+                break
+        ca, cb, nextCorner = start
+        first = ca // 4
+        while True:
+            yield ca, cb
+            o = self.co(nextCorner)
+            if o < 0:
+                return
+            ca, cb, nextCorner = self.__edgeStep(o, a, b)
+            if ca // 4 == first:
+                return
+
+    # Percorre os vértices vizinhos do vértice v (ligados a v por uma aresta
+    # de algum tetraedro), sem repetição (ver vertexStar).
+    # Argumentos:
+    #       v = índice do vértice.
+    def vertexRing(self, v):
+        ring = set()
+        for c in self.vertexStar(v):
+            t = c // 4 * 4
+            for j in range(4):
+                u = int(self.__Corners[t + j])
+                if u != v and u not in ring:
+                    ring.add(u)
+                    yield u
+
+    # Vizinhos de todos os vértices de uma só vez, no formato CSR: os
+    # vizinhos do vértice v são neighbors[offsets[v]:offsets[v + 1]], em ordem
+    # crescente de índice.
+    def vertexRingsArray(self):
+        tetrahedra = self.__Corners.view().reshape((-1, 4)).astype(np.int64)
+        # as 6 arestas de cada tetraedro, nos dois sentidos.
+        first, second = np.triu_indices(4, 1)
+        source = np.concatenate((tetrahedra[:, first], tetrahedra[:, second]), axis=1).reshape(-1)
+        target = np.concatenate((tetrahedra[:, second], tetrahedra[:, first]), axis=1).reshape(-1)
+        # cada aresta aparece uma vez para cada tetraedro que a contém
+        # (arestas degeneradas são ignoradas).
+        valid = source != target
+        nVertex = max(self.__NVertex, 1)
+        keys = np.sort(source[valid] * nVertex + target[valid])
+        distinct = np.ones(keys.shape[0], dtype=bool)
+        distinct[1:] = keys[1:] != keys[:-1]
+        keys = keys[distinct]
+        offsets = np.zeros(self.__NVertex + 1, dtype=np.int64)
+        np.cumsum(np.bincount(keys // nVertex, minlength=self.__NVertex), out=offsets[1:])
+        return offsets, (keys % nVertex).astype(np.int32)
+
+    # Matriz de adjacência vértice-vértice (scipy.sparse.csr_matrix
+    # (NVertex, NVertex), simétrica, com 1 em cada aresta), construída a partir
+    # dos vizinhos de todos os vértices (ver vertexRingsArray).
+    # O scipy é importado apenas ao chamar esta função.
+    def adjacency(self):
+        import scipy.sparse
+        offsets, neighbors = self.vertexRingsArray()
+        return scipy.sparse.csr_matrix((np.ones(neighbors.shape[0]), neighbors, offsets), shape=(self.__NVertex, self.__NVertex))
+
+    # Matriz laplaciana da malha, L = D - W (scipy.sparse.csr_matrix
+    # (NVertex, NVertex), simétrica), onde W são os pesos das arestas e D é a
+    # matriz diagonal com a soma dos pesos de cada vértice. Os pesos são
+    # calculados de uma só vez para todos os tetraedros.
+    # O scipy é importado apenas ao chamar esta função.
+    # Argumentos:
+    #       weights = 'uniform' (peso 1 em cada aresta) ou 'cotangent' (em
+    #       cada tetraedro, a aresta (i, j) recebe o peso
+    #       |e_kl| * cot(theta_kl) / 6, onde e_kl é a aresta oposta e theta_kl
+    #       é o ângulo diedral na aresta oposta).
+    def laplacian(self, weights = 'uniform'):
+        import scipy.sparse
+        if weights == 'uniform':
+            W = self.adjacency()
+        elif weights == 'cotangent':
+            tetrahedra = self.__Corners.view().reshape((-1, 4))
+            vertices = self.__Vertices.view()
+            # as 6 arestas (i, j) de cada tetraedro e as arestas opostas (k, l).
+            edges = np.asarray([(0, 1, 2, 3), (0, 2, 3, 1), (0, 3, 1, 2), (1, 2, 0, 3), (1, 3, 2, 0), (2, 3, 0, 1)])
+            i = tetrahedra[:, edges[:, 0]].reshape(-1)
+            j = tetrahedra[:, edges[:, 1]].reshape(-1)
+            k = vertices[tetrahedra[:, edges[:, 2]].reshape(-1)]
+            l = vertices[tetrahedra[:, edges[:, 3]].reshape(-1)]
+            # ângulo diedral na aresta (k, l), entre as faces (k, l, i) e
+            # (k, l, j): os vetores de k para i e para j são projetados no
+            # plano perpendicular à aresta.
+            edge = l - k
+            length = np.linalg.norm(edge, axis=1)
+            u = np.divide(edge, length[:, None], out=np.zeros_like(edge), where=length[:, None] > 0)
+            a = vertices[i] - k
+            b = vertices[j] - k
+            a -= np.einsum('ij,ij->i', a, u)[:, None] * u
+            b -= np.einsum('ij,ij->i', b, u)[:, None] * u
+            sine = np.abs(np.einsum('ij,ij->i', np.cross(a, b), u))
+            cotangent = np.divide(np.einsum('ij,ij->i', a, b), sine, out=np.zeros(i.shape[0]), where=sine > 0)
+            weight = length * cotangent / 6
+            W = scipy.sparse.coo_matrix((np.concatenate((weight, weight)), (np.concatenate((i, j)), np.concatenate((j, i)))), shape=(self.__NVertex, self.__NVertex)).tocsr()
+        else:
+            raise Exception("Unknown Laplacian weights: " + str(weights))
+        return (scipy.sparse.diags(np.asarray(W.sum(axis=1)).reshape(-1)) - W).tocsr()
+
+    # cria uma árvore AVL de vértices vazia.
+    def __newVertexTree(self, capacity = 0):
+        if self.__NodePool:
+            return avl.AVLTreeArray(capacity)
+        return avl.AVLTree()
+
+    # retorna a árvore AVL de vértices, construindo-a caso ainda não exista.
+    # A árvore é construída de uma só vez (já balanceada, sem rotações) a
+    # partir dos vértices ordenados lexicograficamente.
+    def __getSortedVertices(self):
+        if self.__SortedVertices is None:
+            vertices = self.__Vertices.view()
+            order = np.lexsort((vertices[:, 2], vertices[:, 1], vertices[:, 0]))
+            treeClass = avl.AVLTreeArray if self.__NodePool else avl.AVLTree
+            self.__SortedVertices = treeClass.from_sorted(vertices[order].tolist(), order.tolist())
+        return self.__SortedVertices
+
     def __insertVertex(self, x, y, z, corner):
+        if self.__Incidence == 'lists':
+            incidentCorners = self.__getIncidentCorners()
+        elif self.__Incidence == 'corner':
+            vertexCorners = self.__getVertexCorners()
+        else:
+            # o CSR é reconstruído na próxima consulta.
+            self.__IncidentCSR = None
         # verificando se o vértice já existe na lista.
         Position = self.__inVertices(x, y, z)
         if Position == -1:
@@ -135,14 +565,20 @@ class CornerTable3D:
             self.__Vertices.append([x, y, z])
             Position = self.__NVertex
             self.__NVertex += 1
-            # criando a lista de corners incidentes no vértice inserido.
-            self.__IncidentCorners.append([corner])
             # adicionando o vértice no dicionário.
-            self.__SortedVertices.insert([x, y, z], Position)
-        else:
+            self.__getSortedVertices().insert([x, y, z], Position)
+            # criando a lista de corners incidentes no vértice inserido.
+            if self.__Incidence == 'lists':
+                incidentCorners.append([corner])
+            elif self.__Incidence == 'corner':
+                vertexCorners.append(corner)
+        elif self.__Incidence == 'lists':
             # utilizando um vértice já existente.
             # atualizando a lista de corners incidentes no vértice inserido.
-            self.__IncidentCorners[Position].append(corner)
+            incidentCorners[Position].append(corner)
+        elif self.__Incidence == 'corner' and vertexCorners[Position] < 0:
+            # vértice existente que ainda não tinha nenhum corner.
+            vertexCorners[Position] = corner
         return Position
 
     # Função para inserir um tetraedro na corner table a partir das
@@ -151,7 +587,8 @@ class CornerTable3D:
     #       posições (x, y, z) de cada um dos 4 vértices.
     def insertTetrahedron(self, x0, y0, z0, x1, y1, z1, x2, y2, z2, x3, y3, z3):
         # verificando orientação dos vértices.
-        # se a orientação não estiver certa, faz swap dos vértices 1 e 2.
+        # se a orientação não estiver certa, faz swap dos vértices 1 e 2 (o
+        # que inverte o sinal do volume, sem precisar verificar de novo).
         if self.__checkOrientation(x0, y0, z0, x1, y1, z1, x2, y2, z2, x3, y3, z3) < 0:
             temp_x1 = x1
             temp_y1 = y1
@@ -162,8 +599,6 @@ class CornerTable3D:
             x2 = temp_x1
             y2 = temp_y1
             z2 = temp_z1
-        if self.__checkOrientation(x0, y0, z0, x1, y1, z1, x2, y2, z2, x3, y3, z3) < 0:
-            raise Exception("Wrong vertices order")
 
         # inserindo os vértices.
         Position0 = self.__insertVertex(x0, y0, z0, self.__NTetr * 4 + 0)
@@ -188,27 +623,104 @@ class CornerTable3D:
         self.__OppositeCorners.append(-1) # c.o 2
         self.__OppositeCorners.append(-1) # c.o 3
 
-        # calculando os corners opostos relativos aos vértices inseridos.
-        # sendo c0 e c1 dois corners incidentes no mesmo vértice,
-        # eu comparo cada face do tetraedro em c0 com cada face em c1.
-        # o corner vai ser oposto se as faces corresponderem.
-        for vertexIndex in [Position0, Position1, Position2, Position3]:
-            incidentCornersLength = len(self.__IncidentCorners[vertexIndex])
-            incidentCornersForV = self.__IncidentCorners[vertexIndex]
-            for incidentCornerIndex1 in range(incidentCornersLength):
-                for incidentCornerIndex2 in range(incidentCornersLength):
-                    ic1 = incidentCornersForV[incidentCornerIndex1] # corner
-                    ic2 = incidentCornersForV[incidentCornerIndex2]
-                    it1 = self.ct(ic1) # tetraedro
-                    it2 = self.ct(ic2)
-                    icl1 = ic1 - it1 * 4 # corner local (em referência ao tetraedro)
-                    icl2 = ic2 - it2 * 4
-                    for f1 in range(3): # comparando cada face de um corner com cada face do outro corner
-                        for f2 in range(3):
-                            if self.__Corners[it1 * 4 + self.__face_lut[icl1][f1][0]] == self.__Corners[it2 * 4 + self.__face_lut[icl2][f2][1]] and self.__Corners[it1 * 4 + self.__face_lut[icl1][f1][1]] == self.__Corners[it2 * 4 + self.__face_lut[icl2][f2][0]]:
-                                self.__OppositeCorners[it1 * 4 + self.__opposite_lut[icl1][f1]] = it2 * 4 + self.__opposite_lut[icl2][f2]
-                                self.__OppositeCorners[it2 * 4 + self.__opposite_lut[icl2][f2]] = it1 * 4 + self.__opposite_lut[icl1][f1]
+        # calculando os corners opostos dos corners inseridos.
+        # o corner c é oposto a uma face do tetraedro, e o seu corner oposto é
+        # o corner do tetraedro vizinho cuja face tem os mesmos vértices em
+        # sentido contrário, que é buscada no dicionário de faces.
+        faces = self.__getFaces()
+        for c in range((self.__NTetr - 1) * 4, self.__NTetr * 4):
+            a, b, d = self.__face(c)
+            if a == b or b == d or a == d:
+                continue
+            o = faces.get((a, d, b))
+            if self.__Stats is not None:
+                self.__Stats.count('oppositeLookups')
+                self.__Stats.count('oppositeMatches', o is not None)
+            if o is not None:
+                # em faces não-manifold, desfaz o par anterior do corner o.
+                if self.__OppositeCorners[o] >= 0:
+                    self.__OppositeCorners[self.__OppositeCorners[o]] = -1
+                self.__OppositeCorners[c] = o
+                self.__OppositeCorners[o] = c
+            faces[(a, b, d)] = c
+
+    # Função para construir uma corner table a partir de arrays de vértices e
+    # tetraedros, sem inserir tetraedro por tetraedro.
+    # Os vértices são utilizados como estão (não é feita a busca por vértices
+    # repetidos) e os corners opostos são calculados em uma única passada.
+    # Argumentos:
+    #       vertices = array (N, 3) com as posições (x, y, z) dos vértices.
+    #       tetrahedra = array (M, 4) com os índices dos vértices de cada
+    #       tetraedro.
+    #       orient = se verdadeiro, os tetraedros com orientação errada são
+    #       corrigidos como em insertTetrahedron (ver orientTetrahedra); caso
+    #       contrário, os tetraedros já devem estar orientados.
+    #       eps, vertexIndex, incidence, nodePool = mesmos argumentos do
+    #       construtor.
+    #       workers = quantidade de processos usados para calcular os corners
+    #       opostos (ver buildParallel).
+    # Ao contrário de insertTetrahedron, os tetraedros degenerados não geram
+    # uma exceção: eles são mantidos na corner table e, com orient, seus
+    # índices são guardados (ver getDegenerateTetrahedra).
+    @classmethod
+    def fromArrays(cls, vertices, tetrahedra, eps = avl.eps, vertexIndex = 'avl', orient = True, incidence = 'lists', workers = 1, *, nodePool = False):
+        vertices = np.asarray(vertices, dtype=np.float64).reshape((-1, 3))
+        tetrahedra = np.asarray(tetrahedra, dtype=np.int64).reshape((-1, 4))
+        nVertex = vertices.shape[0]
+        if tetrahedra.size > 0 and (tetrahedra.min() < 0 or tetrahedra.max() >= nVertex):
+            raise Exception("Tetrahedron index out of range")
+
+        degenerate = None
+        if orient:
+            tetrahedra, degenerate = orientTetrahedra(vertices, tetrahedra)
+
+        table = cls(eps, vertexIndex, incidence = incidence, nodePool = nodePool)
+        table.__NTetr = tetrahedra.shape[0]
+        table.__Corners = storage.GrowableArray.fromArray(tetrahedra.reshape(-1).astype(np.int32), np.int32)
+        table.__OppositeCorners = storage.GrowableArray.fromArray(oppositeCornersFromTetrahedra(tetrahedra, workers), np.int32)
+        table.__NVertex = nVertex
+        table.__Vertices = storage.GrowableArray.fromArray(vertices.copy(), np.float64, 3)
+        table.__invalidateIndices()
+        if degenerate is not None:
+            table.__Degenerate = np.flatnonzero(degenerate)
+        return table
+
+    # Função para construir uma corner table grande a partir de arrays de
+    # vértices e tetraedros, como fromArrays, mas calculando os corners
+    # opostos em vários processos (ver parallel.oppositeCorners): o array de
+    # tetraedros é dividido em partições, os corners opostos de cada partição
+    # são calculados em paralelo sobre memória compartilhada e os pares entre
+    # partições são resolvidos no final.
+    # Argumentos:
+    #       vertices, tetrahedra, eps, vertexIndex, orient, incidence, nodePool =
+    #       mesmos argumentos de fromArrays.
+    #       workers = quantidade de processos (None = quantidade de CPUs).
+    @classmethod
+    def buildParallel(cls, vertices, tetrahedra, workers = None, eps = avl.eps, vertexIndex = 'avl', orient = True, incidence = 'lists', *, nodePool = False):
+        return cls.fromArrays(vertices, tetrahedra, eps = eps, vertexIndex = vertexIndex, orient = orient, incidence = incidence, workers = workers, nodePool = nodePool)
+
+    # Função para construir uma corner table a partir de uma malha do TetGen
+    # (arquivos .node e .ele, ver tetreader).
+    # Argumentos:
+    #       path = caminho do arquivo .node ou .ele, ou o nome base dos dois
+    #       arquivos.
+    #       eps, vertexIndex, incidence, nodePool = mesmos argumentos do
+    #       construtor.
+    @classmethod
+    def fromTetGen(cls, path, eps = avl.eps, vertexIndex = 'avl', incidence = 'lists', *, nodePool = False):
+        vertices, tetrahedra = tetreader.readTetGen(path)
+        return cls.fromArrays(vertices, tetrahedra, eps, vertexIndex, incidence = incidence, nodePool = nodePool)
 
+    # Função para construir uma corner table a partir de uma malha do Gmsh
+    # (arquivo .msh versão 4.1, ASCII ou binário, ver tetreader).
+    # Argumentos:
+    #       path = caminho do arquivo.
+    #       eps, vertexIndex, incidence, nodePool = mesmos argumentos do
+    #       construtor.
+    @classmethod
+    def fromGmsh(cls, path, eps = avl.eps, vertexIndex = 'avl', incidence = 'lists', *, nodePool = False):
+        vertices, tetrahedra = tetreader.readGmsh(path)
+        return cls.fromArrays(vertices, tetrahedra, eps, vertexIndex, incidence = incidence, nodePool = nodePool)
 
     # Função para remover um vértice da corner table a partir de sua
     # posição (x, y, z). Remove também todos os tetraedros que compartilham
@@ -217,151 +729,184 @@ class CornerTable3D:
     # Argumentos:
     #       posição (x, y, z) do vértice
     def removeVertex(self, x, y, z):
-        # obtendo o índice do vértice na lista de vértices.
-        removedVertexIndex = self.__inVertices(x, y, z)
-        
-        # se o vértice não existir na corner table, não é necessário
-        # removê-lo.
-        if removedVertexIndex == -1: 
+        self.removeVerticesAt([[x, y, z]])
+
+    # Função para remover vários vértices a partir de suas posições (x, y, z).
+    # Posições que não correspondem a nenhum vértice são ignoradas.
+    # Argumentos:
+    #       points = array (K, 3) com as posições dos vértices.
+    # Retorna os mapas de índices antigos -> novos dos tetraedros e dos vértices
+    # (-1 para os elementos removidos).
+    def removeVerticesAt(self, points):
+        vertexIndices = []
+        for x, y, z in np.asarray(points, dtype=np.float64).reshape((-1, 3)).tolist():
+            vertexIndex = self.__inVertices(x, y, z)
+            if vertexIndex != -1:
+                vertexIndices.append(vertexIndex)
+        return self.removeVertices(vertexIndices)
+
+    # Função para remover vários vértices a partir de seus índices.
+    # Todos os tetraedros que compartilham algum destes vértices são removidos, e
+    # os vértices que ficarem sem nenhum corner também.
+    # Os vértices são removidos um por vez (swap com o último vértice, como
+    # os tetraedros), a partir de uma lista de trabalho em vez de chamadas
+    # recursivas: os vértices que ficam sem corners entram na lista, e as
+    # estruturas auxiliares (árvore de vértices, dicionário de faces e corners
+    # incidentes) são atualizadas apenas nos elementos que mudam de posição.
+    # Nos modos 'csr' e 'corner', que não guardam a lista de corners de cada
+    # vértice, as posições removidas são preenchidas em uma única passada
+    # vetorizada (ver __fillRemoved).
+    # Quando muitos vértices são removidos de uma vez (mais de 1/8 dos
+    # vértices), os arrays são compactados em uma única passada (ver
+    # __compact), e as estruturas auxiliares são reconstruídas sob demanda.
+    # Argumentos:
+    #       vertexIndices = índices dos vértices (índices inexistentes são
+    #       ignorados).
+    # Retorna os mapas de índices antigos -> novos dos tetraedros e dos vértices
+    # (-1 para os elementos removidos).
+    def removeVertices(self, vertexIndices):
+        vertexIndices = np.asarray(vertexIndices, dtype=np.int64).reshape(-1)
+        vertexIndices = np.unique(vertexIndices[(vertexIndices >= 0) & (vertexIndices < self.__NVertex)])
+        if vertexIndices.shape[0] > 0 and (vertexIndices.shape[0] * 8 > self.__NVertex or self.__Incidence != 'lists'):
+            removedVertices = np.zeros(self.__NVertex, dtype=bool)
+            removedVertices[vertexIndices] = True
+            # tetraedros com pelo menos um vértice removido.
+            removed = removedVertices[self.__Corners.view().reshape((-1, 4))].any(axis=1)
+            if vertexIndices.shape[0] * 8 > self.__NVertex:
+                return self.__compact(removed, removedVertices)
+            return self.__fillRemoved(removed, removedVertices)
+
+        # índice original dos elementos/vértices que mudaram de posição.
+        nTetrahedra = self.__NTetr
+        nVertex = self.__NVertex
+        elementAt = {}
+        vertexAt = {}
+        worklist = set(vertexIndices.tolist())
+        while worklist:
+            v = worklist.pop()
+            tetrahedra = sorted({cornerIndex // 4 for cornerIndex in self.__cornersOfVertex(v)}, reverse = True)
+            worklist.update(self.__removeTetrahedraSwap(tetrahedra, elementAt))
+            worklist.discard(v)
+            last = self.__NVertex - 1
+            self.__removeVertexSwap(v)
+            moved = vertexAt.pop(last, last)
+            if v != last:
+                vertexAt[v] = moved
+            # o último vértice passou para a posição v.
+            if last in worklist:
+                worklist.remove(last)
+                worklist.add(v)
+
+        self.__remapDegenerate(elementAt)
+        return self.__indexMap(elementAt, nTetrahedra, self.__NTetr), self.__indexMap(vertexAt, nVertex, self.__NVertex)
+
+    # Mapa de índices antigos -> novos (-1 para os removidos) após remoções
+    # com swap com o último, a partir das posições que mudaram.
+    # Como só o último elemento muda de posição, todo elemento movido tem
+    # índice original >= size (a quantidade final), e todo elemento original
+    # em uma posição que mudou foi removido.
+    # Argumentos:
+    #       moved = dicionário posição -> índice original.
+    #       count, size = quantidade de elementos antes e depois das remoções.
+    @staticmethod
+    def __indexMap(moved, count, size):
+        indexMap = np.arange(count, dtype=np.int64)
+        indexMap[size:] = -1
+        if moved:
+            positions = np.fromiter(moved.keys(), dtype=np.int64, count=len(moved))
+            originals = np.fromiter(moved.values(), dtype=np.int64, count=len(moved))
+            indexMap[positions] = -1
+            indexMap[originals] = positions
+        return indexMap
+
+    # Atualiza os índices dos tetraedros degenerados após remoções com swap
+    # com o último (ver __indexMap), em O(tetraedros movidos + degenerados).
+    # Argumentos:
+    #       moved = dicionário posição -> índice original.
+    def __remapDegenerate(self, moved):
+        if self.__Degenerate.shape[0] == 0:
             return
-        
-        # não pode simplesmente remover o vértice de todas as listas, 
-        # porque iria bagunçar todas as referências de índices que
-        # são feitas na corner table.
-        # por este motivo, foi decidido dar swap com o último elemento em
-        # vez de remover, e alterar apenas as referências a este único
-        # elemento modificado.
-        # deste modo, o último vértice vai assumir a posição do vértice
-        # que está sendo removido.
-        lastVertex = self.__NVertex - 1
-        
-        # pegando os corners incidentes no vértice que está sendo removido.
-        incidentCornersForV = self.__IncidentCorners[removedVertexIndex]
-        
-        # quando remove um vértice, tem que remover todos os tetraedros
-        # ligados neste vértice.
-        # pegando a lista de tetraedros que vão ser removidos devido à
-        # remoção do vértice
-        # de forma análoga ao vértice, cada tetraedro removido será
-        # substituído pelo último tetraedro da lista (swap com o último).
-        tetrahedraToBeRemoved = []
-        for i in range(len(incidentCornersForV)):
-            tetrahedraToBeRemoved.append(self.ct(incidentCornersForV[i]))
-
-        # vai remover de baixo para cima.
-        tetrahedraToBeRemoved.sort(reverse=True)
-        
-        # ao remover múltiplos tetraedros, pode acontecer de outros vértices
-        # também serem removidos (caso não sobre nenhum corner incidente
-        # nestes vértices).
-        # lista de vértices que serão marcados para remoção ao final da
-        # função.
-        vertexMarkedForRemoval = []
-        
-        # removendo os tetraedros e todos os seus corners.
-        for tetrahedronIndex in tetrahedraToBeRemoved:
-            # corners do tetraedro sendo removido.
-            c0 = tetrahedronIndex * 4 + 0
-            c1 = tetrahedronIndex * 4 + 1
-            c2 = tetrahedronIndex * 4 + 2
-            c3 = tetrahedronIndex * 4 + 3
+        position = {original: index for index, original in moved.items()}
+        degenerate = []
+        for tetrahedronIndex in self.__Degenerate.tolist():
+            if tetrahedronIndex in position:
+                degenerate.append(position[tetrahedronIndex])
+            elif tetrahedronIndex < self.__NTetr and tetrahedronIndex not in moved:
+                degenerate.append(tetrahedronIndex)
+        self.__Degenerate = np.array(degenerate, dtype=np.int64)
 
-            # removendo estes corners da lista de incident corners de cada 
-            # vértice respectivamente.
-            for cornerIndex in [c0, c1, c2, c3]:
-                tetrahedronVertexIndex = self.__Corners[cornerIndex]
-                for i in range(len(self.__IncidentCorners[tetrahedronVertexIndex])):
-                    if self.__IncidentCorners[tetrahedronVertexIndex][i] == cornerIndex:
-                        del self.__IncidentCorners[tetrahedronVertexIndex][i]
-                        break
-                # se __IncidentCorners[tetrahedronVertexIndex] ficar vazio,
-                # este vértice tem que ser removido também.
-                if not self.__IncidentCorners[tetrahedronVertexIndex]:
-                    vertexMarkedForRemoval.append(self.__Vertices[tetrahedronVertexIndex])
-            
-            # atualizando os incident corners dos vértices dos corners do
-            # último tetraedro (que vai mudar de posição).
-            for j in range(4):
-                lastCornerIndex = (self.__NTetr - 1) * 4 + j
-                removedCornerIndex = tetrahedronIndex * 4 + j
-                tetrahedronVertexIndex = self.__Corners[lastCornerIndex]
-                for i in range(len(self.__IncidentCorners[tetrahedronVertexIndex])):
-                    if self.__IncidentCorners[tetrahedronVertexIndex][i] == lastCornerIndex:
-                        self.__IncidentCorners[tetrahedronVertexIndex][i] = removedCornerIndex
-                        break
+    # corners incidentes no vértice v (uma cópia da lista, que é alterada
+    # durante a remoção).
+    def __cornersOfVertex(self, v):
+        return list(self.__getIncidentCorners()[v])
+
+    # Remove o vértice v, que não tem mais nenhum corner: o último vértice
+    # passa para a posição v, e apenas as referências a ele são atualizadas.
+    def __removeVertexSwap(self, v):
+        last = self.__NVertex - 1
+        incidentCorners = self.__getIncidentCorners()
+        cornersOfLast = self.__cornersOfVertex(last) if v != last else []
+
+        # removendo o vértice da árvore, e atualizando o índice do último
+        # vértice, que vai mudar de posição (com vértices repetidos, a árvore
+        # guarda apenas um deles).
+        if self.__SortedVertices is not None:
+            removedPosition = self.__Vertices[v].tolist()
+            if self.__SortedVertices.get(removedPosition) == v:
+                self.__SortedVertices.remove(removedPosition)
+            if v != last:
+                lastPosition = self.__Vertices[last].tolist()
+                if self.__SortedVertices.get(lastPosition) == last:
+                    self.__SortedVertices.set_value(lastPosition, v)
 
-            # removendo os corners dos opposite corners.
-            if self.__OppositeCorners[c0] >= 0:
-                self.__OppositeCorners[self.__OppositeCorners[c0]] = -1
-                self.__OppositeCorners[c0] = -1
-            if self.__OppositeCorners[c1] >= 0:
-                self.__OppositeCorners[self.__OppositeCorners[c1]] = -1
-                self.__OppositeCorners[c1] = -1
-            if self.__OppositeCorners[c2] >= 0:
-                self.__OppositeCorners[self.__OppositeCorners[c2]] = -1
-                self.__OppositeCorners[c2] = -1
-            if self.__OppositeCorners[c3] >= 0:
-                self.__OppositeCorners[self.__OppositeCorners[c3]] = -1
-                self.__OppositeCorners[c3] = -1
-            
-            # substituindo os corners pelo último tetraedro.
-            if self.__OppositeCorners[(self.__NTetr - 1) * 4 + 0] >= 0:
-                self.__OppositeCorners[self.__OppositeCorners[(self.__NTetr - 1) * 4 + 0]] = c0
-            if self.__OppositeCorners[(self.__NTetr - 1) * 4 + 1] >= 0:
-                self.__OppositeCorners[self.__OppositeCorners[(self.__NTetr - 1) * 4 + 1]] = c1
-            if self.__OppositeCorners[(self.__NTetr - 1) * 4 + 2] >= 0:
-                self.__OppositeCorners[self.__OppositeCorners[(self.__NTetr - 1) * 4 + 2]] = c2
-            if self.__OppositeCorners[(self.__NTetr - 1) * 4 + 3] >= 0:
-                self.__OppositeCorners[self.__OppositeCorners[(self.__NTetr - 1) * 4 + 3]] = c3
-            
-            self.__Corners[c0] = self.__Corners[(self.__NTetr - 1) * 4 + 0]
-            self.__Corners[c1] = self.__Corners[(self.__NTetr - 1) * 4 + 1]
-            self.__Corners[c2] = self.__Corners[(self.__NTetr - 1) * 4 + 2]
-            self.__Corners[c3] = self.__Corners[(self.__NTetr - 1) * 4 + 3]
-            self.__OppositeCorners[c0] = self.__OppositeCorners[(self.__NTetr - 1) * 4 + 0]
-            self.__OppositeCorners[c1] = self.__OppositeCorners[(self.__NTetr - 1) * 4 + 1]
-            self.__OppositeCorners[c2] = self.__OppositeCorners[(self.__NTetr - 1) * 4 + 2]
-            self.__OppositeCorners[c3] = self.__OppositeCorners[(self.__NTetr - 1) * 4 + 3]
-            del self.__Corners[(self.__NTetr - 1) * 4 + 3]
-            del self.__Corners[(self.__NTetr - 1) * 4 + 2]
-            del self.__Corners[(self.__NTetr - 1) * 4 + 1]
-            del self.__Corners[(self.__NTetr - 1) * 4 + 0]
-            del self.__OppositeCorners[(self.__NTetr - 1) * 4 + 3]
-            del self.__OppositeCorners[(self.__NTetr - 1) * 4 + 2]
-            del self.__OppositeCorners[(self.__NTetr - 1) * 4 + 1]
-            del self.__OppositeCorners[(self.__NTetr - 1) * 4 + 0]
-            
-            # atualizando a quantidade de tetraedros.
-            self.__NTetr -= 1
-        
         # removendo o vértice da matriz de posições.
-        self.__SortedVertices.remove(self.__Vertices[removedVertexIndex])
-        self.__Vertices[removedVertexIndex] = self.__Vertices[lastVertex]
-        del self.__Vertices[lastVertex]
-        node = self.__SortedVertices.find(self.__Vertices[removedVertexIndex])
-        node.value = removedVertexIndex
+        self.__Vertices[v] = self.__Vertices[last]
+        self.__Vertices.truncate(last)
 
         # atualizando as referências dos corners ao último vértice, que vai
         # mudar de posição.
-        incidentCornersForLastV = self.__IncidentCorners[lastVertex]
-        for cornerIndex in incidentCornersForLastV:
-            self.__Corners[cornerIndex] = removedVertexIndex
-        
-        # removendo o vértice da lista de incident corners.
-        self.__IncidentCorners[removedVertexIndex] = self.__IncidentCorners[lastVertex]
-        del self.__IncidentCorners[lastVertex]
-        
+        # as faces que contêm o último vértice (opostas aos outros corners
+        # dos seus tetraedros) mudam de chave.
+        changedFaces = [cornerIndex // 4 * 4 + (cornerIndex + j) % 4 for cornerIndex in cornersOfLast for j in range(1, 4)]
+        if self.__Faces is not None:
+            for cornerIndex in changedFaces:
+                self.__removeFace(cornerIndex)
+        for cornerIndex in cornersOfLast:
+            self.__Corners[cornerIndex] = v
+        if self.__Faces is not None:
+            for cornerIndex in changedFaces:
+                self.__Faces[self.__face(cornerIndex)] = cornerIndex
+
+        # removendo o vértice dos corners incidentes.
+        incidentCorners[v] = incidentCorners[last]
+        del incidentCorners[last]
+
         # atualizando a quantidade de vértices.
         self.__NVertex -= 1
-        
-        # removendo os vértices vazios que sobraram.
-        for i in range(len(vertexMarkedForRemoval)):
-            self.removeVertex(vertexMarkedForRemoval[i][0], vertexMarkedForRemoval[i][1], vertexMarkedForRemoval[i][2])
-        
+
     # Função para remover tetraedros a partir de seus índices
     # Argumentos:
     #       índices dos tetraedros a serem removidos.
     def removeTetrahedra(self, tetrahedraToBeRemoved):
+        elementAt = {}
+        vertexMarkedForRemoval = self.__removeTetrahedraSwap(tetrahedraToBeRemoved, elementAt)
+        self.__remapDegenerate(elementAt)
+
+        # removendo os vértices vazios que sobraram.
+        # (os índices dos vértices não mudam ao remover os elementos acima).
+        if vertexMarkedForRemoval:
+            self.removeVertices(vertexMarkedForRemoval)
+
+    # Remove os tetraedros (swap com o último tetraedro, um por vez),
+    # atualizando os corners opostos, os corners incidentes e o dicionário de
+    # faces.
+    # Argumentos:
+    #       tetrahedraToBeRemoved = índices dos tetraedros.
+    #       elementAt = dicionário posição -> índice original dos tetraedros
+    #       que mudaram de posição, atualizado a cada swap (None = não
+    #       atualizar; ver __indexMap).
+    # Retorna a lista dos vértices que ficaram sem nenhum corner.
+    def __removeTetrahedraSwap(self, tetrahedraToBeRemoved, elementAt = None):
         # remove de baixo para cima.
         tetrahedraToBeRemoved.sort(reverse = True)
         
@@ -371,6 +916,18 @@ class CornerTable3D:
         # lista de vértices que serão marcados para remoção ao final da
         # função.
         vertexMarkedForRemoval = []
+
+        if self.__Incidence == 'lists':
+            incidentCorners = self.__getIncidentCorners()
+        elif self.__Incidence == 'corner':
+            vertexCorners = self.__getVertexCorners()
+            # vértices cujo corner armazenado foi removido e que não têm
+            # tetraedro vizinho pelas faces do vértice.
+            unresolvedVertices = []
+        else:
+            self.__IncidentCSR = None
+            # vértices dos tetraedros removidos (podem ficar sem corners).
+            candidateVertices = []
         
         # removendo os tetraedros e todos os seus corners.
         for tetrahedronIndex in tetrahedraToBeRemoved:
@@ -385,30 +942,72 @@ class CornerTable3D:
             c2 = tetrahedronIndex * 4 + 2
             c3 = tetrahedronIndex * 4 + 3
 
-            # removendo estes corners da lista de incident corners de cada 
-            # vértice respectivamente.
-            for cornerIndex in [c0, c1, c2, c3]:
-                tetrahedronVertexIndex = self.__Corners[cornerIndex]
-                for i in range(len(self.__IncidentCorners[tetrahedronVertexIndex])):
-                    if self.__IncidentCorners[tetrahedronVertexIndex][i] == cornerIndex:
-                        del self.__IncidentCorners[tetrahedronVertexIndex][i]
-                        break
-                # se IncidentCorners[tetrahedronVertexIndex] ficar vazio,
-                # este vértice tem que ser removido também.
-                if not self.__IncidentCorners[tetrahedronVertexIndex]:
-                    vertexMarkedForRemoval.append(self.__Vertices[tetrahedronVertexIndex])
+            if self.__Incidence == 'lists':
+                # removendo estes corners da lista de incident corners de cada 
+                # vértice respectivamente.
+                for cornerIndex in [c0, c1, c2, c3]:
+                    tetrahedronVertexIndex = self.__Corners[cornerIndex]
+                    for i in range(len(incidentCorners[tetrahedronVertexIndex])):
+                        if incidentCorners[tetrahedronVertexIndex][i] == cornerIndex:
+                            del incidentCorners[tetrahedronVertexIndex][i]
+                            break
+                    if self.__Stats is not None:
+                        self.__Stats.count('incidentDeletions')
+                        self.__Stats.count('incidentScans', i + 1)
+                    # se IncidentCorners[tetrahedronVertexIndex] ficar vazio,
+                    # este vértice tem que ser removido também.
+                    if not incidentCorners[tetrahedronVertexIndex]:
+                        vertexMarkedForRemoval.append(tetrahedronVertexIndex)
+                
+                # atualizando os incident corners dos vértices dos corners do
+                # último tetraedro (que vai mudar de posição).
+                for j in range(4):
+                    lastCornerIndex = (self.__NTetr - 1) * 4 + j
+                    removedCornerIndex = tetrahedronIndex * 4 + j
+                    tetrahedronVertexIndex = self.__Corners[lastCornerIndex]
+                    for i in range(len(incidentCorners[tetrahedronVertexIndex])):
+                        if incidentCorners[tetrahedronVertexIndex][i] == lastCornerIndex:
+                            incidentCorners[tetrahedronVertexIndex][i] = removedCornerIndex
+                            break
+            elif self.__Incidence == 'corner':
+                # se o corner armazenado de um vértice for removido, ele é
+                # substituído pelo corner do mesmo vértice em um tetraedro
+                # vizinho por uma das 3 faces que contêm o vértice, em O(1).
+                # Os corners opostos ainda não foram desfeitos neste ponto.
+                for cornerIndex in [c0, c1, c2, c3]:
+                    tetrahedronVertexIndex = self.cv(cornerIndex)
+                    if vertexCorners[tetrahedronVertexIndex] != cornerIndex:
+                        continue
+                    if self.__Stats is not None:
+                        self.__Stats.count('vertexCornerUpdates')
+                    replacement = -1
+                    for j in range(1, 4):
+                        o = self.co(cornerIndex // 4 * 4 + (cornerIndex + j) % 4)
+                        if o >= 0:
+                            replacement = self.__vertexCornerInTetrahedron(o, tetrahedronVertexIndex)
+                            break
+                    if replacement < 0:
+                        unresolvedVertices.append(tetrahedronVertexIndex)
+                    vertexCorners[tetrahedronVertexIndex] = replacement
+                
+                # atualizando os corners armazenados dos vértices do último
+                # tetraedro (que vai mudar de posição).
+                for j in range(4):
+                    lastCornerIndex = (self.__NTetr - 1) * 4 + j
+                    tetrahedronVertexIndex = self.cv(lastCornerIndex)
+                    if vertexCorners[tetrahedronVertexIndex] == lastCornerIndex:
+                        vertexCorners[tetrahedronVertexIndex] = tetrahedronIndex * 4 + j
+            else:
+                candidateVertices.extend([self.cv(c0), self.cv(c1), self.cv(c2), self.cv(c3)])
             
-            # atualizando os incident corners dos vértices dos corners do
+            # removendo as faces do tetraedro removido e atualizando as do
             # último tetraedro (que vai mudar de posição).
-            for j in range(4):
-                lastCornerIndex = (self.__NTetr - 1) * 4 + j
-                removedCornerIndex = tetrahedronIndex * 4 + j
-                tetrahedronVertexIndex = self.__Corners[lastCornerIndex]
-                for i in range(len(self.__IncidentCorners[tetrahedronVertexIndex])):
-                    if self.__IncidentCorners[tetrahedronVertexIndex][i] == lastCornerIndex:
-                        self.__IncidentCorners[tetrahedronVertexIndex][i] = removedCornerIndex
-                        break
-            
+            if self.__Faces is not None:
+                for j in range(4):
+                    self.__removeFace(tetrahedronIndex * 4 + j)
+                for j in range(4):
+                    self.__moveFace((self.__NTetr - 1) * 4 + j, tetrahedronIndex * 4 + j)
+
             # removendo os corners dos opposite corners.
             if self.__OppositeCorners[c0] >= 0:
                 self.__OppositeCorners[self.__OppositeCorners[c0]] = -1
@@ -441,113 +1040,361 @@ class CornerTable3D:
             self.__OppositeCorners[c1] = self.__OppositeCorners[(self.__NTetr - 1) * 4 + 1]
             self.__OppositeCorners[c2] = self.__OppositeCorners[(self.__NTetr - 1) * 4 + 2]
             self.__OppositeCorners[c3] = self.__OppositeCorners[(self.__NTetr - 1) * 4 + 3]
-            del self.__Corners[(self.__NTetr - 1) * 4 + 3]
-            del self.__Corners[(self.__NTetr - 1) * 4 + 2]
-            del self.__Corners[(self.__NTetr - 1) * 4 + 1]
-            del self.__Corners[(self.__NTetr - 1) * 4 + 0]
-            del self.__OppositeCorners[(self.__NTetr - 1) * 4 + 3]
-            del self.__OppositeCorners[(self.__NTetr - 1) * 4 + 2]
-            del self.__OppositeCorners[(self.__NTetr - 1) * 4 + 1]
-            del self.__OppositeCorners[(self.__NTetr - 1) * 4 + 0]
+            self.__Corners.truncate((self.__NTetr - 1) * 4)
+            self.__OppositeCorners.truncate((self.__NTetr - 1) * 4)
             
+            if elementAt is not None:
+                moved = elementAt.pop(self.__NTetr - 1, self.__NTetr - 1)
+                if tetrahedronIndex != self.__NTetr - 1:
+                    elementAt[tetrahedronIndex] = moved
+
             # atualizando a quantidade de tetraedros.
             self.__NTetr -= 1
         
-        # removendo os vértices vazios que sobraram.
-        for i in range(len(vertexMarkedForRemoval)):
-            self.removeVertex(vertexMarkedForRemoval[i][0], vertexMarkedForRemoval[i][1], vertexMarkedForRemoval[i][2])
+        if self.__Incidence == 'corner' and unresolvedVertices:
+            # busca (vetorizada) por algum corner restante destes vértices,
+            # que pode estar em outro grupo de tetraedros (vértice
+            # não-manifold); os que não têm nenhum são removidos.
+            unresolvedVertices = np.asarray(unresolvedVertices, dtype=np.int64)
+            corners = self.__Corners.view()
+            remaining = np.flatnonzero(np.isin(corners, unresolvedVertices))
+            vertexCorners.view()[corners[remaining]] = remaining
+            vertexMarkedForRemoval = unresolvedVertices[vertexCorners.view()[unresolvedVertices] < 0].tolist()
+        elif self.__Incidence == 'csr' and candidateVertices:
+            # vértices que não aparecem em nenhum corner restante.
+            candidateVertices = np.asarray(candidateVertices, dtype=np.int64)
+            counts = np.bincount(self.__Corners.view(), minlength=self.__NVertex)
+            vertexMarkedForRemoval = np.unique(candidateVertices[counts[candidateVertices] == 0]).tolist()
+
+        return vertexMarkedForRemoval
+
+    # Função para remover vários tetraedros de uma só vez.
+    # Em vez de remover um tetraedro por vez (swap com o último), todos os
+    # tetraedros marcados são removidos e os arrays de corners, corners opostos
+    # e vértices são compactados em uma única passada, mantendo a ordem
+    # relativa dos elementos que sobraram. Os vértices que ficarem sem nenhum
+    # corner também são removidos.
+    # Argumentos:
+    #       tetrahedraToBeRemoved = máscara booleana com um valor para cada
+    #       tetraedro, ou array com os índices dos tetraedros a serem removidos
+    #       (índices inexistentes são ignorados).
+    # Retorna os mapas de índices antigos -> novos dos tetraedros e dos vértices
+    # (-1 para os elementos removidos).
+    def removeTetrahedraBulk(self, tetrahedraToBeRemoved):
+        tetrahedraToBeRemoved = np.asarray(tetrahedraToBeRemoved)
+        if tetrahedraToBeRemoved.dtype == bool:
+            if tetrahedraToBeRemoved.shape != (self.__NTetr,):
+                raise Exception("Mask size does not match the number of tetrahedra")
+            removed = tetrahedraToBeRemoved
+        else:
+            indices = tetrahedraToBeRemoved.astype(np.int64).reshape(-1)
+            removed = np.zeros(self.__NTetr, dtype=bool)
+            removed[indices[(indices >= 0) & (indices < self.__NTetr)]] = True
+        return self.__compact(removed, np.zeros(self.__NVertex, dtype=bool))
+
+    # Remove os tetraedros marcados em removed e os vértices marcados em
+    # removedVertices (além dos vértices que ficarem sem nenhum corner),
+    # compactando os arrays em uma única passada.
+    def __compact(self, removed, removedVertices):
+        if self.__Stats is not None:
+            self.__Stats.count('compactions')
+        kept = ~removed
+
+        corners = self.__Corners.view().reshape((-1, 4))
+        opposite = self.__OppositeCorners.view().reshape((-1, 4))
+
+        # mapas de índices dos tetraedros e dos corners.
+        elementMap = np.full(self.__NTetr, -1, dtype=np.int64)
+        elementMap[kept] = np.arange(np.count_nonzero(kept))
+        cornerMap = elementMap[:, None] * 4 + np.arange(4)
+        cornerMap[removed] = -1
+        cornerMap = cornerMap.reshape(-1)
+
+        # vértices usados apenas pelos tetraedros removidos ficam sem nenhum
+        # corner, e também são removidos (além dos vértices marcados).
+        usedBefore = np.bincount(corners.reshape(-1), minlength=self.__NVertex) > 0
+        usedAfter = np.bincount(corners[kept].reshape(-1), minlength=self.__NVertex) > 0
+        keptVertices = (usedAfter | ~usedBefore) & ~removedVertices
+        vertexMap = np.full(self.__NVertex, -1, dtype=np.int64)
+        vertexMap[keptVertices] = np.arange(np.count_nonzero(keptVertices))
+
+        # compactando os arrays.
+        newCorners = vertexMap[corners[kept].reshape(-1)]
+        newOpposite = opposite[kept].reshape(-1)
+        newOpposite = np.where(newOpposite >= 0, cornerMap[newOpposite], -1)
+        newVertices = self.__Vertices.view()[keptVertices]
+        self.__Corners.truncate(0)
+        self.__Corners.extend(newCorners)
+        self.__OppositeCorners.truncate(0)
+        self.__OppositeCorners.extend(newOpposite)
+        self.__Vertices.truncate(0)
+        self.__Vertices.extend(newVertices)
+        self.__NTetr = newCorners.shape[0] // 4
+        self.__NVertex = newVertices.shape[0]
+
+        self.__invalidateIndices()
+        degenerate = elementMap[self.__Degenerate]
+        self.__Degenerate = degenerate[degenerate >= 0]
+        return elementMap, vertexMap
+
+    # Remove os tetraedros marcados em removed e os vértices marcados em
+    # removedVertices (além dos vértices que ficarem sem nenhum corner) em
+    # uma única passada vetorizada: as posições removidas são preenchidas
+    # pelos últimos elementos (como no swap com o último), e apenas as
+    # entradas da árvore de vértices e do dicionário de faces que mudam são
+    # atualizadas. Os corners incidentes são descartados uma única vez (e
+    # reconstruídos sob demanda).
+    def __fillRemoved(self, removed, removedVertices):
+        nTetrahedra = self.__NTetr
+        nVertex = self.__NVertex
+        corners = self.__Corners.view()
+        opposite = self.__OppositeCorners.view()
+
+        # vértices usados apenas pelos tetraedros removidos ficam sem nenhum
+        # corner, e também são removidos.
+        removedCorners = (np.flatnonzero(removed)[:, None] * 4 + np.arange(4)).reshape(-1)
+        usedBefore = np.bincount(corners, minlength=nVertex) > 0
+        usedAfter = np.bincount(np.delete(corners, removedCorners), minlength=nVertex) > 0
+        removedVertices = removedVertices | (usedBefore & ~usedAfter)
+
+        # os tetraedros mantidos no final passam para as posições removidas
+        # do início.
+        size = nTetrahedra - removedCorners.shape[0] // 4
+        holes = np.flatnonzero(removed[:size])
+        movers = np.flatnonzero(~removed[size:]) + size
+        holeCorners = (holes[:, None] * 4 + np.arange(4)).reshape(-1)
+        moverCorners = (movers[:, None] * 4 + np.arange(4)).reshape(-1)
+
+        # faces dos tetraedros removidos e dos que mudam de posição.
+        if self.__Faces is not None:
+            for cornerIndex in removedCorners.tolist():
+                self.__removeFace(cornerIndex)
+            for oldCorner, newCorner in zip(moverCorners.tolist(), holeCorners.tolist()):
+                self.__moveFace(oldCorner, newCorner)
+
+        # desfazendo os corners opostos dos tetraedros removidos e
+        # atualizando os dos tetraedros que mudam de posição.
+        cornerMap = np.arange(nTetrahedra * 4, dtype=np.int64)
+        cornerMap[removedCorners] = -1
+        cornerMap[moverCorners] = holeCorners
+        neighbors = opposite[removedCorners]
+        opposite[neighbors[neighbors >= 0]] = -1
+        newOpposite = opposite[moverCorners]
+        newOpposite = np.where(newOpposite >= 0, cornerMap[newOpposite], -1)
+        opposite[holeCorners] = newOpposite
+        opposite[newOpposite[newOpposite >= 0]] = holeCorners[newOpposite >= 0]
+        corners[holeCorners] = corners[moverCorners]
+        self.__Corners.truncate(size * 4)
+        self.__OppositeCorners.truncate(size * 4)
+        self.__NTetr = size
+
+        # os vértices mantidos no final passam para as posições removidas do
+        # início.
+        vertexSize = nVertex - np.count_nonzero(removedVertices)
+        vertexHoles = np.flatnonzero(removedVertices[:vertexSize])
+        vertexMovers = np.flatnonzero(~removedVertices[vertexSize:]) + vertexSize
+        if self.__SortedVertices is not None:
+            vertices = self.__Vertices.view()
+            for v in np.flatnonzero(removedVertices).tolist():
+                removedPosition = vertices[v].tolist()
+                if self.__SortedVertices.get(removedPosition) == v:
+                    self.__SortedVertices.remove(removedPosition)
+            for last, v in zip(vertexMovers.tolist(), vertexHoles.tolist()):
+                lastPosition = vertices[last].tolist()
+                if self.__SortedVertices.get(lastPosition) == last:
+                    self.__SortedVertices.set_value(lastPosition, v)
+        self.__Vertices.view()[vertexHoles] = self.__Vertices.view()[vertexMovers]
+        self.__Vertices.truncate(vertexSize)
+        self.__NVertex = vertexSize
+
+        # atualizando as referências dos corners aos vértices que mudaram de
+        # posição (as faces que contêm estes vértices mudam de chave).
+        vertexMap = np.arange(nVertex, dtype=np.int64)
+        vertexMap[removedVertices] = -1
+        vertexMap[vertexMovers] = vertexHoles
+        corners = self.__Corners.view()
+        changed = np.flatnonzero(corners >= vertexSize)
+        if self.__Faces is not None:
+            # (faces opostas aos outros corners dos seus tetraedros).
+            affected = np.unique(changed[:, None] // 4 * 4 + (changed[:, None] + np.arange(1, 4)) % 4).tolist()
+            for cornerIndex in affected:
+                self.__removeFace(cornerIndex)
+            corners[changed] = vertexMap[corners[changed]]
+            for cornerIndex in affected:
+                self.__Faces[self.__face(cornerIndex)] = cornerIndex
+        else:
+            corners[changed] = vertexMap[corners[changed]]
+
+        self.__IncidentCorners = None
+        self.__IncidentCSR = None
+        self.__VertexCorners = None
+
+        elementMap = np.arange(nTetrahedra, dtype=np.int64)
+        elementMap[removed] = -1
+        elementMap[movers] = holes
+        degenerate = elementMap[self.__Degenerate]
+        self.__Degenerate = degenerate[degenerate >= 0]
+        return elementMap, vertexMap
+
+    # métodos públicos cujo tempo é medido quando as estatísticas estão
+    # habilitadas.
+    __timedMethods = ('insertTetrahedron', 'findVertex', 'removeVertex', 'removeVerticesAt', 'removeVertices',
+                      'removeTetrahedra', 'removeTetrahedraBulk', 'incidentCorners', 'incidentCornersArray',
+                      'vertexRingsArray', 'adjacency', 'laplacian', 'getFullCornerTable', 'save')
+
+    # Habilita as estatísticas de uso (ver stats.Stats): contadores de buscas
+    # de vértices (vertexLookups) e de vértices comparados nas buscas
+    # (vertexComparisons), de consultas e pares encontrados ao calcular os
+    # corners opostos (oppositeLookups, oppositeMatches), de remoções e de
+    # posições percorridas nas listas de corners incidentes
+    # (incidentDeletions, incidentScans), de substituições do corner
+    # armazenado no modo 'corner' (vertexCornerUpdates) e de compactações dos
+    # arrays (compactions), além da quantidade de chamadas e do tempo
+    # acumulado de cada método público.
+    # Com as estatísticas desabilitadas (padrão), os métodos não são
+    # substituídos e os contadores custam apenas uma comparação com None.
+    # Argumentos:
+    #       statistics = objeto stats.Stats a ser usado (por exemplo,
+    #       compartilhado entre várias corner tables); se None, um novo objeto
+    #       é criado.
+    # Retorna o objeto stats.Stats.
+    def enableStats(self, statistics = None):
+        self.disableStats()
+        self.__Stats = statistics if statistics is not None else stats.Stats()
+        stats.instrument(self, self.__timedMethods, self.__Stats)
+        return self.__Stats
+
+    # Desabilita as estatísticas de uso.
+    def disableStats(self):
+        stats.uninstrument(self, self.__timedMethods)
+        self.__Stats = None
+
+    # Retorna o objeto stats.Stats (None se as estatísticas estão
+    # desabilitadas).
+    def getStats(self):
+        return self.__Stats
+
+    # Retorna os índices dos tetraedros degenerados (volume próximo de zero,
+    # ver orientTetrahedra), que insertTetrahedron rejeita mas que fromArrays
+    # (e fromTetGen, fromGmsh e buildParallel) mantém na corner table.
+    # A máscara calculada na construção é guardada e os índices são
+    # atualizados nas remoções, sem percorrer os tetraedros novamente. Ela só
+    # existe para corner tables construídas com orient verdadeiro (caso
+    # contrário, e também após load, o array retornado é vazio).
+    def getDegenerateTetrahedra(self):
+        return self.__Degenerate.copy()
 
     # Gerar a corner table completa.
-    def getFullCornerTable(self):
-        fullCornerTable = []
-        for c in range(len(self.__Corners)):
-            fullCornerTable.append(
-                [
-                    c,
-                    self.cv(c),
-                    self.ct(c),
-                    self.cn(c),
-                    self.cp(c),
-                    self.co(c),
-                    self.ca(c),
-                    self.cb(c),
-                    self.cc(c),
-                    self.cd(c)
-                    # ,
-                    # self.cl(c),
-                    # self.cr(c)
-                ]
-            )
+    # Todas as colunas (c, v, t, n, p, o, a, b, c, d) são calculadas de uma
+    # vez com os operadores vetorizados.
+    # Argumentos:
+    #       structured = se verdadeiro, retorna um array estruturado com os
+    #       campos 'c', 'cv', 'ct', 'cn', 'cp', 'co', 'ca', 'cb', 'cc', 'cd',
+    #       em vez de um array (nCorners, 10).
+    def getFullCornerTable(self, structured = False):
+        c = np.arange(len(self.__Corners), dtype=np.int32)
+        columns = [
+            c,
+            self.cvArray(c),
+            self.ctArray(c),
+            self.cnArray(c),
+            self.cpArray(c),
+            self.coArray(c),
+            self.caArray(c),
+            self.cbArray(c),
+            self.ccArray(c),
+            self.cdArray(c)
+        ]
+        if structured:
+            fullCornerTable = np.empty(c.shape[0], dtype=[(name, np.int32) for name in ('c', 'cv', 'ct', 'cn', 'cp', 'co', 'ca', 'cb', 'cc', 'cd')])
+            for name, column in zip(fullCornerTable.dtype.names, columns):
+                fullCornerTable[name] = column
+        else:
+            fullCornerTable = np.empty((c.shape[0], 10), dtype=np.int32)
+            for i in range(10):
+                fullCornerTable[:, i] = columns[i]
         return fullCornerTable
 
-    # Função para plotar a mesh que compõe uma corner table
+    # Views somente-leitura (sem cópia) dos arrays internos da corner table:
+    # posições dos vértices (NVertex, 3), corners (cv) e corners opostos (co).
+    # As views deixam de ser válidas se a corner table for modificada.
+    def getStorageView(self):
+        views = (self.__Vertices.view().view(), self.__Corners.view().view(), self.__OppositeCorners.view().view())
+        for view in views:
+            view.flags.writeable = False
+        return views
+
+    # Função para salvar a corner table em um arquivo binário (ver
+    # storage.saveArrays): eps, posições dos vértices, corners e corners
+    # opostos, e opcionalmente os corners incidentes em cada vértice no
+    # formato CSR.
+    # Argumentos:
+    #       path = caminho do arquivo.
+    #       incidentCorners = se verdadeiro, salva também os corners
+    #       incidentes, que deixam de ser calculados ao carregar o arquivo.
+    def save(self, path, incidentCorners = False):
+        arrays = [
+            ('eps', np.asarray([self.__eps], dtype=np.float64)),
+            ('vertices', self.__Vertices.view()),
+            ('corners', self.__Corners.view()),
+            ('opposite', self.__OppositeCorners.view())
+        ]
+        if incidentCorners:
+            offsets, order = self.__getIncidentCSR()
+            arrays += [('incoffsets', offsets), ('incorners', order)]
+        storage.saveArrays(path, b'CTABLE3D', arrays)
+
+    # Função para carregar uma corner table salva com save.
+    # Com mmap, a corner table abre sem reconstrução (as estruturas auxiliares
+    # são construídas sob demanda) e os arrays podem ser compartilhados entre
+    # processos. Os arrays são copiados apenas na primeira modificação.
+    # Argumentos:
+    #       path = caminho do arquivo.
+    #       mmap = se verdadeiro, os arrays são abertos com numpy.memmap
+    #       (sem cópia e sem reconstrução); caso contrário são lidos para a
+    #       memória.
+    #       vertexIndex, incidence, nodePool = mesmos argumentos do construtor.
+    # O eps é lido do arquivo, e o arquivo pode ter sido salvo por qualquer
+    # uma das duas classes de corner table 3D.
+    @classmethod
+    def load(cls, path, mmap = True, vertexIndex = 'avl', incidence = 'lists', *, nodePool = False):
+        arrays = storage.loadArrays(path, b'CTABLE3D', mmap)
+        corners = arrays['corners']
+        if corners.shape[0] % 4 != 0 or arrays['opposite'].shape != corners.shape:
+            raise Exception("Invalid corner table file: " + str(path))
+
+        table = cls(float(arrays['eps'][0]), vertexIndex, incidence = incidence, nodePool = nodePool)
+        table.__NTetr = corners.shape[0] // 4
+        table.__Corners = storage.GrowableArray.fromArray(corners, np.int32)
+        table.__OppositeCorners = storage.GrowableArray.fromArray(arrays['opposite'], np.int32)
+        table.__NVertex = arrays['vertices'].shape[0]
+        table.__Vertices = storage.GrowableArray.fromArray(arrays['vertices'], np.float64, 3)
+        table.__invalidateIndices()
+        if 'incoffsets' in arrays and incidence != 'corner':
+            table.__IncidentCSR = (arrays['incoffsets'], arrays['incorners'])
+        return table
+
+    # Função para plotar a mesh que compõe uma corner table (as arestas são
+    # desenhadas com um único Line3DCollection, cada aresta uma só vez; ver
+    # visualization.plotMesh).
     # Argumentos:
-    #       titleString = título do plot.
+    #       title = título do plot.
     #       displayLabels = true ou false, habilitar desenho dos labels no plot.
-    def plotCornerTableMesh(self, title = None, displayLabels = False):
-        vertices = np.asarray(self.__Vertices)
-        indexes = np.asarray(self.__Corners).reshape((self.__NTetr, 4))
-
-        # Exibindo a mesh.
-        fig = plt.figure()
-        ax = fig.add_subplot(111, projection='3d')
-        for i in range(indexes.shape[0]):
-            a = vertices[indexes[i,0],:]
-            b = vertices[indexes[i,1],:]
-            c = vertices[indexes[i,2],:]
-            d = vertices[indexes[i,3],:]
-            x = np.asarray([a[0], c[0], b[0], a[0], d[0], b[0], c[0], d[0]])
-            y = np.asarray([a[1], c[1], b[1], a[1], d[1], b[1], c[1], d[1]])
-            z = np.asarray([a[2], c[2], b[2], a[2], d[2], b[2], c[2], d[2]])
-            ax.plot(x, y, z, 'k-')
-        #ax.plot_trisurf(vertices[:, 0], vertices[:,1], triangles = indexes, Z = vertices[:,2])
-
-        # Desenhando as labels dos vértices/corners.
-        if displayLabels:
-            # Plotando os labels dos vértices.
-            for i in range(self.__NVertex):
-                coord = self.__Vertices[i]
-                ax.text(coord[0],coord[1],coord[2], 'v'+str(i), color = 'blue' , fontweight = 'bold', horizontalalignment = 'center')
-            # Plotando os labels dos corners.
-            for i in range(len(self.__Corners)):
-                c = i
-                cn = self.cn(c)
-                cn2 = self.cn(cn)
-                cp = self.cp(c)
-                v = self.cv(c)
-                vn = self.cv(cn)
-                vn2 = self.cv(cn2)
-                vp = self.cv(cp)
-                coord = np.asarray(self.__Vertices[v])
-                coordn = np.asarray(self.__Vertices[vn])
-                coordn2 = np.asarray(self.__Vertices[vn2])
-                coordp = np.asarray(self.__Vertices[vp])
-
-                coordtext = ((coordn - coord) + (coordn2 - coord) + (coordp - coord)) / 10 + coord
-                ax.text(coordtext[0],coordtext[1],coordtext[2],'c'+str(c), color = 'red', fontweight = 'normal', horizontalalignment = 'center')
-            # Plotando os labels dos tetraedros.
-            for i in range(self.__NTetr):
-                c1 = i * 4
-                c2 = self.cn(c1)
-                c4 = self.cn(c2)
-                c3 = self.cp(c1)
-                v1 = self.cv(c1)
-                v2 = self.cv(c2)
-                v4 = self.cv(c4)
-                v3 = self.cv(c3)
-                coord1 = np.asarray(self.__Vertices[v1])
-                coord2 = np.asarray(self.__Vertices[v2])
-                coord4 = np.asarray(self.__Vertices[v4])
-                coord3 = np.asarray(self.__Vertices[v3])
-
-                coordtext = (coord1 + coord2 + coord3 + coord4) / 4
-                ax.text(coordtext[0],coordtext[1],coordtext[2],'t'+str(i), color = 'black' , fontweight = 'bold', horizontalalignment = 'center')
-
-        # Adicionando título e nomes dos eixos.
-        if title:
-            ax.set_title(title)
-        ax.set_xlabel('x')
-        ax.set_ylabel('y')
-        ax.set_zlabel('z')
-        plt.show()
+    #       filename = se informado, o plot é salvo neste arquivo (por exemplo
+    #       'mesh.png') sem abrir uma janela, em vez de plt.show().
+    #       maxLabels = quantidade máxima de labels de vértices, de corners e
+    #       de elementos (acima disso, apenas uma amostra uniforme é
+    #       desenhada; None = sem limite).
+    # O módulo visualization (e o matplotlib) é importado apenas ao chamar
+    # esta função, de forma que importar a corner table não carrega o
+    # matplotlib.
+    def plotCornerTableMesh(self, title = None, displayLabels = False, filename = None, maxLabels = 500):
+        import visualization
+        vertices = self.__Vertices.view()
+        indexes = self.__Corners.view().reshape((self.__NTetr, 4))
+        # arestas únicas (u < v), a partir dos vizinhos de cada vértice.
+        offsets, neighbors = self.vertexRingsArray()
+        source = np.repeat(np.arange(self.__NVertex), np.diff(offsets))
+        edges = np.stack((source, neighbors), axis=1)[source < neighbors]
+        visualization.plotMesh(vertices, indexes, edges, title, displayLabels, filename, maxLabels)
 
@@ -1,47 +1,88 @@
 # Adaptado de:
 # https://github.com/milu-buet/python-avl-tree
 
+import array
 import math
 
-eps = 1e-10  # Erro admitido para ponto flutuante.
+eps = 1e-10  # Erro admitido para ponto flutuante (usado nas buscas por caixa).
 
+# Comparação lexicográfica exata das chaves (x, y, z).
+# A comparação não usa eps: comparar cada eixo com tolerância não é uma
+# ordem (não é transitiva: dois pontos podem ser "iguais" a um terceiro sem
+# serem iguais entre si), e a busca na árvore poderia não encontrar um
+# vértice existente. Os pontos a menos de eps de uma chave são encontrados
+# com find_within, que percorre a árvore em ordem a partir do limite
+# inferior (x - eps, y - eps, z - eps).
 def compkey(keya, keyb):
-    if abs(keya[0] - keyb[0]) < eps:
-        if abs(keya[1] - keyb[1]) < eps:
-            if abs(keya[2] - keyb[2]) < eps:
-                return 0
-            elif keya[2] < keyb[2]:
-                return -1
-            else:  # keya[2] > keyb[2]:
-                return 1
-        elif keya[1] < keyb[1]:
-            return -1
-        else:  # keya[1] > keyb[1]:
-            return 1
-    elif keya[0] < keyb[0]:
+    if keya[0] < keyb[0]:
+        return -1
+    elif keya[0] > keyb[0]:
+        return 1
+    elif keya[1] < keyb[1]:
         return -1
-    else: # keya[0] > keyb[0]:
+    elif keya[1] > keyb[1]:
         return 1
+    elif keya[2] < keyb[2]:
+        return -1
+    elif keya[2] > keyb[2]:
+        return 1
+    else:
+        return 0
+
+# Percorre a árvore perfeitamente balanceada com n nós, cujos nós em ordem
+# são os índices 0, ..., n - 1 (a raiz de cada intervalo é o elemento do
+# meio). Retorna, para cada nó, (índice, índice do pai (-1 = raiz), lado em
+# relação ao pai (-1 = esquerda, 1 = direita), altura, tamanho da
+# subárvore). O percurso é iterativo e O(n).
+def balanced_layout(n):
+    stack = [(0, n, -1, 0)]
+    while stack:
+        lo, hi, parent, side = stack.pop()
+        if lo >= hi:
+            continue
+        mid = (lo + hi) // 2
+        yield mid, parent, side, (hi - lo).bit_length() - 1, hi - lo
+        stack.append((lo, mid, mid, -1))
+        stack.append((mid + 1, hi, mid, 1))
+
+# Usada pela busca por caixa (find_within) ao encontrar a chave (kx, ky, kz):
+# retorna o próximo limite inferior da busca, que é sempre maior que a chave
+# ((inf, inf, inf) termina a busca), ou None se a chave pode estar dentro da
+# caixa e a busca deve seguir em ordem.
+def box_seek(kx, ky, kz, x, y, z, tolerance):
+    if kx >= x + tolerance:
+        return (math.inf, math.inf, math.inf)
+    if kx <= x - tolerance or ky >= y + tolerance:
+        # próximo valor de x.
+        return (kx, math.inf, math.inf)
+    if ky < y - tolerance:
+        return (kx, y - tolerance, z - tolerance)
+    if ky <= y - tolerance or kz >= z + tolerance:
+        # próximo par (x, y).
+        return (kx, ky, math.inf)
+    if kz < z - tolerance:
+        return (kx, ky, z - tolerance)
+    return None
 
-# def compkey(keya, keyb):
-#     if keya[0] < keyb[0]:
-#         return -1
-#     elif keya[0] > keyb[0]:
-#         return 1
-#     else:
-#         if keya[1] < keyb[1]:
-#             return -1
-#         elif keya[1] > keyb[1]:
-#             return 1
-#         else:
-#             if keya[2] < keyb[2]:
-#                 return -1
-#             elif keya[2] > keyb[2]:
-#                 return 1
-#             else:
-#                 return 0
+# Remove as chaves consecutivas iguais (compkey == 0) de uma sequência
+# ordenada, mantendo a primeira.
+def unique_sorted(keys, values):
+    unique_keys = []
+    unique_values = []
+    for key, value in zip(keys, values):
+        if unique_keys and compkey(key, unique_keys[-1]) == 0:
+            continue
+        unique_keys.append(key)
+        unique_values.append(value)
+    return unique_keys, unique_values
 
+# Os nós usam __slots__ (sem __dict__), o que reduz bastante a memória de
+# árvores com milhões de vértices.
+# Cada nó guarda também o tamanho da sua subárvore (size), usado por rank e
+# select.
 class Node():
+    __slots__ = ('key', 'value', 'parent', 'leftChild', 'rightChild', 'height', 'size')
+
     def __init__(self, key, value):
         self.key = key
         self.value = value
@@ -49,6 +90,7 @@ class Node():
         self.leftChild = None
         self.rightChild = None
         self.height = 0
+        self.size = 1
 
     def __str__(self):
         return str(self.key) + "(" + str(self.height) + ")"
@@ -66,6 +108,9 @@ class Node():
         else:
             return -1
 
+    def update_size(self):
+        self.size = 1 + (self.leftChild.size if self.leftChild else 0) + (self.rightChild.size if self.rightChild else 0)
+
     def balance(self):
         return (self.leftChild.height if self.leftChild else -1) - (self.rightChild.height if self.rightChild else -1)
 
@@ -75,6 +120,34 @@ class AVLTree():
         self.rootNode = None
         self.elements_count = 0
         self.rebalance_count = 0
+        self.visit_count = 0 # quantidade de chaves examinadas pelas buscas por caixa.
+
+    # Constrói uma árvore perfeitamente balanceada em O(n) a partir de
+    # chaves já ordenadas (por exemplo, vértices ordenados com np.lexsort),
+    # sem inserções nem rotações. Chaves consecutivas iguais são descartadas,
+    # mantendo a primeira (como em insert).
+    # Argumentos:
+    #       keys = sequência de chaves (x, y, z) em ordem crescente.
+    #       values = sequência com os valores de cada chave.
+    @classmethod
+    def from_sorted(cls, keys, values):
+        keys, values = unique_sorted(keys, values)
+        nodes = [Node(key, value) for key, value in zip(keys, values)]
+        tree = cls()
+        for index, parent, side, height, size in balanced_layout(len(nodes)):
+            node = nodes[index]
+            node.height = height
+            node.size = size
+            if parent < 0:
+                tree.rootNode = node
+            else:
+                node.parent = nodes[parent]
+                if side < 0:
+                    nodes[parent].leftChild = node
+                else:
+                    nodes[parent].rightChild = node
+        tree.elements_count = len(nodes)
+        return tree
 
     def height(self):
         if self.rootNode:
@@ -106,6 +179,8 @@ class AVLTree():
                     else:
                         F.leftChild = B
                     B.parent = F
+                A.update_size()
+                B.update_size()
                 self.recompute_heights(A)
                 self.recompute_heights(B.parent)
             else:
@@ -132,6 +207,9 @@ class AVLTree():
                     else:
                         F.leftChild = C
                     C.parent = F
+                A.update_size()
+                B.update_size()
+                C.update_size()
                 self.recompute_heights(A)
                 self.recompute_heights(B)
         else:
@@ -155,6 +233,8 @@ class AVLTree():
                     else:
                         F.leftChild = B
                     B.parent = F
+                A.update_size()
+                B.update_size()
                 self.recompute_heights(A)
                 self.recompute_heights(B.parent)
             else:
@@ -181,6 +261,9 @@ class AVLTree():
                     else:
                         F.leftChild = C
                     C.parent = F
+                A.update_size()
+                B.update_size()
+                C.update_size()
                 self.recompute_heights(A)
                 self.recompute_heights(B)
 
@@ -193,6 +276,8 @@ class AVLTree():
             # trival - no sanity check needed, as either the tree is empty or there is only one node in the tree
             pass
         else:
+            if node.size != 1 + (node.leftChild.size if node.leftChild else 0) + (node.rightChild.size if node.rightChild else 0):
+                raise Exception("Invalid size for node " + str(node))
             if node.height != node.max_children_height() + 1:
                 raise Exception("Invalid height for node " + str(node) + ": " + str(node.height) + " instead of " + str(
                     node.max_children_height() + 1) + "!")
@@ -230,48 +315,72 @@ class AVLTree():
             changed = node.height != old_height
             node = node.parent
 
+    # Insere child_node na subárvore de parent_node (iterativo, com uma única
+    # comparação por nível).
     def add_as_child(self, parent_node, child_node):
-        node_to_rebalance = None
-        if compkey(child_node.key, parent_node.key) < 0:
-            if not parent_node.leftChild:
-                parent_node.leftChild = child_node
-                child_node.parent = parent_node
-                if parent_node.height == 0:
-                    node = parent_node
-                    while node:
-                        node.height = node.max_children_height() + 1
-                        if not node.balance() in [-1, 0, 1]:
-                            node_to_rebalance = node
-                            break  # we need the one that is furthest from the root
-                        node = node.parent
-            else:
-                self.add_as_child(parent_node.leftChild, child_node)
-        else:
-            if not parent_node.rightChild:
-                parent_node.rightChild = child_node
-                child_node.parent = parent_node
-                if parent_node.height == 0:
-                    node = parent_node
-                    while node:
-                        node.height = node.max_children_height() + 1
-                        if not node.balance() in [-1, 0, 1]:
-                            node_to_rebalance = node
-                            break  # we need the one that is furthest from the root
-                        node = node.parent
+        node = parent_node
+        while True:
+            if compkey(child_node.key, node.key) < 0:
+                if not node.leftChild:
+                    node.leftChild = child_node
+                    break
+                node = node.leftChild
             else:
-                self.add_as_child(parent_node.rightChild, child_node)
+                if not node.rightChild:
+                    node.rightChild = child_node
+                    break
+                node = node.rightChild
+        child_node.parent = node
+        self.__update_after_insert(node)
 
-        if node_to_rebalance:
-            self.rebalance(node_to_rebalance)
+    # Atualiza os tamanhos e as alturas a partir do pai do nó inserido e
+    # rebalanceia o primeiro nó desbalanceado (o mais distante da raiz). A
+    # subida das alturas termina quando a altura de um nó não muda.
+    def __update_after_insert(self, node):
+        parent = node
+        while parent:
+            parent.size += 1
+            parent = parent.parent
+        while node:
+            old_height = node.height
+            node.height = node.max_children_height() + 1
+            balance = node.balance()
+            if balance > 1 or balance < -1:
+                self.rebalance(node)
+                break
+            if node.height == old_height:
+                break
+            node = node.parent
 
+    # Insere a chave key com o valor value. Se a chave já existir, a árvore
+    # não é modificada.
+    # A busca pela posição é iterativa e faz uma única comparação por nível
+    # (compkey retorna -1, 0 ou 1).
     def insert(self, key, value):
-        new_node = Node(key, value)
-        if not self.rootNode:
-            self.rootNode = new_node
-        else:
-            if not self.find(key):
-                self.elements_count += 1
-                self.add_as_child(self.rootNode, new_node)
+        node = self.rootNode
+        if node is None:
+            self.rootNode = Node(key, value)
+            self.elements_count += 1
+            return
+        while True:
+            comparison = compkey(key, node.key)
+            if comparison == 0:
+                return
+            if comparison < 0:
+                if node.leftChild is None:
+                    new_node = Node(key, value)
+                    node.leftChild = new_node
+                    break
+                node = node.leftChild
+            else:
+                if node.rightChild is None:
+                    new_node = Node(key, value)
+                    node.rightChild = new_node
+                    break
+                node = node.rightChild
+        new_node.parent = node
+        self.elements_count += 1
+        self.__update_after_insert(node)
 
     def find_biggest(self, start_node):
         node = start_node
@@ -347,15 +456,122 @@ class AVLTree():
     def find(self, key):
         return self.find_in_subtree(self.rootNode, key)
 
+    # Busca iterativa, com uma única comparação por nível.
     def find_in_subtree(self, node, key):
+        while node is not None:
+            comparison = compkey(key, node.key)
+            if comparison < 0:
+                node = node.leftChild
+            elif comparison > 0:
+                node = node.rightChild
+            else:  # key is equal to node key
+                return node
+        return None  # key not found
+
+    # Retorna o valor associado à chave key, ou default se a chave não
+    # existir.
+    def get(self, key, default = None):
+        node = self.find(key)
         if node is None:
-            return None  # key not found
-        if compkey(key, node.key) < 0:
-            return self.find_in_subtree(node.leftChild, key)
-        elif compkey(key, node.key) > 0:
-            return self.find_in_subtree(node.rightChild, key)
-        else:  # key is equal to node key
-            return node
+            return default
+        return node.value
+
+    # Altera o valor associado à chave key (se existir).
+    def set_value(self, key, value):
+        node = self.find(key)
+        if node is not None:
+            node.value = value
+
+    # Percorre os nós em ordem a partir do primeiro nó com chave >= lo
+    # (limite inferior), de forma preguiçosa: cada passo é O(1) amortizado,
+    # e a busca do limite inferior é O(log n).
+    def iter_from(self, lo):
+        stack = []
+        node = self.rootNode
+        while node is not None:
+            if compkey(node.key, lo) >= 0:
+                stack.append(node)
+                node = node.leftChild
+            else:
+                node = node.rightChild
+        while stack:
+            node = stack.pop()
+            yield node
+            child = node.rightChild
+            while child is not None:
+                stack.append(child)
+                child = child.leftChild
+
+    # Busca por caixa: retorna (gerador) os pares (chave, valor) de todas as
+    # chaves a menos de eps do ponto key em cada eixo. As chaves com x em
+    # (x - eps, x + eps) são contíguas na ordem lexicográfica, e dentro de
+    # cada valor de x (e de cada par x, y) as chaves com y (e z) na faixa
+    # também são. Ao sair da faixa, a busca salta (em O(log n)) para o
+    # próximo trecho que pode estar dentro da caixa, em vez de percorrer
+    # todas as chaves com x na faixa (por exemplo, um plano inteiro de uma
+    # grade regular).
+    def find_within(self, key, tolerance = None):
+        if tolerance is None:
+            tolerance = eps
+        x, y, z = key[0], key[1], key[2]
+        lo = (x - tolerance, y - tolerance, z - tolerance)
+        visited = 0
+        try:
+            while True:
+                for node in self.iter_from(lo):
+                    visited += 1
+                    nodeKey = node.key
+                    lo = box_seek(nodeKey[0], nodeKey[1], nodeKey[2], x, y, z, tolerance)
+                    if lo is not None:
+                        break
+                    if abs(nodeKey[0] - x) < tolerance and abs(nodeKey[1] - y) < tolerance and abs(nodeKey[2] - z) < tolerance:
+                        yield nodeKey, node.value
+                else:
+                    return
+        finally:
+            self.visit_count += visited
+
+    # Quantidade de chaves menores que key (posição de key na ordem), em
+    # O(log n), usando o tamanho das subárvores.
+    def rank(self, key):
+        result = 0
+        node = self.rootNode
+        while node is not None:
+            if compkey(key, node.key) <= 0:
+                node = node.leftChild
+            else:
+                result += (node.leftChild.size if node.leftChild else 0) + 1
+                node = node.rightChild
+        return result
+
+    # Retorna o nó com a index-ésima menor chave (começando em 0), em
+    # O(log n).
+    def select(self, index):
+        if index < 0 or index >= self.elements_count:
+            raise IndexError("AVLTree select index out of range")
+        node = self.rootNode
+        while True:
+            leftSize = node.leftChild.size if node.leftChild else 0
+            if index < leftSize:
+                node = node.leftChild
+            elif index > leftSize:
+                index -= leftSize + 1
+                node = node.rightChild
+            else:
+                return node
+
+    # Percorre (gerador) os pares (chave, valor) com lo <= chave < hi em
+    # ordem, sem montar a lista inteira: O(log n + k) para k chaves.
+    # Argumentos:
+    #       lo, hi = limites (x, y, z); None = sem limite. Por exemplo, uma
+    #       faixa de x é dada por lo = (x0, -inf, -inf) e hi = (x1, -inf, -inf).
+    def range(self, lo = None, hi = None):
+        if lo is None:
+            lo = (-math.inf, -math.inf, -math.inf)
+        for node in self.iter_from(lo):
+            if hi is not None and compkey(node.key, hi) >= 0:
+                break
+            yield node.key, node.value
 
     def remove(self, key):
         # first find
@@ -382,7 +598,15 @@ class AVLTree():
                 assert (node.leftChild) and (node.rightChild)
                 self.swap_with_successor_and_remove(node)
 
+    # diminui o tamanho das subárvores dos ancestrais do nó removido.
+    def __decrement_sizes(self, node):
+        node = node.parent
+        while node:
+            node.size -= 1
+            node = node.parent
+
     def remove_leaf(self, node):
+        self.__decrement_sizes(node)
         parent = node.parent
         if (parent):
             if parent.leftChild == node:
@@ -402,6 +626,7 @@ class AVLTree():
             node = node.parent
 
     def remove_branch(self, node):
+        self.__decrement_sizes(node)
         parent = node.parent
         leftChild = node.leftChild
         rightChild = node.rightChild
@@ -460,6 +685,9 @@ class AVLTree():
         tmp = node1.height
         node1.height = node2.height
         node2.height = tmp
+        tmp = node1.size
+        node1.size = node2.size
+        node2.size = tmp
 
         if parent1:
             if parent1.leftChild == node1:
@@ -515,6 +743,400 @@ class AVLTree():
         return out_string
 
 
+# Variante da AVLTree em que os nós ficam em arrays contíguos (pool de nós)
+# em vez de um objeto do python por nó. Cada nó é um índice nos arrays:
+#       keys = chaves (x, y, z), 3 valores double por nó;
+#       values = valores (inteiros);
+#       left, right = índices dos filhos (-1 = sem filho);
+#       heights = altura do nó (folha = 0);
+#       sizes = tamanho da subárvore do nó.
+# Um nó ocupa cerca de 45 bytes, contra algumas centenas de bytes de um Node
+# com uma lista de 3 floats como chave. Os nós removidos são reaproveitados
+# (lista de nós livres encadeada pelo array left). Como os nós não guardam o
+# pai, inserção e remoção guardam o caminho percorrido a partir da raiz.
+# Argumentos:
+#       capacity = quantidade esperada de nós (pré-aloca os arrays).
+class AVLTreeArray():
+    def __init__(self, capacity = 0):
+        self.keys = array.array('d', bytes(24 * capacity))
+        self.values = array.array('q', bytes(8 * capacity))
+        self.left = array.array('i', bytes(4 * capacity))
+        self.right = array.array('i', bytes(4 * capacity))
+        self.heights = array.array('b', bytes(capacity))
+        self.sizes = array.array('i', bytes(4 * capacity)) # tamanho da subárvore de cada nó.
+        self.size = 0 # quantidade de posições usadas nos arrays.
+        self.free = -1 # primeiro nó livre (-1 = nenhum).
+        self.rootNode = -1
+        self.elements_count = 0
+        self.rebalance_count = 0
+        self.visit_count = 0 # quantidade de chaves examinadas pelas buscas por caixa.
+
+    # Constrói uma árvore perfeitamente balanceada em O(n) a partir de
+    # chaves já ordenadas (ver AVLTree.from_sorted).
+    @classmethod
+    def from_sorted(cls, keys, values):
+        keys, values = unique_sorted(keys, values)
+        n = len(keys)
+        tree = cls()
+        for key in keys:
+            tree.keys.extend(key)
+        tree.values = array.array('q', values)
+        tree.left = array.array('i', [-1]) * n
+        tree.right = array.array('i', [-1]) * n
+        tree.heights = array.array('b', bytes(n))
+        tree.sizes = array.array('i', bytes(4 * n))
+        for index, parent, side, height, size in balanced_layout(n):
+            tree.heights[index] = height
+            tree.sizes[index] = size
+            if parent < 0:
+                tree.rootNode = index
+            elif side < 0:
+                tree.left[parent] = index
+            else:
+                tree.right[parent] = index
+        tree.size = n
+        tree.elements_count = n
+        return tree
+
+    def height(self):
+        if self.rootNode >= 0:
+            return self.heights[self.rootNode]
+        else:
+            return 0
+
+    # cria um nó, reaproveitando um nó livre se existir.
+    def new_node(self, key, value):
+        node = self.free
+        if node >= 0:
+            self.free = self.left[node]
+        elif self.size < len(self.values):
+            node = self.size
+            self.size += 1
+        else:
+            node = self.size
+            self.size += 1
+            self.keys.extend((0.0, 0.0, 0.0))
+            self.values.append(0)
+            self.left.append(-1)
+            self.right.append(-1)
+            self.heights.append(0)
+            self.sizes.append(1)
+        k = 3 * node
+        self.keys[k] = key[0]
+        self.keys[k + 1] = key[1]
+        self.keys[k + 2] = key[2]
+        self.values[node] = value
+        self.left[node] = -1
+        self.right[node] = -1
+        self.heights[node] = 0
+        self.sizes[node] = 1
+        return node
+
+    def free_node(self, node):
+        self.left[node] = self.free
+        self.free = node
+
+    def key(self, node):
+        k = 3 * node
+        return [self.keys[k], self.keys[k + 1], self.keys[k + 2]]
+
+    def __height(self, node):
+        return self.heights[node] if node >= 0 else -1
+
+    # atualiza a altura e o tamanho do nó a partir dos filhos.
+    def __update(self, node):
+        left = self.left[node]
+        right = self.right[node]
+        self.heights[node] = max(self.heights[left] if left >= 0 else -1, self.heights[right] if right >= 0 else -1) + 1
+        self.sizes[node] = 1 + (self.sizes[left] if left >= 0 else 0) + (self.sizes[right] if right >= 0 else 0)
+
+    def __rotate_right(self, node):
+        child = self.left[node]
+        self.left[node] = self.right[child]
+        self.right[child] = node
+        self.__update(node)
+        self.__update(child)
+        return child
+
+    def __rotate_left(self, node):
+        child = self.right[node]
+        self.right[node] = self.left[child]
+        self.left[child] = node
+        self.__update(node)
+        self.__update(child)
+        return child
+
+    # rebalanceia o nó (cujos filhos já estão balanceados) e retorna a nova
+    # raiz da subárvore.
+    def __rebalance(self, node):
+        self.__update(node)
+        balance = self.__height(self.left[node]) - self.__height(self.right[node])
+        if balance > 1:
+            self.rebalance_count += 1
+            left = self.left[node]
+            if self.__height(self.left[left]) < self.__height(self.right[left]):
+                self.left[node] = self.__rotate_left(left)
+            return self.__rotate_right(node)
+        if balance < -1:
+            self.rebalance_count += 1
+            right = self.right[node]
+            if self.__height(self.right[right]) < self.__height(self.left[right]):
+                self.right[node] = self.__rotate_right(right)
+            return self.__rotate_left(node)
+        return node
+
+    # rebalanceia os nós do caminho, de baixo para cima, atualizando os
+    # filhos dos pais quando a raiz de uma subárvore muda. Quando a altura
+    # de um nó não muda, os nós acima não precisam ser rebalanceados, e
+    # apenas os tamanhos são atualizados (somando delta = +1 na inserção ou
+    # -1 na remoção).
+    def __rebalance_path(self, path, sides, delta):
+        for i in range(len(path) - 1, -1, -1):
+            node = path[i]
+            old_height = self.heights[node]
+            subtree = self.__rebalance(node)
+            if i == 0:
+                self.rootNode = subtree
+            elif sides[i - 1] < 0:
+                self.left[path[i - 1]] = subtree
+            else:
+                self.right[path[i - 1]] = subtree
+            if subtree == node and self.heights[node] == old_height:
+                sizes = self.sizes
+                for j in range(i):
+                    sizes[path[j]] += delta
+                break
+
+    # Busca iterativa, com uma única comparação por nível.
+    # Retorna o índice do nó, ou -1 se a chave não existir.
+    def find(self, key):
+        keys = self.keys
+        node = self.rootNode
+        while node >= 0:
+            k = 3 * node
+            comparison = compkey(key, keys[k:k + 3])
+            if comparison < 0:
+                node = self.left[node]
+            elif comparison > 0:
+                node = self.right[node]
+            else:
+                return node
+        return -1
+
+    # Retorna o valor associado à chave key, ou default se a chave não
+    # existir.
+    def get(self, key, default = None):
+        node = self.find(key)
+        if node < 0:
+            return default
+        return self.values[node]
+
+    # Altera o valor associado à chave key (se existir).
+    def set_value(self, key, value):
+        node = self.find(key)
+        if node >= 0:
+            self.values[node] = value
+
+    # Percorre os nós (índices) em ordem a partir do primeiro nó com chave
+    # >= lo (ver AVLTree.iter_from).
+    def iter_from(self, lo):
+        keys = self.keys
+        left = self.left
+        right = self.right
+        stack = []
+        node = self.rootNode
+        while node >= 0:
+            k = 3 * node
+            if compkey(keys[k:k + 3], lo) >= 0:
+                stack.append(node)
+                node = left[node]
+            else:
+                node = right[node]
+        while stack:
+            node = stack.pop()
+            yield node
+            child = right[node]
+            while child >= 0:
+                stack.append(child)
+                child = left[child]
+
+    # Busca por caixa (ver AVLTree.find_within).
+    def find_within(self, key, tolerance = None):
+        if tolerance is None:
+            tolerance = eps
+        keys = self.keys
+        x, y, z = key[0], key[1], key[2]
+        lo = (x - tolerance, y - tolerance, z - tolerance)
+        visited = 0
+        try:
+            while True:
+                for node in self.iter_from(lo):
+                    visited += 1
+                    k = 3 * node
+                    lo = box_seek(keys[k], keys[k + 1], keys[k + 2], x, y, z, tolerance)
+                    if lo is not None:
+                        break
+                    if abs(keys[k] - x) < tolerance and abs(keys[k + 1] - y) < tolerance and abs(keys[k + 2] - z) < tolerance:
+                        yield [keys[k], keys[k + 1], keys[k + 2]], self.values[node]
+                else:
+                    return
+        finally:
+            self.visit_count += visited
+
+    # Quantidade de chaves menores que key (ver AVLTree.rank).
+    def rank(self, key):
+        keys = self.keys
+        result = 0
+        node = self.rootNode
+        while node >= 0:
+            k = 3 * node
+            if compkey(key, keys[k:k + 3]) <= 0:
+                node = self.left[node]
+            else:
+                left = self.left[node]
+                result += (self.sizes[left] if left >= 0 else 0) + 1
+                node = self.right[node]
+        return result
+
+    # Retorna o índice do nó com a index-ésima menor chave (ver
+    # AVLTree.select).
+    def select(self, index):
+        if index < 0 or index >= self.elements_count:
+            raise IndexError("AVLTreeArray select index out of range")
+        node = self.rootNode
+        while True:
+            left = self.left[node]
+            leftSize = self.sizes[left] if left >= 0 else 0
+            if index < leftSize:
+                node = left
+            elif index > leftSize:
+                index -= leftSize + 1
+                node = self.right[node]
+            else:
+                return node
+
+    # Percorre (gerador) os pares (chave, valor) com lo <= chave < hi em
+    # ordem (ver AVLTree.range).
+    def range(self, lo = None, hi = None):
+        if lo is None:
+            lo = (-math.inf, -math.inf, -math.inf)
+        for node in self.iter_from(lo):
+            key = self.key(node)
+            if hi is not None and compkey(key, hi) >= 0:
+                break
+            yield key, self.values[node]
+
+    # Insere a chave key com o valor value. Se a chave já existir, a árvore
+    # não é modificada.
+    def insert(self, key, value):
+        keys = self.keys
+        path = []
+        sides = []
+        node = self.rootNode
+        while node >= 0:
+            k = 3 * node
+            comparison = compkey(key, keys[k:k + 3])
+            if comparison == 0:
+                return
+            path.append(node)
+            sides.append(comparison)
+            node = self.left[node] if comparison < 0 else self.right[node]
+        node = self.new_node(key, value)
+        self.elements_count += 1
+        if not path:
+            self.rootNode = node
+            return
+        if sides[-1] < 0:
+            self.left[path[-1]] = node
+        else:
+            self.right[path[-1]] = node
+        self.__rebalance_path(path, sides, 1)
+
+    # Remove a chave key (se existir).
+    def remove(self, key):
+        keys = self.keys
+        path = []
+        sides = []
+        node = self.rootNode
+        while node >= 0:
+            k = 3 * node
+            comparison = compkey(key, keys[k:k + 3])
+            if comparison == 0:
+                break
+            path.append(node)
+            sides.append(comparison)
+            node = self.left[node] if comparison < 0 else self.right[node]
+        if node < 0:
+            return
+        self.elements_count -= 1
+
+        if self.left[node] >= 0 and self.right[node] >= 0:
+            # o nó tem dois filhos: copia a chave e o valor do sucessor (o
+            # menor nó da subárvore direita) e remove o sucessor.
+            path.append(node)
+            sides.append(1)
+            successor = self.right[node]
+            while self.left[successor] >= 0:
+                path.append(successor)
+                sides.append(-1)
+                successor = self.left[successor]
+            k = 3 * node
+            s = 3 * successor
+            keys[k:k + 3] = keys[s:s + 3]
+            self.values[node] = self.values[successor]
+            node = successor
+
+        # o nó tem no máximo um filho, que ocupa o seu lugar.
+        child = self.left[node] if self.left[node] >= 0 else self.right[node]
+        if not path:
+            self.rootNode = child
+        elif sides[-1] < 0:
+            self.left[path[-1]] = child
+        else:
+            self.right[path[-1]] = child
+        self.free_node(node)
+        if path:
+            self.__rebalance_path(path, sides, -1)
+
+    # lista das chaves em ordem (iterativo).
+    def inorder(self):
+        result = []
+        stack = []
+        node = self.rootNode
+        while stack or node >= 0:
+            while node >= 0:
+                stack.append(node)
+                node = self.left[node]
+            node = stack.pop()
+            result.append(self.key(node))
+            node = self.right[node]
+        return result
+
+    def sanity_check(self):
+        stack = [self.rootNode] if self.rootNode >= 0 else []
+        count = 0
+        while stack:
+            node = stack.pop()
+            count += 1
+            left = self.left[node]
+            right = self.right[node]
+            if self.heights[node] != max(self.__height(left), self.__height(right)) + 1:
+                raise Exception("Invalid height for node " + str(node))
+            if self.sizes[node] != 1 + (self.sizes[left] if left >= 0 else 0) + (self.sizes[right] if right >= 0 else 0):
+                raise Exception("Invalid size for node " + str(node))
+            if abs(self.__height(left) - self.__height(right)) > 1:
+                raise Exception("Balance factor for node " + str(node) + " is out of range")
+            if left >= 0:
+                if not (compkey(self.key(left), self.key(node)) <= 0):
+                    raise Exception("Key of left child of node " + str(node) + " is greater than key of his parent!")
+                stack.append(left)
+            if right >= 0:
+                if not (compkey(self.key(right), self.key(node)) >= 0):
+                    raise Exception("Key of right child of node " + str(node) + " is less than key of his parent!")
+                stack.append(right)
+        if count != self.elements_count:
+            raise Exception("Invalid elements count")
+
 if __name__ == "__main__":
     """check empty tree creation"""
     a = AVLTree()
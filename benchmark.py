@@ -0,0 +1,275 @@
+#########################
+# Author: lmreia
+# License: GNU General Public License v3 (GPL-3)
+#########################
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import numpy as np
+import CornerTable
+import CornerTable3D
+import CornerTable3D_avl
+
+# Benchmark de escalabilidade das corner tables.
+# Para cada backend e cada tamanho de malha, mede o tempo de:
+#       insert = inserir todos os elementos um a um (insertTriangle ou
+#       insertTetrahedron);
+#       fromArrays = construir a corner table de uma só vez a partir dos
+#       arrays;
+#       lookup = buscar vértices pela posição (findVertex);
+#       fullCornerTable = gerar a corner table completa (getFullCornerTable);
+#       removeElements = remover elementos (removeTriangles ou
+#       removeTetrahedra);
+#       removeVertex = remover vértices pela posição (removeVertex).
+# Mede também o tempo de importação dos módulos das corner tables (em um
+# interpretador novo), que deve ficar dentro de um orçamento: os módulos não
+# devem importar o matplotlib, o scipy ou o multiprocessing, que são
+# importados apenas nas funções que os utilizam.
+# O resultado é emitido em JSON, para comparar os backends (busca linear,
+# hash grid e árvore AVL) e detectar regressões entre versões.
+#
+# Uso:
+#       python benchmark.py --sizes 100 1000 10000 --output resultado.json
+#       python benchmark.py --backends 3d-hash 3d-avl --sizes 1000000
+#       python benchmark.py --imports-only --import-budget 0.2
+
+# Malha de triângulos de uma grade regular no quadrado [0, 1] x [0, 1], com
+# aproximadamente nFaces triângulos (2 por célula da grade).
+# Retorna um array (N, 3) de posições dos vértices e um array (M, 3) de
+# índices dos vértices dos triângulos (em sentido anti-horário).
+def gridMesh(nFaces):
+    n = max(1, int(round(np.sqrt(nFaces / 2))))
+    x, y = np.meshgrid(np.linspace(0, 1, n + 1), np.linspace(0, 1, n + 1))
+    vertices = np.stack((x.reshape(-1), y.reshape(-1), np.zeros(x.size)), axis=1)
+    a = (np.arange(n)[None, :] + (n + 1) * np.arange(n)[:, None]).reshape(-1)
+    faces = np.concatenate((
+        np.stack((a, a + 1, a + n + 2), axis=1),
+        np.stack((a, a + n + 2, a + n + 1), axis=1)
+    ))
+    return vertices, faces
+
+# Malha de triângulos de um disco de raio 1, com aproximadamente nFaces
+# triângulos (a grade de gridMesh deformada para o disco).
+def diskMesh(nFaces):
+    vertices, faces = gridMesh(nFaces)
+    x = 2 * vertices[:, 0] - 1
+    y = 2 * vertices[:, 1] - 1
+    vertices[:, 0] = x * np.sqrt(1 - y * y / 2)
+    vertices[:, 1] = y * np.sqrt(1 - x * x / 2)
+    return vertices, faces
+
+# Malha de tetraedros de uma grade regular no cubo [0, 1]^3, com
+# aproximadamente nCells células (6 tetraedros por célula, todos com a
+# diagonal principal da célula).
+# Retorna um array (N, 3) de posições dos vértices e um array (M, 4) de
+# índices dos vértices dos tetraedros.
+def tetLattice(nCells):
+    n = max(1, int(round(nCells ** (1 / 3))))
+    z, y, x = np.meshgrid(np.linspace(0, 1, n + 1), np.linspace(0, 1, n + 1), np.linspace(0, 1, n + 1), indexing='ij')
+    vertices = np.stack((x.reshape(-1), y.reshape(-1), z.reshape(-1)), axis=1)
+    k, j, i = np.meshgrid(np.arange(n), np.arange(n), np.arange(n), indexing='ij')
+    base = ((k * (n + 1) + j) * (n + 1) + i).reshape(-1)
+    step = np.asarray([1, n + 1, (n + 1) * (n + 1)])
+    tetrahedra = []
+    # cada permutação dos eixos define um caminho de (0, 0, 0) até (1, 1, 1)
+    # pelas arestas da célula, que são os 4 vértices de um tetraedro.
+    for order in ((0, 1, 2), (0, 2, 1), (1, 0, 2), (1, 2, 0), (2, 0, 1), (2, 1, 0)):
+        path = np.cumsum(step[list(order)])
+        tetrahedra.append(np.stack((base, base + path[0], base + path[1], base + path[2]), axis=1))
+    return vertices, np.concatenate(tetrahedra)
+
+# Backends disponíveis: nome -> (dimensão, classe, argumentos do construtor).
+_backends = {
+    '2d-linear': (2, CornerTable.CornerTable, {'vertexIndex': 'linear'}),
+    '2d-hash': (2, CornerTable.CornerTable, {'vertexIndex': 'hash'}),
+    '3d-linear': (3, CornerTable3D.CornerTable3D, {'vertexIndex': 'linear'}),
+    '3d-hash': (3, CornerTable3D.CornerTable3D, {'vertexIndex': 'hash'}),
+    '3d-avl': (3, CornerTable3D_avl.CornerTable3D, {}),
+    '3d-avl-pool': (3, CornerTable3D_avl.CornerTable3D, {'nodePool': True}),
+}
+
+# Mede os tempos de todas as operações para um backend e um tamanho.
+# Argumentos:
+#       backend = nome do backend (ver _backends).
+#       size = quantidade aproximada de triângulos (2D) ou de células (3D).
+#       samples = quantidade de buscas e de elementos removidos.
+#       vertexRemovals = quantidade de vértices removidos um a um (cada
+#       remoção também remove os elementos incidentes ao vértice).
+#       mesh = malha 2D utilizada: 'grid' ou 'disk'.
+#       seed = semente do gerador de números aleatórios.
+# Retorna uma lista de dicionários, um por operação.
+def run(backend, size, samples = 1000, vertexRemovals = 10, mesh = 'grid', seed = 0):
+    dimension, tableClass, arguments = _backends[backend]
+    rng = np.random.default_rng(seed)
+    if dimension == 2:
+        vertices, elements = (diskMesh if mesh == 'disk' else gridMesh)(size)
+    else:
+        vertices, elements = tetLattice(size)
+    results = []
+
+    def record(operation, count, seconds):
+        results.append({
+            'backend': backend,
+            'size': size,
+            'vertices': int(vertices.shape[0]),
+            'elements': int(elements.shape[0]),
+            'operation': operation,
+            'count': int(count),
+            'seconds': seconds,
+            'perOperation': seconds / count if count else 0.0
+        })
+
+    # inserindo os elementos um a um (as posições já são listas do python,
+    # para medir apenas a corner table).
+    coordinates = vertices[elements].reshape((elements.shape[0], -1)).tolist()
+    table = tableClass(**arguments)
+    insert = table.insertTriangle if dimension == 2 else table.insertTetrahedron
+    start = time.perf_counter()
+    for element in coordinates:
+        insert(*element)
+    record('insert', len(coordinates), time.perf_counter() - start)
+
+    start = time.perf_counter()
+    tableClass.fromArrays(vertices, elements, **arguments)
+    record('fromArrays', elements.shape[0], time.perf_counter() - start)
+
+    points = table.getStorageView()[0]
+    queries = points[rng.integers(0, points.shape[0], samples)].tolist()
+    start = time.perf_counter()
+    for x, y, z in queries:
+        table.findVertex(x, y, z)
+    record('lookup', len(queries), time.perf_counter() - start)
+
+    start = time.perf_counter()
+    table.getFullCornerTable()
+    record('fullCornerTable', table.getStorageView()[1].shape[0], time.perf_counter() - start)
+
+    count = min(samples, elements.shape[0] // 10)
+    removed = rng.choice(elements.shape[0], count, replace=False).tolist()
+    remove = table.removeTriangles if dimension == 2 else table.removeTetrahedra
+    start = time.perf_counter()
+    remove(removed)
+    record('removeElements', count, time.perf_counter() - start)
+
+    points = table.getStorageView()[0]
+    count = min(vertexRemovals, points.shape[0] // 10)
+    removedPoints = points[rng.choice(points.shape[0], count, replace=False)].tolist()
+    start = time.perf_counter()
+    for x, y, z in removedPoints:
+        table.removeVertex(x, y, z)
+    record('removeVertex', count, time.perf_counter() - start)
+    return results
+
+# Módulos das corner tables cujo tempo de importação é medido.
+coreModules = ('CornerTable', 'CornerTable3D', 'CornerTable3D_avl')
+
+# Módulos que não devem ser carregados ao importar as corner tables.
+lazyModules = ('matplotlib', 'scipy', 'multiprocessing')
+
+# Orçamento padrão do tempo de importação de cada módulo (em segundos,
+# incluindo o numpy).
+importBudget = 0.25
+
+# Mede o tempo de importação de cada módulo em um interpretador novo (para
+# que nada esteja em cache em sys.modules) e verifica os módulos carregados.
+# Argumentos:
+#       modules = nomes dos módulos.
+#       repeat = quantidade de medições de cada módulo (o menor tempo é
+#       utilizado).
+#       budget = tempo máximo de importação de cada módulo (em segundos).
+# Retorna uma lista de dicionários, um por módulo.
+def importTimes(modules = coreModules, repeat = 5, budget = importBudget):
+    code = ('import sys, time, json\n'
+            'start = time.perf_counter()\n'
+            'import {0}\n'
+            'seconds = time.perf_counter() - start\n'
+            'print(json.dumps([seconds, [m for m in {1!r} if m in sys.modules]]))\n')
+    directory = os.path.dirname(os.path.abspath(__file__))
+    results = []
+    for module in modules:
+        times = []
+        for _ in range(repeat):
+            output = subprocess.run([sys.executable, '-c', code.format(module, lazyModules)], cwd=directory,
+                                    capture_output=True, text=True, check=True).stdout
+            seconds, loaded = json.loads(output)
+            times.append(seconds)
+        results.append({
+            'module': module,
+            'seconds': min(times),
+            'budget': budget,
+            'loaded': loaded,
+            'withinBudget': min(times) <= budget and not loaded
+        })
+    return results
+
+# Executa o benchmark para vários backends e tamanhos.
+# Os tamanhos de um backend são interrompidos quando a inserção passa de
+# timeLimit segundos (por exemplo, a busca linear em malhas grandes).
+# Argumentos:
+#       backends = nomes dos backends (ver _backends).
+#       sizes = tamanhos das malhas, em ordem crescente.
+#       timeLimit = tempo máximo de inserção (em segundos) para continuar
+#       com os tamanhos maiores (None = sem limite).
+#       budget = orçamento do tempo de importação (ver importTimes).
+#       demais argumentos = ver run.
+# Retorna um dicionário com informações do ambiente e os resultados.
+def benchmark(backends = tuple(_backends), sizes = (100, 1000, 10000, 100000), timeLimit = 60.0, budget = importBudget, **arguments):
+    imports = importTimes(budget = budget)
+    results = []
+    skipped = []
+    for backend in backends:
+        if backend not in _backends:
+            raise Exception("Unknown backend: " + str(backend))
+        for i, size in enumerate(sizes):
+            backendResults = run(backend, size, **arguments)
+            results.extend(backendResults)
+            insertTime = backendResults[0]['seconds']
+            if timeLimit is not None and insertTime > timeLimit:
+                skipped.extend({'backend': backend, 'size': larger} for larger in sizes[i + 1:])
+                break
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'imports': imports,
+        'results': results,
+        'skipped': skipped
+    }
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description='Benchmark de escalabilidade das corner tables.')
+    parser.add_argument('--backends', nargs='+', default=list(_backends), choices=list(_backends))
+    parser.add_argument('--sizes', nargs='+', type=int, default=[100, 1000, 10000, 100000])
+    parser.add_argument('--samples', type=int, default=1000)
+    parser.add_argument('--vertex-removals', type=int, default=10)
+    parser.add_argument('--mesh', default='grid', choices=['grid', 'disk'])
+    parser.add_argument('--time-limit', type=float, default=60.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--import-budget', type=float, default=importBudget,
+                        help='tempo máximo de importação de cada módulo (em segundos)')
+    parser.add_argument('--imports-only', action='store_true', help='mede apenas o tempo de importação')
+    parser.add_argument('--output', default=None, help='arquivo JSON de saída (padrão: saída padrão)')
+    args = parser.parse_args(argv)
+
+    if args.imports_only:
+        report = {'python': platform.python_version(), 'imports': importTimes(budget = args.import_budget)}
+    else:
+        report = benchmark(args.backends, sorted(args.sizes), args.time_limit, args.import_budget, samples = args.samples,
+                           vertexRemovals = args.vertex_removals, mesh = args.mesh, seed = args.seed)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    # código de saída diferente de zero se algum módulo passar do orçamento.
+    if not all(result['withinBudget'] for result in report['imports']):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
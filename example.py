@@ -1,6 +1,6 @@
 import CornerTable
 import numpy as np
-import pywavefront
+import objreader
 
 
 # Example 1
@@ -13,24 +13,23 @@ import pywavefront
 
 
 # Example 2
-scene = pywavefront.Wavefront('small_disk.obj', collect_faces = True, create_materials=True)
-
-vertices = scene.vertices
-faces = scene.mesh_list[0].faces
-
-cornerTable = CornerTable.CornerTable()
-for i in range(len(faces)):
-    f0 = faces[i][0]
-    f1 = faces[i][1]
-    f2 = faces[i][2]
-    p0 = vertices[f0]
-    p1 = vertices[f1]
-    p2 = vertices[f2]
-    cornerTable.insertTriangle(
-        p0[0], p0[1], p0[2], 
-        p1[0], p1[1], p1[2], 
-        p2[0], p2[1], p2[2]
-    )
+# Corner tables vazias (construídas com fromArrays, carregadas com load ou
+# após remover todos os vértices) devem continuar aceitando inserções.
+emptyTable = CornerTable.CornerTable.fromArrays(np.empty((0, 3)), np.empty((0, 3), dtype=np.int64))
+emptyTable.insertTriangle(0,0,0, 1,0,0, 0,1,0)
+assert emptyTable.getStorageView()[1].tolist() == [0, 1, 2]
+for incidence in ['lists', 'csr', 'corner']:
+    emptyTable = CornerTable.CornerTable(incidence = incidence)
+    emptyTable.insertTriangle(0,0,0, 1,0,0, 0,1,0)
+    emptyTable.removeVertices([0, 1, 2])
+    emptyTable.insertTriangle(0,0,0, 1,0,0, 0,1,0)
+    assert emptyTable.getStorageView()[1].tolist() == [0, 1, 2]
+
+
+# Example 3
+vertices, faces = objreader.readOBJ('small_disk.obj')
+
+cornerTable = CornerTable.CornerTable.fromArrays(vertices, faces)
 
 print('c v t n p o l r')
 print(np.asarray(cornerTable.getFullCornerTable()))
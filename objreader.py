@@ -0,0 +1,101 @@
+#########################
+# Author: lmreia
+# License: GNU General Public License v3 (GPL-3)
+#########################
+
+import numpy as np
+
+# Leitor de arquivos Wavefront OBJ para a corner table.
+# Apenas as linhas 'v' (posições dos vértices) e 'f' (faces) são utilizadas;
+# as demais linhas (vt, vn, g, usemtl, comentários, ...) são ignoradas.
+# As faces podem estar nas formas 'f a b c', 'f a/b c/d e/f', 'f a//c ...' ou
+# 'f a/b/c ...', com índices negativos (relativos ao último vértice lido), e
+# polígonos com mais de 3 vértices são triangulados em leque (fan).
+# O arquivo é lido em blocos de linhas, e cada bloco é convertido de uma só
+# vez para arrays do numpy, sem criar uma tupla do python para cada vértice e
+# face.
+
+# Converte um bloco de linhas em arrays de vértices e faces.
+# Argumentos:
+#       lines = linhas do bloco.
+#       vertexCount = quantidade de vértices lidos antes do bloco (usada para
+#       os índices negativos).
+# Retorna um array (N, 3) de posições e um array (M, 3) de índices de
+# vértices (começando em 0) dos triângulos.
+def _parseChunk(lines, vertexCount):
+    vertexTokens = []
+    faceTokens = []
+    faceSizes = []
+    faceVertexCounts = [] # quantidade de vértices lidos antes de cada face.
+    for line in lines:
+        parts = line.split()
+        if not parts:
+            continue
+        if parts[0] == 'v':
+            if len(parts) < 4:
+                raise Exception("Invalid OBJ vertex: " + line.strip())
+            vertexTokens.extend(parts[1:4])
+        elif parts[0] == 'f':
+            if len(parts) < 4:
+                raise Exception("Invalid OBJ face: " + line.strip())
+            faceTokens.extend(parts[1:])
+            faceSizes.append(len(parts) - 1)
+            faceVertexCounts.append(vertexCount + len(vertexTokens) // 3)
+
+    vertices = np.array(vertexTokens, dtype=np.float64).reshape((-1, 3))
+    if not faceTokens:
+        return vertices, np.empty((0, 3), dtype=np.int64)
+
+    # índices dos vértices (o que vem antes da primeira '/').
+    indices = np.array([token.split('/', 1)[0] for token in faceTokens], dtype=np.int64)
+    if np.any(indices == 0):
+        raise Exception("Invalid OBJ face index: 0")
+    faceSizes = np.asarray(faceSizes, dtype=np.int64)
+    # índices positivos começam em 1; índices negativos são relativos à
+    # quantidade de vértices lidos até a face.
+    base = np.repeat(np.asarray(faceVertexCounts, dtype=np.int64), faceSizes)
+    indices = np.where(indices < 0, base + indices, indices - 1)
+
+    # triangulação em leque: a face (v0, v1, ..., vk) gera os triângulos
+    # (v0, vi, vi+1) para i = 1, ..., k - 1.
+    triangleCounts = faceSizes - 2
+    first = np.repeat(np.cumsum(faceSizes) - faceSizes, triangleCounts)
+    local = np.arange(first.shape[0]) - np.repeat(np.cumsum(triangleCounts) - triangleCounts, triangleCounts)
+    faces = np.stack((indices[first], indices[first + local + 1], indices[first + local + 2]), axis=1)
+    return vertices, faces
+
+# Lê o arquivo OBJ em blocos (modo streaming), retornando um gerador de pares
+# (vértices, faces) para cada bloco. Os índices das faces são globais
+# (relativos ao arquivo inteiro, começando em 0), de forma que os blocos
+# podem ser processados ou acumulados sem manter o arquivo inteiro em memória.
+# Argumentos:
+#       path = caminho do arquivo.
+#       chunkSize = quantidade aproximada de bytes lidos em cada bloco.
+def iterOBJ(path, chunkSize = 1 << 24):
+    vertexCount = 0
+    with open(path, 'r') as f:
+        while True:
+            lines = f.readlines(chunkSize)
+            if not lines:
+                break
+            vertices, faces = _parseChunk(lines, vertexCount)
+            vertexCount += vertices.shape[0]
+            yield vertices, faces
+
+# Lê o arquivo OBJ inteiro.
+# Os arrays de cada bloco são guardados e concatenados uma única vez no
+# final, de forma que os arrays retornados têm exatamente o tamanho dos dados
+# (sem capacidade sobrando) e o pico de memória é cerca de duas vezes o
+# tamanho dos arrays finais (os blocos mais o resultado da concatenação).
+# Argumentos:
+#       path = caminho do arquivo.
+#       chunkSize = quantidade aproximada de bytes lidos em cada bloco.
+# Retorna um array (N, 3) de posições dos vértices e um array (M, 3) de
+# índices dos vértices (começando em 0) dos triângulos.
+def readOBJ(path, chunkSize = 1 << 24):
+    vertices = [np.empty((0, 3), dtype=np.float64)]
+    faces = [np.empty((0, 3), dtype=np.int64)]
+    for chunkVertices, chunkFaces in iterOBJ(path, chunkSize):
+        vertices.append(chunkVertices)
+        faces.append(chunkFaces)
+    return np.concatenate(vertices), np.concatenate(faces)
@@ -0,0 +1,167 @@
+#########################
+# Author: lmreia
+# License: GNU General Public License v3 (GPL-3)
+#########################
+
+import os
+import numpy as np
+
+# Cálculo dos corners opostos em vários processos, para a construção de
+# corner tables grandes (ver buildParallel nas classes).
+# Os corners e os corners opostos ficam em blocos de memória compartilhada
+# (multiprocessing.shared_memory), de forma que os processos não copiam os
+# arrays: cada processo recebe apenas o nome dos blocos e o intervalo de
+# elementos da sua partição.
+#       1. O array de elementos é dividido em partições contíguas e, em cada
+#       processo, os pares de corners opostos dentro da partição são
+#       encontrados e escritos diretamente no array compartilhado. O processo
+#       retorna apenas os corners que ficaram sem oposto.
+#       2. Na junção, os corners que ficaram sem oposto em todas as partições
+#       são comparados entre si, o que resolve os pares entre partições
+#       diferentes (e os que continuam sem oposto estão na borda da malha).
+#       Para que a junção também seja feita em paralelo, esses corners são
+#       separados em grupos pelo menor vértice da sua face (ou aresta): as
+#       cópias de uma mesma face ficam sempre no mesmo grupo, então cada grupo
+#       é resolvido de forma independente em um processo.
+# Quanto mais próximos no array estiverem os elementos vizinhos (como nas
+# malhas geradas por TetGen, Gmsh etc.), menos corners vão para a junção.
+# O multiprocessing só é importado quando mais de um processo é utilizado,
+# para não aumentar o tempo de importação das corner tables.
+# Em faces (ou arestas) não-manifold, os pares encontrados dentro de uma
+# partição são mantidos mesmo que outra partição tenha a mesma face; para
+# malhas manifold o resultado é o mesmo do cálculo em um único processo.
+
+# Menor quantidade de elementos por partição (abaixo disso, o custo de
+# iniciar os processos é maior que o do cálculo).
+minimumPartition = 1 << 16
+
+# Cria um bloco de memória compartilhada com uma cópia de array (ou
+# preenchido com fill, se array for um formato).
+def _share(array, dtype = None, fill = None):
+    from multiprocessing import shared_memory
+    if fill is not None:
+        shape = array
+        dtype = np.dtype(dtype)
+    else:
+        shape = array.shape
+        dtype = array.dtype
+    block = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * dtype.itemsize, 1))
+    view = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+    if fill is not None:
+        view[...] = fill
+    else:
+        view[...] = array
+    return block, view
+
+# Abre os blocos de memória compartilhada names (nos processos).
+def _attach(names):
+    from multiprocessing import shared_memory
+    return [shared_memory.SharedMemory(name=name) for name in names]
+
+# Executada em cada processo: encontra os pares de corners opostos entre os
+# corners dos elementos [start, end) e retorna os corners que ficaram sem
+# oposto.
+def _matchElements(task):
+    match, names, nCorners, cornersPerElement, start, end = task
+    blocks = _attach(names)
+    try:
+        corners = np.ndarray((nCorners,), dtype=np.int64, buffer=blocks[0].buf)
+        opposite = np.ndarray((nCorners,), dtype=np.int64, buffer=blocks[1].buf)
+        c = np.arange(start * cornersPerElement, end * cornersPerElement, dtype=np.int64)
+        first, second = match(corners, c)
+        opposite[first] = second
+        opposite[second] = first
+        return c[opposite[c] < 0]
+    finally:
+        corners = opposite = None
+        for block in blocks:
+            block.close()
+
+# Executada em cada processo: encontra os pares de corners opostos entre os
+# corners unmatched[start:end] (um grupo da junção).
+def _matchGroup(task):
+    match, names, nCorners, nUnmatched, start, end = task
+    blocks = _attach(names)
+    try:
+        corners = np.ndarray((nCorners,), dtype=np.int64, buffer=blocks[0].buf)
+        opposite = np.ndarray((nCorners,), dtype=np.int64, buffer=blocks[1].buf)
+        unmatched = np.ndarray((nUnmatched,), dtype=np.int64, buffer=blocks[2].buf)
+        first, second = match(corners, unmatched[start:end].copy())
+        opposite[first] = second
+        opposite[second] = first
+    finally:
+        corners = opposite = unmatched = None
+        for block in blocks:
+            block.close()
+
+# Menor vértice da face (ou aresta) oposta a cada corner c, isto é, o menor
+# entre os outros vértices do elemento de c.
+def _smallestOtherVertex(corners, c, cornersPerElement):
+    element = corners[(c // cornersPerElement * cornersPerElement)[:, None] + np.arange(cornersPerElement)]
+    element[np.arange(c.shape[0]), c % cornersPerElement] = np.iinfo(np.int64).max
+    return element.min(axis=1)
+
+# Calcula o corner oposto de cada corner usando vários processos.
+# Argumentos:
+#       corners = array com os índices dos vértices de todos os corners (os
+#       elementos concatenados).
+#       cornersPerElement = 3 (triângulos) ou 4 (tetraedros).
+#       match = função match(corners, c) que retorna os pares de corners
+#       opostos entre os corners c (CornerTable.matchHalfEdges ou
+#       CornerTable3D.matchFaces); deve ser uma função do nível do módulo,
+#       para poder ser enviada aos processos.
+#       workers = quantidade de processos (None = quantidade de CPUs); com
+#       1, ou com poucos elementos, o cálculo é feito no próprio processo.
+#       context = contexto do multiprocessing (None = o padrão da
+#       plataforma).
+# Retorna um array com o corner oposto de cada corner (-1 se não existir).
+def oppositeCorners(corners, cornersPerElement, match, workers = None, context = None):
+    corners = np.ascontiguousarray(corners, dtype=np.int64).reshape(-1)
+    nCorners = corners.shape[0]
+    nElements = nCorners // cornersPerElement
+    if workers is None:
+        workers = os.cpu_count() or 1
+    partitions = max(1, min(int(workers), nElements // minimumPartition, 1 << 14))
+    if partitions == 1:
+        opposite = np.full(nCorners, -1, dtype=np.int64)
+        first, second = match(corners, np.arange(nCorners, dtype=np.int64))
+        opposite[first] = second
+        opposite[second] = first
+        return opposite
+
+    import multiprocessing
+    bounds = np.linspace(0, nElements, partitions + 1).astype(np.int64).tolist()
+    cornersBlock, shared = _share(corners)
+    oppositeBlock, opposite = _share((nCorners,), np.int64, -1)
+    blocks = [cornersBlock, oppositeBlock]
+    try:
+        names = [block.name for block in blocks]
+        if context is None:
+            context = multiprocessing.get_context()
+        with context.Pool(partitions) as pool:
+            tasks = [(match, names, nCorners, cornersPerElement, bounds[i], bounds[i + 1]) for i in range(partitions)]
+            unmatched = np.concatenate(pool.map(_matchElements, tasks))
+
+            # junção: pares entre partições diferentes, separados em grupos
+            # pelo menor vértice da face.
+            if unmatched.shape[0] < minimumPartition * cornersPerElement:
+                first, second = match(corners, unmatched)
+                opposite[first] = second
+                opposite[second] = first
+            else:
+                smallest = _smallestOtherVertex(corners, unmatched, cornersPerElement)
+                group = (smallest * partitions // (int(corners.max()) + 1)).astype(np.int16)
+                order = np.argsort(group, kind='stable')
+                bounds = np.searchsorted(group[order], np.arange(partitions + 1)).tolist()
+                unmatchedBlock, shared = _share(unmatched[order])
+                blocks.append(unmatchedBlock)
+                names.append(unmatchedBlock.name)
+                tasks = [(match, names, nCorners, unmatched.shape[0], bounds[i], bounds[i + 1]) for i in range(partitions)]
+                pool.map(_matchGroup, tasks)
+        return opposite.copy()
+    finally:
+        # as views precisam ser liberadas antes de fechar os blocos.
+        shared = opposite = None
+        for block in blocks:
+            block.close()
+            block.unlink()
@@ -0,0 +1,96 @@
+#########################
+# Author: lmreia
+# License: GNU General Public License v3 (GPL-3)
+#########################
+
+import math
+
+# Índice espacial (hash grid) para encontrar vértices pela posição.
+# O espaço é dividido em células cúbicas de lado eps e cada célula guarda os
+# vértices que caem nela. Para buscar um ponto, só é necessário olhar as
+# células que intersectam a caixa [x - eps, x + eps] x [y - eps, y + eps] x
+# [z - eps, z + eps] (no máximo 3 células por eixo), de forma que a busca é
+# O(1) esperado, em vez da busca linear sobre todos os vértices.
+# Argumentos:
+#       eps = erro admitido para ponto flutuante (dois pontos são o mesmo
+#       vértice se a diferença em cada eixo for menor que eps).
+class VertexHashGrid:
+    def __init__(self, eps = 1e-10):
+        self.__eps = eps
+        self.__cells = {} # célula -> lista de (índice, x, y, z).
+
+    def __cell(self, x, y, z):
+        return (math.floor(x / self.__eps), math.floor(y / self.__eps), math.floor(z / self.__eps))
+
+    def __len__(self):
+        return sum(len(cell) for cell in self.__cells.values())
+
+    def clear(self):
+        self.__cells = {}
+
+    # Adiciona o vértice de índice index na posição (x, y, z).
+    def insert(self, x, y, z, index):
+        self.__cells.setdefault(self.__cell(x, y, z), []).append((index, float(x), float(y), float(z)))
+
+    # Remove o vértice de índice index, que está na posição (x, y, z).
+    def remove(self, x, y, z, index):
+        key = self.__cell(x, y, z)
+        cell = self.__cells.get(key)
+        if cell is None:
+            return
+        for i in range(len(cell)):
+            if cell[i][0] == index:
+                del cell[i]
+                break
+        if not cell:
+            del self.__cells[key]
+
+    # Altera o índice do vértice na posição (x, y, z) de oldIndex para
+    # newIndex (usado quando o último vértice é movido para a posição de um
+    # vértice removido).
+    def move(self, x, y, z, oldIndex, newIndex):
+        cell = self.__cells.get(self.__cell(x, y, z))
+        if cell is None:
+            return
+        for i in range(len(cell)):
+            if cell[i][0] == oldIndex:
+                cell[i] = (newIndex, float(x), float(y), float(z))
+                break
+
+    # Reconstrói o índice a partir de um array (N, 3) de posições, onde o
+    # índice de cada vértice é a sua linha no array.
+    def rebuild(self, vertices):
+        self.clear()
+        for index, (x, y, z) in enumerate(vertices.tolist()):
+            self.insert(x, y, z, index)
+
+    # Busca um vértice na posição (x, y, z).
+    # Retorna o menor índice entre os vértices a menos de eps do ponto
+    # (o mesmo resultado da busca linear), ou -1 se não existir.
+    def find(self, x, y, z):
+        eps = self.__eps
+        cells = self.__cells
+        result = -1
+        for i in range(math.floor((x - eps) / eps), math.floor((x + eps) / eps) + 1):
+            for j in range(math.floor((y - eps) / eps), math.floor((y + eps) / eps) + 1):
+                for k in range(math.floor((z - eps) / eps), math.floor((z + eps) / eps) + 1):
+                    cell = cells.get((i, j, k))
+                    if cell is None:
+                        continue
+                    for index, vx, vy, vz in cell:
+                        if abs(vx - x) < eps and abs(vy - y) < eps and abs(vz - z) < eps:
+                            if result == -1 or index < result:
+                                result = index
+        return result
+
+    # Quantidade de vértices comparados por find(x, y, z) (os vértices das
+    # células vizinhas ao ponto), usada nas estatísticas das corner tables.
+    def candidates(self, x, y, z):
+        eps = self.__eps
+        cells = self.__cells
+        count = 0
+        for i in range(math.floor((x - eps) / eps), math.floor((x + eps) / eps) + 1):
+            for j in range(math.floor((y - eps) / eps), math.floor((y + eps) / eps) + 1):
+                for k in range(math.floor((z - eps) / eps), math.floor((z + eps) / eps) + 1):
+                    count += len(cells.get((i, j, k), ()))
+        return count
@@ -0,0 +1,73 @@
+#########################
+# Author: lmreia
+# License: GNU General Public License v3 (GPL-3)
+#########################
+
+import functools
+import time
+
+# Estatísticas de uso das corner tables (ver enableStats nas classes):
+# contadores de operações internas (buscas de vértices, comparações,
+# consultas de corners opostos, remoções das listas de corners incidentes,
+# ...) e, para cada método público, a quantidade de chamadas e o tempo
+# acumulado.
+# Os tempos são inclusivos: um método público chamado por outro (por
+# exemplo, removeVertices chamado por removeVertex) é contado nos dois.
+# Um mesmo objeto pode ser compartilhado por várias corner tables, para
+# acumular as estatísticas de todas elas.
+class Stats:
+    def __init__(self):
+        self.counters = {} # nome -> contagem.
+        self.calls = {} # método -> quantidade de chamadas.
+        self.times = {} # método -> tempo acumulado (segundos).
+
+    # Soma amount ao contador name.
+    def count(self, name, amount = 1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    # Zera todos os contadores e tempos.
+    def reset(self):
+        self.counters = {}
+        self.calls = {}
+        self.times = {}
+
+    # Retorna uma cópia das estatísticas em um dicionário (que pode ser
+    # convertido diretamente para JSON).
+    def report(self):
+        return {
+            'counters': dict(self.counters),
+            'calls': dict(self.calls),
+            'times': dict(self.times)
+        }
+
+    def __repr__(self):
+        return 'Stats(' + repr(self.report()) + ')'
+
+# método que acumula a quantidade de chamadas e o tempo de method em stats.
+def _timed(method, name, stats):
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            stats.calls[name] = stats.calls.get(name, 0) + 1
+            stats.times[name] = stats.times.get(name, 0.0) + time.perf_counter() - start
+    return wrapper
+
+# Substitui os métodos names do objeto obj (apenas nesta instância) por
+# versões que medem o tempo de cada chamada. Os métodos da classe não são
+# alterados, de forma que as outras instâncias não têm nenhum custo extra.
+# Argumentos:
+#       obj = objeto (corner table).
+#       names = nomes dos métodos.
+#       stats = objeto Stats onde os tempos são acumulados.
+def instrument(obj, names, stats):
+    for name in names:
+        method = getattr(type(obj), name).__get__(obj)
+        setattr(obj, name, _timed(method, name, stats))
+
+# Desfaz instrument, voltando a usar os métodos da classe.
+def uninstrument(obj, names):
+    for name in names:
+        obj.__dict__.pop(name, None)
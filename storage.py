@@ -0,0 +1,191 @@
+#########################
+# Author: lmreia
+# License: GNU General Public License v3 (GPL-3)
+#########################
+
+import struct
+import numpy as np
+
+# Array contíguo do numpy com capacidade crescente, utilizado como
+# armazenamento das corner tables (corners, corners opostos e vértices).
+# Em vez de uma lista do python com um objeto para cada inteiro, os valores
+# ficam em um único buffer numpy. Quando o buffer enche, a capacidade é
+# dobrada, de forma que o custo de inserção no final é O(1) amortizado.
+# Argumentos:
+#       dtype = tipo dos elementos (por exemplo np.int32 ou np.float64).
+#       width = quantidade de colunas de cada elemento (None para um array
+#       unidimensional, 3 para posições (x, y, z)).
+#       capacity = capacidade inicial do buffer.
+class GrowableArray:
+    def __init__(self, dtype, width = None, capacity = 16):
+        self.__width = width
+        self.__data = np.empty(self.__shape(max(int(capacity), 1)), dtype=dtype)
+        self.__size = 0
+        self.__view = self.__data[:0]
+        self.__readOnly = False
+
+    # Cria um GrowableArray a partir de um array já existente, sem copiar os
+    # dados. O array passa a ser o buffer interno (com capacidade igual ao seu
+    # tamanho). Se o array for somente leitura (por exemplo um numpy.memmap),
+    # ele é copiado apenas na primeira modificação.
+    @classmethod
+    def fromArray(cls, array, dtype = None, width = None):
+        array = np.ascontiguousarray(array, dtype=dtype)
+        if width is not None:
+            array = array.reshape((-1, width))
+        result = cls(array.dtype, width, 1)
+        result.__data = array
+        result.__size = array.shape[0]
+        result.__view = array
+        result.__readOnly = not array.flags.writeable
+        return result
+
+    def __shape(self, capacity):
+        if self.__width is None:
+            return (capacity,)
+        return (capacity, self.__width)
+
+    def __len__(self):
+        return self.__size
+
+    def __getitem__(self, key):
+        return self.__view[key]
+
+    def __setitem__(self, key, value):
+        if self.__readOnly:
+            self.reserve(self.__data.shape[0], True)
+        self.__view[key] = value
+
+    def __iter__(self):
+        return iter(self.__view)
+
+    # Quantidade de elementos que cabem no buffer sem realocação.
+    def capacity(self):
+        return self.__data.shape[0]
+
+    # Quantidade de bytes ocupados pelos elementos armazenados.
+    def nbytes(self):
+        return self.__view.nbytes
+
+    # View (sem cópia) com os elementos armazenados. A view deixa de ser
+    # válida se o array for realocado (após inserções).
+    def view(self):
+        return self.__view
+
+    # Garante espaço para pelo menos capacity elementos.
+    # Argumentos:
+    #       copy = se verdadeiro, o buffer é realocado mesmo que a capacidade
+    #       seja suficiente.
+    def reserve(self, capacity, copy = False):
+        if copy or capacity > self.__data.shape[0]:
+            data = np.empty(self.__shape(max(int(capacity), self.__data.shape[0])), dtype=self.__data.dtype)
+            data[:self.__size] = self.__data[:self.__size]
+            self.__data = data
+            self.__view = data[:self.__size]
+            self.__readOnly = False
+
+    # Insere um elemento no final do array.
+    # (um buffer criado com fromArray a partir de um array vazio tem
+    # capacidade 0, e por isso a nova capacidade é pelo menos 1).
+    def append(self, value):
+        if self.__size == self.__data.shape[0] or self.__readOnly:
+            self.reserve(max(2 * self.__data.shape[0], 1), self.__readOnly)
+        self.__data[self.__size] = value
+        self.__size += 1
+        self.__view = self.__data[:self.__size]
+
+    # Insere vários elementos no final do array.
+    def extend(self, values):
+        values = np.asarray(values, dtype=self.__data.dtype)
+        if self.__width is not None:
+            values = values.reshape((-1, self.__width))
+        newSize = self.__size + values.shape[0]
+        if newSize > self.__data.shape[0] or self.__readOnly:
+            self.reserve(max(newSize, 2 * self.__data.shape[0]), self.__readOnly)
+        self.__data[self.__size:newSize] = values
+        self.__size = newSize
+        self.__view = self.__data[:self.__size]
+
+    # Remove os elementos a partir da posição size (equivalente a apagar os
+    # últimos elementos de uma lista). A capacidade não é reduzida.
+    def truncate(self, size):
+        if size < 0 or size > self.__size:
+            raise IndexError("GrowableArray truncate out of range")
+        self.__size = size
+        self.__view = self.__data[:size]
+
+    def tolist(self):
+        return self.__view.tolist()
+
+# Formato binário utilizado para salvar as corner tables (save/load).
+# O arquivo é composto por um cabeçalho pequeno seguido dos arrays em binário
+# puro (little-endian), de forma que os arrays podem ser abertos com
+# numpy.memmap, sem leitura nem reconstrução:
+#       magic (8 bytes) | versão (uint32) | quantidade de arrays (uint32)
+#       para cada array: nome (16 bytes), dtype (8 bytes, ex. '<i4'),
+#       quantidade de dimensões (uint32), reservado (uint32), shape
+#       (2 x uint64) e offset do início dos dados (uint64).
+#       dados de cada array, alinhados em 64 bytes.
+_fileVersion = 1
+_fileHeader = struct.Struct('<8sII')
+_fileEntry = struct.Struct('<16s8sIIQQQ')
+_fileAlignment = 64
+
+# Salva os arrays no arquivo path.
+# Argumentos:
+#       path = caminho do arquivo.
+#       magic = identificador do tipo de arquivo (8 bytes).
+#       arrays = lista de pares (nome, array) com arrays de 1 ou 2 dimensões.
+def saveArrays(path, magic, arrays):
+    arrays = [(name, np.ascontiguousarray(array, dtype=np.asarray(array).dtype.newbyteorder('<'))) for name, array in arrays]
+    offset = _fileHeader.size + _fileEntry.size * len(arrays)
+    entries = []
+    for name, array in arrays:
+        if array.ndim not in (1, 2):
+            raise Exception("Only 1D and 2D arrays can be saved")
+        offset = -(-offset // _fileAlignment) * _fileAlignment
+        shape = tuple(array.shape) + (0,) * (2 - array.ndim)
+        entries.append(_fileEntry.pack(name.encode('ascii'), array.dtype.str.encode('ascii'), array.ndim, 0, shape[0], shape[1], offset))
+        offset += array.nbytes
+    with open(path, 'wb') as f:
+        f.write(_fileHeader.pack(magic, _fileVersion, len(arrays)))
+        for entry in entries:
+            f.write(entry)
+        for entry, (name, array) in zip(entries, arrays):
+            f.seek(_fileEntry.unpack(entry)[6])
+            array.tofile(f)
+
+# Carrega os arrays salvos com saveArrays.
+# Argumentos:
+#       path = caminho do arquivo.
+#       magic = identificador esperado do tipo de arquivo.
+#       mmap = se verdadeiro, os arrays são abertos com numpy.memmap
+#       (somente leitura, sem cópia, e podem ser compartilhados entre
+#       processos); caso contrário são lidos para a memória.
+# Retorna um dicionário nome -> array.
+def loadArrays(path, magic, mmap = True):
+    with open(path, 'rb') as f:
+        header = f.read(_fileHeader.size)
+        if len(header) != _fileHeader.size:
+            raise Exception("Invalid corner table file: " + str(path))
+        fileMagic, version, count = _fileHeader.unpack(header)
+        if fileMagic != magic:
+            raise Exception("Invalid corner table file: " + str(path))
+        if version != _fileVersion:
+            raise Exception("Unsupported corner table file version: " + str(version))
+        entries = [_fileEntry.unpack(f.read(_fileEntry.size)) for i in range(count)]
+        arrays = {}
+        for name, dtype, ndim, reserved, shape0, shape1, offset in entries:
+            name = name.rstrip(b'\0').decode('ascii')
+            dtype = np.dtype(dtype.rstrip(b'\0').decode('ascii'))
+            shape = (shape0, shape1)[:ndim]
+            if int(np.prod(shape)) == 0:
+                # o numpy não consegue mapear um trecho vazio do arquivo.
+                array = np.empty(shape, dtype=dtype)
+            elif mmap:
+                array = np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=shape)
+            else:
+                f.seek(offset)
+                array = np.fromfile(f, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+            arrays[name] = array
+    return arrays
@@ -0,0 +1,183 @@
+#########################
+# Author: lmreia
+# License: GNU General Public License v3 (GPL-3)
+#########################
+
+import itertools
+import numpy as np
+
+# Leitores de malhas de tetraedros para a CornerTable3D:
+#       TetGen: arquivos .node (vértices) e .ele (tetraedros).
+#       Gmsh: arquivos .msh versão 4.1, ASCII ou binário.
+# Os blocos de dados são convertidos diretamente para arrays do numpy (sem
+# criar uma tupla do python para cada vértice e tetraedro).
+# Todos os leitores retornam um array (N, 3) de posições dos vértices e um
+# array (M, 4) de índices dos vértices (começando em 0) dos tetraedros. Em
+# tetraedros de ordem 2 (10 nós), apenas os 4 vértices são utilizados.
+
+# linhas de um arquivo do TetGen, sem comentários e sem linhas vazias.
+def _tetgenLines(f):
+    for line in f:
+        line = line.split(b'#', 1)[0]
+        if line.strip():
+            yield line
+
+# lê o cabeçalho e as count linhas seguintes de um arquivo do TetGen.
+def _readTetGenFile(path, dtype):
+    with open(path, 'rb') as f:
+        lines = _tetgenLines(f)
+        header = next(lines, None)
+        if header is None:
+            raise Exception("Invalid TetGen file: " + str(path))
+        header = [int(token) for token in header.split()]
+        if header[0] == 0:
+            return header, np.empty((0, 1), dtype=dtype)
+        data = np.loadtxt(itertools.islice(lines, header[0]), dtype=dtype, ndmin=2)
+        if data.shape[0] != header[0]:
+            raise Exception("Invalid TetGen file: " + str(path))
+        return header, data
+
+# Lê uma malha do TetGen.
+# Argumentos:
+#       path = caminho do arquivo .node ou .ele, ou o nome base (sem
+#       extensão) dos dois arquivos.
+def readTetGen(path):
+    path = str(path)
+    if path.endswith('.node') or path.endswith('.ele'):
+        path = path[:path.rindex('.')]
+
+    # .node: <quantidade de pontos> <dimensão> <atributos> <marcadores>
+    #        <índice> <x> <y> <z> [atributos] [marcador]
+    header, nodes = _readTetGenFile(path + '.node', np.float64)
+    if header[1] != 3:
+        raise Exception("Only 3D TetGen meshes are supported")
+    if nodes.shape[0] == 0:
+        vertices = np.empty((0, 3), dtype=np.float64)
+        firstIndex = 0
+    else:
+        vertices = np.ascontiguousarray(nodes[:, 1:4])
+        # os pontos podem ser numerados a partir de 0 ou de 1.
+        firstIndex = int(nodes[0, 0])
+
+    # .ele: <quantidade de tetraedros> <nós por tetraedro> <atributo>
+    #       <índice> <nó> <nó> <nó> <nó> [...] [atributo]
+    header, elements = _readTetGenFile(path + '.ele', np.int64)
+    if elements.shape[0] == 0:
+        return vertices, np.empty((0, 4), dtype=np.int64)
+    tetrahedra = elements[:, 1:5] - firstIndex
+    return vertices, np.ascontiguousarray(tetrahedra)
+
+# quantidade de nós de cada tipo de elemento do Gmsh (necessária para pular
+# os blocos de elementos que não são tetraedros nos arquivos binários).
+_gmshNodesPerElement = {
+    1: 2, 2: 3, 3: 4, 4: 4, 5: 8, 6: 6, 7: 5, 8: 3, 9: 6, 10: 9, 11: 10,
+    12: 27, 13: 18, 14: 14, 15: 1, 16: 8, 17: 20, 18: 15, 19: 13,
+    20: 9, 21: 10, 22: 12, 23: 15, 24: 15, 25: 21, 26: 4, 27: 5, 28: 6,
+    29: 20, 30: 35, 31: 56, 92: 64, 93: 125
+}
+
+# tipos de elemento do Gmsh que são tetraedros (4 e 10 nós).
+_gmshTetrahedra = (4, 11)
+
+# lê count linhas de um bloco de dados ASCII do Gmsh.
+def _gmshAscii(f, count, dtype):
+    return np.loadtxt(itertools.islice(f, count), dtype=dtype, ndmin=2)
+
+# Lê uma malha do Gmsh (formato .msh versão 4.1, ASCII ou binário).
+# Apenas as seções $MeshFormat, $Nodes e $Elements são utilizadas; as demais
+# são ignoradas.
+# Argumentos:
+#       path = caminho do arquivo .msh.
+def readGmsh(path):
+    vertexBlocks = []
+    tagBlocks = []
+    tetrahedraBlocks = []
+    binary = False
+    with open(path, 'rb') as f:
+        while True:
+            line = f.readline()
+            if not line:
+                break
+            section = line.strip()
+            if section == b'$MeshFormat':
+                version, fileType, dataSize = f.readline().split()[:3]
+                # apenas o layout das seções da versão 4.1 é suportado (a
+                # versão 4.0, por exemplo, tem outro formato de $Nodes).
+                if version.split(b'.')[:2] != [b'4', b'1']:
+                    raise Exception("Only Gmsh format 4.1 is supported, got " + version.decode('ascii', 'replace'))
+                binary = int(fileType) == 1
+                if binary:
+                    # o inteiro 1 em binário indica a ordem dos bytes.
+                    endian = '<' if np.frombuffer(f.read(4), dtype='<i4')[0] == 1 else '>'
+                    sizeT = np.dtype(endian + ('u8' if int(dataSize) == 8 else 'u4'))
+                    intT = np.dtype(endian + 'i4')
+                    doubleT = np.dtype(endian + 'f8')
+            elif section == b'$Nodes':
+                if binary:
+                    numBlocks = int(np.frombuffer(f.read(4 * sizeT.itemsize), dtype=sizeT)[0])
+                    for block in range(numBlocks):
+                        entityDim, entityTag, parametric = np.frombuffer(f.read(3 * intT.itemsize), dtype=intT).tolist()
+                        count = int(np.frombuffer(f.read(sizeT.itemsize), dtype=sizeT)[0])
+                        tagBlocks.append(np.frombuffer(f.read(count * sizeT.itemsize), dtype=sizeT).astype(np.int64))
+                        width = 3 + (entityDim if parametric else 0)
+                        coordinates = np.frombuffer(f.read(count * width * doubleT.itemsize), dtype=doubleT).reshape((count, width))
+                        vertexBlocks.append(coordinates[:, :3].astype(np.float64))
+                else:
+                    numBlocks = int(f.readline().split()[0])
+                    for block in range(numBlocks):
+                        entityDim, entityTag, parametric, count = [int(token) for token in f.readline().split()]
+                        if count == 0:
+                            continue
+                        tagBlocks.append(_gmshAscii(f, count, np.int64).reshape(-1))
+                        vertexBlocks.append(_gmshAscii(f, count, np.float64)[:, :3])
+            elif section == b'$Elements':
+                if binary:
+                    numBlocks = int(np.frombuffer(f.read(4 * sizeT.itemsize), dtype=sizeT)[0])
+                    for block in range(numBlocks):
+                        entityDim, entityTag, elementType = np.frombuffer(f.read(3 * intT.itemsize), dtype=intT).tolist()
+                        count = int(np.frombuffer(f.read(sizeT.itemsize), dtype=sizeT)[0])
+                        if elementType not in _gmshNodesPerElement:
+                            raise Exception("Unknown Gmsh element type: " + str(elementType))
+                        width = 1 + _gmshNodesPerElement[elementType]
+                        data = f.read(count * width * sizeT.itemsize)
+                        if elementType in _gmshTetrahedra:
+                            data = np.frombuffer(data, dtype=sizeT).reshape((count, width))
+                            tetrahedraBlocks.append(data[:, 1:5].astype(np.int64))
+                else:
+                    numBlocks = int(f.readline().split()[0])
+                    for block in range(numBlocks):
+                        entityDim, entityTag, elementType, count = [int(token) for token in f.readline().split()]
+                        if count == 0:
+                            continue
+                        if elementType in _gmshTetrahedra:
+                            tetrahedraBlocks.append(_gmshAscii(f, count, np.int64)[:, 1:5])
+                        else:
+                            for line in itertools.islice(f, count):
+                                pass
+            elif section.startswith(b'$') and not section.startswith(b'$End'):
+                # seção ignorada: pula até o final da seção.
+                end = b'$End' + section[1:]
+                while True:
+                    line = f.readline()
+                    if not line:
+                        raise Exception("Invalid Gmsh file: missing " + end.decode('ascii'))
+                    if line.strip() == end:
+                        break
+
+    if vertexBlocks:
+        vertices = np.ascontiguousarray(np.concatenate(vertexBlocks))
+        tags = np.concatenate(tagBlocks)
+    else:
+        vertices = np.empty((0, 3), dtype=np.float64)
+        tags = np.empty(0, dtype=np.int64)
+    if not tetrahedraBlocks:
+        return vertices, np.empty((0, 4), dtype=np.int64)
+    tetrahedra = np.concatenate(tetrahedraBlocks)
+
+    # convertendo as tags dos nós (que podem não ser contíguas) em índices.
+    tagToIndex = np.full(max(int(tags.max(initial=0)), int(tetrahedra.max())) + 1, -1, dtype=np.int64)
+    tagToIndex[tags] = np.arange(tags.shape[0])
+    tetrahedra = tagToIndex[tetrahedra]
+    if np.any(tetrahedra < 0):
+        raise Exception("Invalid Gmsh file: element references an unknown node")
+    return vertices, tetrahedra
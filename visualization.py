@@ -0,0 +1,106 @@
+#########################
+# Author: lmreia
+# License: GNU General Public License v3 (GPL-3)
+#########################
+
+import numpy as np
+from matplotlib.figure import Figure
+from mpl_toolkits.mplot3d.art3d import Line3DCollection
+
+# Desenho das malhas das corner tables (ver plotCornerTableMesh nas classes).
+# Todo o desenho é feito com poucas chamadas ao matplotlib, para malhas
+# grandes:
+#       as arestas são desenhadas em um único Line3DCollection (cada aresta
+#       uma só vez) e as superfícies em um único plot_trisurf;
+#       as posições de todos os labels são calculadas de uma só vez com o
+#       numpy;
+#       a quantidade de labels de cada tipo (vértices, corners e elementos) é
+#       limitada por maxLabels: acima do limite, apenas labels espaçados de
+#       forma uniforme pelos índices são desenhados (nível de detalhe), já
+#       que milhares de textos sobrepostos não são legíveis e cada texto é um
+#       objeto do matplotlib.
+# Com filename, a figura é criada sem o pyplot (sem backend gráfico) e salva
+# diretamente no arquivo, de forma que funciona em servidores sem display; o
+# pyplot só é importado para exibir a figura em uma janela.
+
+# Índices dos labels desenhados entre count labels (todos, ou limit índices
+# espaçados de forma uniforme).
+def _decimate(count, limit):
+    if limit is None or count <= limit:
+        return np.arange(count)
+    if limit <= 0:
+        return np.arange(0)
+    return np.unique(np.linspace(0, count - 1, limit).astype(np.int64))
+
+# Posições dos labels dos corners e dos elementos.
+# Cada label de corner fica entre o vértice do corner e os outros vértices do
+# elemento (a 1/10 do caminho até cada um deles) e cada label de elemento fica
+# no centróide do elemento.
+# Argumentos:
+#       vertices = array (N, 3) com as posições dos vértices.
+#       elements = array (M, k) com os índices dos vértices de cada elemento
+#       (k = 3 para triângulos e 4 para tetraedros).
+# Retorna um array (M * k, 3) com as posições dos labels dos corners e um
+# array (M, 3) com as posições dos labels dos elementos.
+def labelPositions(vertices, elements):
+    points = vertices[elements]
+    k = elements.shape[1]
+    total = points.sum(axis=1)
+    corners = (total[:, None, :] - k * points) / 10 + points
+    return corners.reshape((-1, 3)), total / k
+
+# Desenha os labels text + índice nas posições positions[indices].
+def _drawLabels(ax, positions, indices, prefix, **style):
+    for i, (x, y, z) in zip(indices.tolist(), positions[indices].tolist()):
+        ax.text(x, y, z, prefix + str(i), horizontalalignment = 'center', **style)
+
+# Desenha a malha de uma corner table.
+# Argumentos:
+#       vertices = array (N, 3) com as posições dos vértices.
+#       elements = array (M, 3) de triângulos ou (M, 4) de tetraedros.
+#       edges = array (E, 2) com as arestas desenhadas (cada aresta uma vez),
+#       ou None para desenhar a superfície dos triângulos.
+#       title = título do plot.
+#       displayLabels = se verdadeiro, desenha os labels dos vértices (v),
+#       corners (c) e elementos (t).
+#       filename = se informado, a figura é salva neste arquivo (o formato
+#       é dado pela extensão, por exemplo .png) em vez de ser exibida.
+#       maxLabels = quantidade máxima de labels de cada tipo (None = sem
+#       limite).
+def plotMesh(vertices, elements, edges = None, title = None, displayLabels = False, filename = None, maxLabels = 500):
+    if filename is None:
+        import matplotlib.pyplot as plt
+        fig = plt.figure()
+    else:
+        fig = Figure()
+    ax = fig.add_subplot(111, projection='3d')
+
+    # Exibindo a mesh.
+    if edges is None:
+        ax.plot_trisurf(vertices[:, 0], vertices[:, 1], triangles = elements, Z = vertices[:, 2])
+    else:
+        ax.add_collection3d(Line3DCollection(vertices[edges], colors = 'k', linewidths = 1))
+        if vertices.shape[0] > 0:
+            low = vertices.min(axis=0)
+            high = vertices.max(axis=0)
+            ax.set_xlim(low[0], high[0])
+            ax.set_ylim(low[1], high[1])
+            ax.set_zlim(low[2], high[2])
+
+    # Desenhando as labels dos vértices/corners/elementos.
+    if displayLabels:
+        cornerPositions, elementPositions = labelPositions(vertices, elements)
+        _drawLabels(ax, vertices, _decimate(vertices.shape[0], maxLabels), 'v', color = 'blue', fontweight = 'bold')
+        _drawLabels(ax, cornerPositions, _decimate(cornerPositions.shape[0], maxLabels), 'c', color = 'red', fontweight = 'normal')
+        _drawLabels(ax, elementPositions, _decimate(elementPositions.shape[0], maxLabels), 't', color = 'black', fontweight = 'bold')
+
+    # Adicionando título e nomes dos eixos.
+    if title:
+        ax.set_title(title)
+    ax.set_xlabel('x')
+    ax.set_ylabel('y')
+    ax.set_zlabel('z')
+    if filename is None:
+        plt.show()
+    else:
+        fig.savefig(filename)